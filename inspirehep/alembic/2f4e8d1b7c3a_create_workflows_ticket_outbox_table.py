@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Create the ``workflows_ticket_outbox`` table."""
+
+from __future__ import absolute_import, division, print_function
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+from sqlalchemy_utils.types import JSONType
+
+
+revision = '2f4e8d1b7c3a'
+down_revision = 'cb5153afd839'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'workflows_ticket_outbox',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column(
+            'workflow_id',
+            sa.Integer,
+            sa.ForeignKey('workflows_object.id', ondelete='CASCADE'),
+            nullable=False,
+            index=True,
+        ),
+        sa.Column('action', sa.Text, nullable=False),
+        sa.Column(
+            'payload',
+            JSONType().with_variant(
+                postgresql.JSON(none_as_null=True),
+                'postgresql',
+            ),
+            default=lambda: dict(),
+        ),
+        sa.Column(
+            'status',
+            sa.Text,
+            default='pending',
+            nullable=False,
+            index=True,
+        ),
+        sa.Column('attempts', sa.Integer, default=0, nullable=False),
+        sa.Column('error', sa.Text, default='', nullable=False),
+        sa.Column('ticket_id', sa.Integer, nullable=True),
+        sa.Column(
+            'created',
+            sa.DateTime,
+            default=datetime.utcnow,
+            nullable=False,
+        ),
+        sa.Column(
+            'updated',
+            sa.DateTime,
+            default=datetime.utcnow,
+            nullable=False,
+        ),
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table('workflows_ticket_outbox')
@@ -56,6 +56,24 @@ INSPIRE_FULL_THEME = True
 """Allows to switch between labs.inspirehep.net view and full version."""
 THEME_SITENAME = "inspirehep"
 BASE_TEMPLATE = "inspirehep_theme/page.html"
+THEME_WIDGETS_TTL = 300
+"""Age in seconds after which a landing page widget is refreshed."""
+THEME_WIDGETS_CACHE_TIMEOUT = 86400
+"""Time in seconds after which a landing page widget is dropped from the cache."""
+THEME_INSTITUTION_PEOPLE_MAX_AUTHORS = 10000
+"""Maximum number of authors listed in the people of an institution."""
+THEME_INSTITUTION_PEOPLE_BATCH_SIZE = 500
+"""Number of authors whose names are fetched by each query."""
+THEME_INSTITUTION_PEOPLE_CACHE_TIMEOUT = 3600
+"""Time in seconds the authors of an institution are kept in the cache."""
+THEME_PREFETCHED_TEMPLATE_FILTERS = {
+    'con': [],
+    'ins': [],
+    'lit': ['publication_info'],
+}
+"""Template filters whose searches are prefetched by the detailed views, by
+PID type. List here the filters, such as ``proceedings_link``, used by the
+detailed templates."""
 
 # Database
 # ========
@@ -74,7 +92,19 @@ CELERYBEAT_SCHEDULE = {
     'journal_kb_builder': {
         'task': 'inspirehep.modules.refextract.tasks.create_journal_kb_file',
         'schedule': crontab(minute='0', hour='*/1'),
-    }
+    },
+    'serialization_cache_warm_up': {
+        'task': 'inspirehep.modules.records.tasks.warm_up_serialization_cache',
+        'schedule': crontab(minute='30', hour='*/1'),
+    },
+    'landing_page_widgets': {
+        'task': 'inspirehep.modules.theme.tasks.refresh_landing_page_widgets',
+        'schedule': crontab(minute='*/5'),
+    },
+    'workflows_ticket_outbox': {
+        'task': 'inspirehep.modules.workflows.tasks.outbox.dispatch_ticket_outbox',
+        'schedule': crontab(minute='*'),
+    },
 }
 # Cache
 # =====
@@ -165,10 +195,29 @@ call `register_signals()` on our own.
 
 RECORD_EDITOR_FILE_UPLOAD_FOLDER = 'inspirehep/modules/editor/temp'
 
+# Seconds during which the RT queue and user lists are cached.
+RT_LISTS_CACHE_TIMEOUT = 60 * 60
+
+# Seconds during which the unresolved RT tickets of a record are cached.
+RT_TICKETS_CACHE_TIMEOUT = 5 * 60
+
+# Maximum number of RT tickets whose details are fetched in parallel.
+RT_MAX_CONCURRENT_REQUESTS = 8
+
 # Path to where journal kb file is stored from `inspirehep.modules.refextract.tasks.create_journal_kb_file`
 # On production, if you enable celery beat change this path to point to a shared space.
 REFEXTRACT_JOURNAL_KB_PATH = pkg_resources.resource_filename('refextract', 'references/kbs/journal-titles.kb')
 
+# Seconds during which a Celery worker reuses its local copy of the refextract KBs.
+REFEXTRACT_KB_CACHE_TIMEOUT = 60 * 60
+
+# Seconds during which the result of a refextract job of the editor is kept.
+# Jobs with the same input share the same result.
+REFEXTRACT_JOB_CACHE_TIMEOUT = 24 * 60 * 60
+# Seconds after which a refextract job still pending is considered lost, and
+# is submitted again for the same input.
+REFEXTRACT_PENDING_JOB_CACHE_TIMEOUT = 10 * 60
+
 INSPIRE_COLLECTIONS_DEFINITION = [
     {
         'query': '_collections:Literature',
@@ -287,6 +336,17 @@ SEARCH_TYPEAHEAD_SPIRES_KEYWORD_TO_HINT = {
 }
 SEARCH_TYPEAHEAD_HINT_URL = '/search/suggest?field=%TYPE&query=%QUERY'
 SEARCH_TYPEAHEAD_DEFAULT_SET = 'invenio'
+# Queries shorter than this get no suggestions
+SEARCH_SUGGEST_MIN_PREFIX_LENGTH = 2
+# Time in seconds the suggestions of a prefix are kept in Redis
+SEARCH_SUGGEST_CACHE_TIMEOUT = 3600
+# Number of prefixes whose suggestions are kept in the memory of each process
+SEARCH_SUGGEST_LOCAL_CACHE_SIZE = 10000
+# Time in seconds the suggestions of a prefix are kept in memory
+SEARCH_SUGGEST_LOCAL_CACHE_TIMEOUT = 60
+# Time in seconds to wait for identical suggestion requests in flight before
+# querying Elasticsearch, at least 1 as the Redis lock counts in seconds
+SEARCH_SUGGEST_COALESCE_TIMEOUT = 1
 
 SEARCH_ELASTIC_HOSTS = ['localhost']
 SEARCH_UI_BASE_TEMPLATE = BASE_TEMPLATE
@@ -306,6 +366,20 @@ INSPIRE_ENDPOINT_TO_INDEX = {
 
 # Records
 # =======
+# Bump to invalidate the cached serializations after changing a serializer.
+RECORDS_SERIALIZATION_CACHE_VERSION = 1
+# Seconds after which a cached serialization expires, as some formats
+# depend on other records too.
+RECORDS_SERIALIZATION_CACHE_TIMEOUT = 24 * 60 * 60
+# Formats pre-rendered by `inspirehep.modules.records.tasks.warm_up_serialization_cache`
+# for the literature records updated during the last
+# `RECORDS_SERIALIZATION_WARMUP_PERIOD` seconds.
+RECORDS_SERIALIZATION_WARMUP_FORMATS = ['bibtex', 'latexeu', 'latexus']
+RECORDS_SERIALIZATION_WARMUP_PERIOD = 60 * 60
+# Seconds Elasticsearch takes to make the indexed records searchable, i.e.
+# the `refresh_interval` of the records indexes.
+RECORDS_INDEX_REFRESH_INTERVAL = 1
+
 RECORDS_REST_ENDPOINTS = dict(
     literature=dict(
         default_endpoint_prefix=True,
@@ -338,7 +412,7 @@ RECORDS_REST_ENDPOINTS = dict(
             'application/marcxml+xml': 'inspirehep.modules.records.serializers:marcxml_v1_response',
         },
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
                 'inspirehep.modules.records.serializers'
@@ -389,7 +463,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search')
         },
         list_route='/literature/db',
@@ -411,7 +485,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
                 'inspirehep.modules.records.serializers'
@@ -434,7 +508,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search')
         },
         list_route='/authors/db',
@@ -454,10 +528,10 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
-                'invenio_records_rest.serializers'
+                'inspirehep.modules.records.serializers'
                 ':json_v1_search'
             ),
         },
@@ -478,10 +552,10 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
-                'invenio_records_rest.serializers'
+                'inspirehep.modules.records.serializers'
                 ':json_v1_search'
             ),
         },
@@ -502,10 +576,10 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
-                'invenio_records_rest.serializers'
+                'inspirehep.modules.records.serializers'
                 ':json_v1_search'
             ),
         },
@@ -526,10 +600,10 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
-                'invenio_records_rest.serializers'
+                'inspirehep.modules.records.serializers'
                 ':json_v1_search'
             ),
         },
@@ -551,7 +625,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
                 'inspirehep.modules.records.serializers'
@@ -573,7 +647,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search')
         },
         list_route='/data/db',
@@ -594,7 +668,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
                 'inspirehep.modules.records.serializers'
@@ -617,7 +691,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search')
         },
         list_route='/conferences/db',
@@ -638,7 +712,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
                 'inspirehep.modules.records.serializers'
@@ -661,7 +735,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search')
         },
         list_route='/jobs/db',
@@ -682,7 +756,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
                 'inspirehep.modules.records.serializers'
@@ -710,7 +784,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search')
         },
         list_route='/institutions/db',
@@ -731,7 +805,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
                 'inspirehep.modules.records.serializers'
@@ -759,7 +833,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search')
         },
         list_route='/experiments/db',
@@ -780,7 +854,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search'),
             'application/vnd+inspire.brief+json': (
                 'inspirehep.modules.records.serializers'
@@ -809,7 +883,7 @@ RECORDS_REST_ENDPOINTS = dict(
         },
         record_class='inspirehep.modules.records.api:InspireRecord',
         search_serializers={
-            'application/json': ('invenio_records_rest.serializers'
+            'application/json': ('inspirehep.modules.records.serializers'
                                  ':json_v1_search')
         },
         list_route='/journals/db',
@@ -829,6 +903,7 @@ RECORDS_UI_ENDPOINTS = dict(
         route='/literature/<pid_value>',
         template='inspirehep_theme/format/record/'
                  'Inspire_Default_HTML_detailed.tpl',
+        view_imp='inspirehep.modules.theme.views:render_record',
         record_class='inspirehep.modules.records.wrappers:LiteratureRecord',
     ),
     authors=dict(
@@ -847,6 +922,7 @@ RECORDS_UI_ENDPOINTS = dict(
         pid_type='con',
         route='/conferences/<pid_value>',
         template='inspirehep_theme/format/record/Conference_HTML_detailed.tpl',
+        view_imp='inspirehep.modules.theme.views:render_record',
         record_class='inspirehep.modules.records.wrappers:ConferencesRecord',
     ),
     jobs=dict(
@@ -859,6 +935,7 @@ RECORDS_UI_ENDPOINTS = dict(
         pid_type='ins',
         route='/institutions/<pid_value>',
         template='inspirehep_theme/format/record/Institution_HTML_detailed.tpl',
+        view_imp='inspirehep.modules.theme.views:render_record',
         record_class='inspirehep.modules.records.wrappers:InstitutionsRecord',
     ),
     experiments=dict(
@@ -1148,6 +1225,8 @@ Note:
   ``InspireRecord.update`` takes precedence on this config variable.
 
 """
+RECORDS_FILES_DOWNLOAD_POOL_SIZE = 8
+"""Number of documents and figures of a record downloaded in parallel."""
 RECORDS_MIGRATION_SKIP_FILES = False
 """Disable the downloading of files at record migration time.
 
@@ -1158,6 +1237,15 @@ Note:
   ``migrate`` and ``continuous_migration`` from the
   ``inspirehep.modules.migrator.tasks`` module.
 """
+RECORDS_MIGRATION_BATCH_SIZE = 100
+"""Number of records pushed up by Legacy that are migrated together."""
+RECORDS_MIGRATION_SHARED_DIR = None
+"""Directory shared with the workers where gzipped dumps are decompressed.
+
+Note:
+  Used by ``migrate`` when ``shared`` is set. If it is ``None`` the dumps are
+  decompressed next to the original file.
+"""
 
 JSONSCHEMAS_HOST = "localhost:5000"
 JSONSCHEMAS_REPLACE_REFS = True
@@ -1209,6 +1297,8 @@ LEGACY_ROBOTUPLOAD_URL = None  # Disabled by default
 # =====================
 BEARD_API_URL = None  # e.g. "http://beard.inspirehep.net/api"
 MAGPIE_API_URL = None  # e.g. "http://magpie.inspirehep.net/api"
+PREDICTION_API_MAX_CONCURRENT_REQUESTS = 8
+"""Maximum number of parallel requests sent to Beard and Magpie by a batch."""
 LEGACY_BASE_URL = "http://inspirehep.net"
 
 # Harvesting and Workflows
@@ -1241,6 +1331,53 @@ WORKFLOWS_DEFAULT_FILE_LOCATION_NAME = "holdingpen"
 WORKFLOWS_OBJECT_CLASS = "invenio_workflows_files.api.WorkflowObject"
 """Enable obj.files API."""
 
+WORKFLOWS_ARTICLE_BATCHING = False
+"""Whether the harvested articles are matched and sent to the prediction
+services in batches before their ``article`` workflows start."""
+
+WORKFLOWS_ARTICLE_BATCH_SIZE = 50
+"""Number of articles prepared together by ``start_articles_in_batches``."""
+
+WORKFLOWS_CALLBACK_BATCH_SIZE = 100
+"""Number of workflows continued together after a callback from Legacy."""
+
+WORKFLOWS_ROBOTUPLOAD_BATCH_WINDOW = 0
+"""Seconds during which robotuploads are collected to be shipped together.
+
+``0`` ships every record on its own.
+"""
+
+WORKFLOWS_ROBOTUPLOAD_BATCH_SIZE = 100
+"""Maximum number of records shipped by a single robotupload."""
+
+WORKFLOWS_ROBOTUPLOAD_CALLBACK_TIMEOUT = 6 * 60 * 60
+"""Seconds after which the workflows of a batched robotupload that got no
+result from Legacy are put in error state."""
+
+WORKFLOWS_TICKET_OUTBOX = False
+"""Let workflow steps queue their RT operations instead of waiting for RT."""
+
+WORKFLOWS_TICKET_OUTBOX_BATCH_SIZE = 100
+"""Number of queued RT operations read together by the outbox dispatcher."""
+
+WORKFLOWS_TICKET_OUTBOX_MAX_CONCURRENT_REQUESTS = 4
+"""Maximum number of workflows whose RT operations are sent in parallel."""
+
+WORKFLOWS_TICKET_OUTBOX_MAX_ATTEMPTS = 10
+"""Number of attempts after which a queued RT operation is marked failed."""
+
+WORKFLOWS_TICKET_OUTBOX_RETRY_DELAY = 60
+"""Seconds to wait before sending again a failed RT operation."""
+
+WORKFLOWS_DEFER_HOLDINGPEN_INDEXING = False
+"""Let workflow steps postpone Holding Pen reindexing."""
+
+WORKFLOWS_HOLDINGPEN_INDEXING_INTERVAL = 30
+"""Seconds after which a postponed Holding Pen reindexing is done anyway."""
+
+WORKFLOWS_UI_API_CLASS = "inspirehep.modules.workflows.api:InspireWorkflowUIRecord"
+"""Holding Pen record class, supporting bulk and deferred indexing."""
+
 WORKFLOWS_UI_BASE_TEMPLATE = BASE_TEMPLATE
 WORKFLOWS_UI_INDEX_TEMPLATE = "inspire_workflows/index.html"
 WORKFLOWS_UI_LIST_TEMPLATE = "inspire_workflows/list.html"
@@ -1399,12 +1536,16 @@ CRAWLER_HOST_URL = "http://localhost:6800"
 CRAWLER_SETTINGS = {
     # URL to your flower instance
     "API_PIPELINE_URL": "http://localhost:5555/api/task/async-apply",
-    "API_PIPELINE_TASK_ENDPOINT_DEFAULT": "inspire_crawler.tasks.submit_results",
+    "API_PIPELINE_TASK_ENDPOINT_DEFAULT": "inspirehep.modules.workflows.tasks.batch.submit_results",
 }
 
 # Legacy PID provider
 # ===================
 LEGACY_PID_PROVIDER = None  # e.g. "http://example.org/batchuploader/allocaterecord"
+# Number of pids reserved in advance on legacy, 0 to reserve them on demand.
+LEGACY_PID_PROVIDER_POOL_SIZE = 100
+# Number of reserved pids below which the pool is refilled.
+LEGACY_PID_PROVIDER_POOL_LOW_WATER_MARK = 20
 
 # Inspire subject translation
 # ===========================
@@ -1613,3 +1754,13 @@ INSPIRE_REF_UPDATER_WHITELISTS = {
     ],
 }
 """Controls which fields are updated when the referred record is updated."""
+INSPIRE_REF_UPDATER_CHUNK_SIZE = 100
+"""Number of records updated, committed and reindexed together."""
+INSPIRE_REF_UPDATER_CHUNK_TIMEOUT = 60 * 60
+"""Seconds after which a chunk of references not yet updated is considered
+lost, and is dispatched again when the update is resumed."""
+INSPIRE_REF_UPDATER_JOB_TIMEOUT = 7 * 24 * 60 * 60
+"""Seconds after which the progress of an interrupted update of references
+is forgotten, so that calling it again starts from scratch."""
+INSPIRE_MERGE_MERGED_RECORDS_CHUNK_SIZE = 100
+"""Number of merged records whose deleted PIDs are redirected together."""
@@ -26,7 +26,9 @@ from __future__ import absolute_import, division, print_function
 
 import json
 
-from invenio_records_rest.serializers.response import search_responsify
+from inspirehep.modules.records.serializers.response import (
+    search_responsify_etag,
+)
 
 
 class APIRecidsSerializer(object):
@@ -43,7 +45,7 @@ class APIRecidsSerializer(object):
 
 
 json_recids = APIRecidsSerializer()
-json_recids_response = search_responsify(
+json_recids_response = search_responsify_etag(
     json_recids,
     'application/vnd+inspire.ids+json'
 )
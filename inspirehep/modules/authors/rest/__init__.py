@@ -29,21 +29,21 @@ from inspirehep.modules.authors.rest.coauthors import AuthorAPICoauthors
 from inspirehep.modules.authors.rest.publications import AuthorAPIPublications
 from inspirehep.modules.authors.rest.stats import AuthorAPIStats
 from inspirehep.modules.records.serializers.response import (
-    record_responsify_nocache,
+    record_responsify_index_etag,
 )
 
 citations_v1 = AuthorAPICitations()
-citations_v1_response = record_responsify_nocache(citations_v1,
-                                                  'application/json')
+citations_v1_response = record_responsify_index_etag(citations_v1,
+                                                     'application/json')
 
 coauthors_v1 = AuthorAPICoauthors()
-coauthors_v1_response = record_responsify_nocache(coauthors_v1,
-                                                  'application/json')
+coauthors_v1_response = record_responsify_index_etag(coauthors_v1,
+                                                     'application/json')
 
 publications_v1 = AuthorAPIPublications()
-publications_v1_response = record_responsify_nocache(publications_v1,
-                                                     'application/json')
+publications_v1_response = record_responsify_index_etag(publications_v1,
+                                                        'application/json')
 
 stats_v1 = AuthorAPIStats()
-stats_v1_response = record_responsify_nocache(stats_v1,
-                                              'application/json')
+stats_v1_response = record_responsify_index_etag(stats_v1,
+                                                 'application/json')
@@ -30,7 +30,9 @@ from fs.opener import fsopendir
 from sqlalchemy_continuum import transaction_class, version_class
 from werkzeug.utils import secure_filename
 
+from invenio_accounts.models import User
 from invenio_db import db
+from invenio_pidstore.models import PersistentIdentifier
 from invenio_records.models import RecordMetadata
 from refextract import (
     extract_references_from_string,
@@ -42,6 +44,10 @@ from inspirehep.modules.editor.permissions import (
     editor_use_api_permission,
 )
 from inspirehep.modules.pidstore.utils import get_pid_type_from_endpoint
+from inspirehep.modules.refextract.tasks import (
+    get_refextract_job,
+    submit_refextract_job,
+)
 from inspirehep.modules.tools import authorlist
 from inspirehep.utils import tickets
 from inspirehep.utils.record_getter import get_db_record
@@ -112,6 +118,36 @@ def refextract_url():
     return jsonify(references)
 
 
+@blueprint_api.route('/refextract/jobs', methods=['POST'])
+@editor_use_api_permission.require(http_exception=403)
+def create_refextract_job():
+    """Start extracting references from a piece of text or a URL.
+
+    Expects either a ``text`` or a ``url`` field. The extraction runs on a
+    Celery worker, and its result is fetched with
+    :func:`get_refextract_job_result` using the returned ``job_id``.
+    Identical inputs share the same job and result.
+    """
+    data = request.get_json(silent=True) or {}
+    for source_type in ('text', 'url'):
+        if data.get(source_type):
+            job_id, job = submit_refextract_job(source_type, data[source_type])
+            return jsonify(job_id=job_id, **job), 202
+
+    return jsonify(message='Either text or url is required.'), 400
+
+
+@blueprint_api.route('/refextract/jobs/<job_id>', methods=['GET'])
+@editor_use_api_permission.require(http_exception=403)
+def get_refextract_job_result(job_id):
+    """Get the status of a refextract job, and its references once done."""
+    job = get_refextract_job(job_id)
+    if job is None:
+        return jsonify(message='Job %s not found.' % job_id), 404
+
+    return jsonify(job_id=job_id, **job)
+
+
 @blueprint_api.route('/<endpoint>/<int:pid_value>/revisions/revert', methods=['PUT'])
 @editor_permission
 def revert_to_revision(endpoint, pid_value):
@@ -127,30 +163,57 @@ def revert_to_revision(endpoint, pid_value):
 @blueprint_api.route('/<endpoint>/<int:pid_value>/revisions', methods=['GET'])
 @editor_permission
 def get_revisions(endpoint, pid_value):
-    """Get revisions of given record"""
+    """Get revisions of given record, most recent first.
+
+    The metadata of the revisions is fetched with a single query joining the
+    version, transaction and user tables, without loading the content of the
+    revisions, which is served by :func:`get_revision`.
+
+    The optional ``page`` and ``size`` query parameters restrict the response
+    to a page of revisions. The total number of revisions is returned in the
+    ``X-Total-Count`` header.
+    """
+    RecordMetadataVersion = version_class(RecordMetadata)
     Transaction = transaction_class(RecordMetadata)
     pid_type = get_pid_type_from_endpoint(endpoint)
-    record = get_db_record(pid_type, pid_value)
-
-    revisions = []
-    for revision in reversed(record.revisions):
-        transaction_id = revision.model.transaction_id
-
-        user = Transaction.query.filter(
-            Transaction.id == transaction_id).one().user
-        if user:
-            user_email = user.email
-        else:
-            user_email = 'system'
-
-        revisions.append({
-            'updated': revision.updated,
-            'revision_id': revision.revision_id,
-            'user_email': user_email,
+    rec_uuid = PersistentIdentifier.get(pid_type, pid_value).object_uuid
+
+    query = db.session.query(
+        RecordMetadataVersion.version_id,
+        RecordMetadataVersion.updated,
+        RecordMetadataVersion.transaction_id,
+        User.email,
+    ).join(
+        Transaction,
+        Transaction.id == RecordMetadataVersion.transaction_id,
+    ).outerjoin(
+        User,
+        User.id == Transaction.user_id,
+    ).filter(
+        RecordMetadataVersion.id == rec_uuid,
+    ).order_by(
+        RecordMetadataVersion.transaction_id.desc(),
+    )
+    total = query.count()
+
+    size = request.args.get('size', type=int)
+    if size:
+        page = max(request.args.get('page', 1, type=int), 1)
+        query = query.offset((page - 1) * size).limit(size)
+
+    revisions = [
+        {
+            'updated': updated,
+            'revision_id': version_id - 1,
+            'user_email': user_email or 'system',
             'transaction_id': transaction_id,
-            'rec_uuid': record.id
-        })
-    return jsonify(revisions)
+            'rec_uuid': rec_uuid,
+        } for version_id, updated, transaction_id, user_email in query
+    ]
+
+    response = jsonify(revisions)
+    response.headers['X-Total-Count'] = str(total)
+    return response
 
 
 @blueprint_api.route('/<endpoint>/<int:pid_value>/revision/<rec_uuid>/<int:transaction_id>', methods=['GET'])
@@ -196,7 +259,7 @@ def create_rt_ticket(endpoint, pid_value):
 @editor_permission
 def resolve_rt_ticket(endpoint, pid_value, ticket_id):
     """View to resolve an rt ticket"""
-    tickets.resolve_ticket(ticket_id)
+    tickets.resolve_ticket(ticket_id, recid=pid_value)
     return jsonify(success=True)
 
 
@@ -204,7 +267,8 @@ def resolve_rt_ticket(endpoint, pid_value, ticket_id):
 @editor_permission
 def get_tickets_for_record(endpoint, pid_value):
     """View to get rt ticket belongs to given record"""
-    tickets_for_record = tickets.get_tickets_by_recid(pid_value)
+    tickets_for_record = tickets.get_tickets_by_recid(
+        pid_value, refresh=_should_refresh())
     simplified_tickets = map(_simplify_ticket_response, tickets_for_record)
     return jsonify(simplified_tickets)
 
@@ -214,7 +278,7 @@ def get_tickets_for_record(endpoint, pid_value):
 def get_rt_users():
     """View to get all rt users"""
 
-    return jsonify(tickets.get_users())
+    return jsonify(tickets.get_users(refresh=_should_refresh()))
 
 
 @blueprint_api.route('/rt/queues', methods=['GET'])
@@ -222,7 +286,7 @@ def get_rt_users():
 def get_rt_queues():
     """View to get all rt queues"""
 
-    return jsonify(tickets.get_queues())
+    return jsonify(tickets.get_queues(refresh=_should_refresh()))
 
 
 @blueprint_api.route('/manual_merge', methods=['POST'])
@@ -249,6 +313,11 @@ def manual_merge():
     return jsonify(workflow_object_id=workflow_object_id)
 
 
+def _should_refresh():
+    """Whether the request asks to bypass the cached rt data."""
+    return request.args.get('refresh', '').lower() in ('1', 'true')
+
+
 def _simplify_ticket_response(ticket):
     return dict(
         id=ticket['Id'],
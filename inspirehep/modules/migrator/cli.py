@@ -29,6 +29,7 @@ import os
 import sys
 import traceback
 from itertools import dropwhile
+from multiprocessing import Pool
 
 import click
 import jsonschema
@@ -37,13 +38,16 @@ from flask_cli import with_appcontext
 
 from dojson.contrib.marc21.utils import create_record
 
+from invenio_db import db
+
 from inspire_dojson import marcxml2record
 from inspire_schemas.api import validate
 from inspire_utils.helpers import force_list
 
-from .models import InspireProdRecords
+from .models import InspireProdRecords, decompress_marcxml
 from .tasks import (
     add_citation_counts,
+    get_continuous_migration_stats,
     migrate,
     migrate_chunk,
     remigrate_records,
@@ -77,26 +81,32 @@ def migrator():
               default=False, help='Remigrate all records')
 @click.option('--wait', '-w', type=bool, default=False,
               help='Wait for migrator to complete.')
+@click.option('--shared', '-s', is_flag=True, default=False,
+              help='Send to the workers ranges of the file, which must be on shared storage.')
+@click.option('--force', is_flag=True, default=False,
+              help='Remigrate also the records unchanged since their last migration.')
 def populate(file_input=None,
              remigrate_broken=False,
              remigrate_all=False,
-             wait=False):
+             wait=False,
+             shared=False,
+             force=False):
     """Populates the system with records from migrator files.
 
     Usage: inveniomanage migrator populate -f prodsync20151117173222.xml.gz
     """
     if remigrate_broken:
         click.echo("Remigrate broken records...")
-        remigrate_records.delay(only_broken=True)
+        remigrate_records.delay(only_broken=True, force=force)
     elif remigrate_all:
         click.echo("Remigrate all records...")
-        remigrate_records.delay(only_broken=False)
+        remigrate_records.delay(only_broken=False, force=force)
     elif file_input and not os.path.isfile(file_input):
         click.echo("{0} is not a file!".format(file_input), err=True)
     elif file_input:
         click.echo("Migrating records from file: {0}".format(file_input))
 
-        migrate(os.path.abspath(file_input), wait_for_results=wait)
+        migrate(os.path.abspath(file_input), wait_for_results=wait, shared=shared)
 
 
 @migrator.command()
@@ -115,82 +125,126 @@ def count_citations():
     add_citation_counts()
 
 
+@migrator.command()
+@with_appcontext
+def continuous_stats():
+    """Reports the backlog and drain rate of the continuous migration."""
+    stats = get_continuous_migration_stats()
+    click.echo("Backlog: {} records".format(stats['backlog']))
+    if 'drain_rate' in stats:
+        click.echo(
+            "Last batch: {:.0f} records in {:.2f}s ({:.2f} records/s)".format(
+                stats['last_batch_size'],
+                stats['last_batch_seconds'],
+                stats['drain_rate'],
+            )
+        )
+
+
+def get_collection(marc_record):
+    collections = set()
+    for field in force_list(marc_record.get('980__')):
+        for v in field.values():
+            for e in force_list(v):
+                collections.add(e.upper().strip())
+    if 'DELETED' in collections:
+        return 'DELETED'
+    for collection in collections:
+        if collection in REAL_COLLECTIONS:
+            return collection
+    return 'HEP'
+
+
+def check_broken_record(marcxml):
+    """Find why a record could not be migrated.
+
+    Runs in the worker processes of ``reporterrors``, so it only returns
+    plain values that can be sent back to the parent.
+
+    Returns:
+        tuple: ``(collection, stage, error, recid, details)``, or ``None``
+        if the record is deleted or has no error.
+    """
+    marc_record = create_record(marcxml, keep_singletons=False)
+    collection = get_collection(marc_record)
+    if 'DELETED' in collection:
+        return None
+    recid = int(marc_record['001'])
+    try:
+        json_record = marcxml2record(marcxml)
+    except Exception:
+        tb = u''.join(traceback.format_tb(sys.exc_info()[2]))
+        return collection, 'dojson', tb, recid, None
+
+    try:
+        validate(json_record)
+    except jsonschema.exceptions.ValidationError as err:
+        exc = [
+            row
+            for row in str(err).splitlines()
+            if row.startswith('Failed validating')
+        ][0]
+        details = u'\n'.join(
+            dropwhile(
+                lambda x: not x.startswith('On instance'),
+                str(err).splitlines()
+            )
+        )
+        return collection, 'validation', exc, recid, details
+
+    return None
+
+
 @migrator.command()
 @click.option('--output', '-o', default="/tmp/broken-records.csv",
               help='Specifiy where to report errors.')
+@click.option('--jobs', '-j', type=int, default=None,
+              help='Number of processes checking the records, defaults to the number of CPUs.')
 @with_appcontext
-def reporterrors(output):
+def reporterrors(output, jobs):
     """Reports in a friendly way all failed records and corresponding motivation."""
-    def get_collection(marc_record):
-        collections = set()
-        for field in force_list(marc_record.get('980__')):
-            for v in field.values():
-                for e in force_list(v):
-                    collections.add(e.upper().strip())
-        if 'DELETED' in collections:
-            return 'DELETED'
-        for collection in collections:
-            if collection in REAL_COLLECTIONS:
-                return collection
-        return 'HEP'
-
     click.echo("Reporting broken records into {0}".format(output))
-    errors = {}
-    results = InspireProdRecords.query.filter(InspireProdRecords.valid == False) # noqa: ignore=F712
+    pool = Pool(processes=jobs)
+    dojson_errors = {}
+    results = db.session.query(InspireProdRecords._marcxml).filter(
+        InspireProdRecords.valid == False  # noqa: ignore=F712
+    )
     results_length = results.count()
-    with click.progressbar(results.yield_per(100), length=results_length) as bar:
-        for obj in bar:
-            marc_record = create_record(obj.marcxml, keep_singletons=False)
-            collection = get_collection(marc_record)
-            if 'DELETED' in collection:
-                continue
-            recid = int(marc_record['001'])
-            try:
-                json_record = marcxml2record(obj.marcxml)
-            except Exception as err:
-                tb = u''.join(traceback.format_tb(sys.exc_info()[2]))
-                errors.setdefault((collection, 'dojson', tb), []).append(recid)
-                continue
-
-            try:
-                validate(json_record)
-            except jsonschema.exceptions.ValidationError as err:
-                exc = [
-                    row
-                    for row in str(err).splitlines()
-                    if row.startswith('Failed validating')
-                ][0]
-                details = u'\n'.join(
-                    dropwhile(
-                        lambda x: not x.startswith('On instance'),
-                        str(err).splitlines()
-                    )
-                )
-                errors.setdefault(
-                    (collection, 'validation', exc), []
-                ).append((recid, details))
-                continue
-
+    marcxmls = (
+        decompress_marcxml(row._marcxml) for row in
+        results.execution_options(stream_results=True).yield_per(100)
+    )
     with open(output, "w") as out:
         csv_writer = csv.writer(out)
-        for (collection, stage, error), elements in errors.iteritems():
-            if stage == 'dojson':
-                csv_writer.writerow((
-                    collection,
-                    stage,
-                    error,
-                    '\n'.join(
-                        'http://inspirehep.net/record/{}'.format(recid)
-                        for recid in elements
-                    )
-                ))
-            else:
-                for recid, details in elements:
-                    csv_writer.writerow((
-                        collection,
-                        stage,
-                        error,
-                        'http://inspirehep.net/record/{}'.format(recid),
-                        details
-                    ))
+        try:
+            checked = pool.imap_unordered(check_broken_record, marcxmls, chunksize=10)
+            with click.progressbar(checked, length=results_length) as bar:
+                for broken in bar:
+                    if broken is None:
+                        continue
+                    collection, stage, error, recid, details = broken
+                    if stage == 'dojson':
+                        dojson_errors.setdefault((collection, error), []).append(recid)
+                    else:
+                        csv_writer.writerow((
+                            collection,
+                            stage,
+                            error,
+                            'http://inspirehep.net/record/{}'.format(recid),
+                            details
+                        ))
+        finally:
+            pool.close()
+            pool.join()
+
+        for (collection, error), recids in dojson_errors.items():
+            csv_writer.writerow((
+                collection,
+                'dojson',
+                error,
+                '\n'.join(
+                    'http://inspirehep.net/record/{}'.format(recid)
+                    for recid in recids
+                )
+            ))
     click.echo("Dumped errors into {}".format(output))
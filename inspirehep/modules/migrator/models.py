@@ -31,6 +31,14 @@ from invenio_db import db
 from sqlalchemy.ext.hybrid import hybrid_property
 
 
+def decompress_marcxml(value):
+    """Decompress a stored marcxml, which Legacy may have left uncompressed."""
+    try:
+        return decompress(value)
+    except error:
+        return value
+
+
 class InspireProdRecords(db.Model):
     __tablename__ = 'inspire_prod_records'
 
@@ -39,15 +47,12 @@ class InspireProdRecords(db.Model):
     _marcxml = db.Column('marcxml', db.LargeBinary, nullable=False)
     valid = db.Column(db.Boolean, default=None, nullable=True, index=True)
     errors = db.Column(db.Text(), nullable=True)
+    content_hash = db.Column(db.String(40), nullable=True)
 
     @hybrid_property
     def marcxml(self):
         """marcxml column wrapper to compress/decompress on the fly."""
-        try:
-            return decompress(self._marcxml)
-        except error:
-            # Legacy uncompress data?
-            return self._marcxml
+        return decompress_marcxml(self._marcxml)
 
     @marcxml.setter
     def marcxml(self, value):
@@ -25,14 +25,20 @@
 from __future__ import absolute_import, division, print_function
 
 import gzip
+import hashlib
 import logging
+import mmap
+import os
 import re
+import shutil
+import time
 import zlib
 from collections import Counter
 from datetime import datetime
 from itertools import chain
 
 import click
+import pkg_resources
 from celery import group, shared_task
 from elasticsearch.helpers import bulk as es_bulk
 from elasticsearch.helpers import scan as es_scan
@@ -42,6 +48,7 @@ from jsonschema import ValidationError
 from redis import StrictRedis
 from redis_lock import Lock
 from six import text_type
+from sqlalchemy.dialects.postgresql import insert
 
 from invenio_db import db
 from invenio_indexer.api import RecordIndexer, current_record_to_index
@@ -59,8 +66,9 @@ from inspirehep.modules.pidstore.minters import inspire_recid_minter
 from inspirehep.modules.pidstore.utils import get_pid_type_from_schema
 from inspirehep.modules.records.api import InspireRecord
 from inspirehep.modules.records.receivers import index_after_commit
+from inspirehep.modules.records.utils import bump_index_generation
 
-from .models import InspireProdRecords
+from .models import InspireProdRecords, decompress_marcxml
 
 
 LOGGER = logging.getLogger(__name__)
@@ -69,6 +77,13 @@ CHUNK_SIZE = 100
 LARGE_CHUNK_SIZE = 2000
 
 split_marc = re.compile('<record.*?>.*?</record>', re.DOTALL)
+split_marc_bytes = re.compile(b'<record.*?>.*?</record>', re.DOTALL)
+marc_recid = re.compile(r'<controlfield tag="001">\s*(\d+)\s*</controlfield>')
+
+CONVERTER_VERSION = u'inspire-dojson {}, inspire-schemas {}'.format(
+    pkg_resources.get_distribution('inspire-dojson').version,
+    pkg_resources.get_distribution('inspire-schemas').version,
+)
 
 
 def chunker(iterable, chunksize=CHUNK_SIZE):
@@ -103,12 +118,82 @@ def split_stream(stream):
             buf.append(row)
 
 
+def split_dump_into_ranges(path, chunksize=CHUNK_SIZE):
+    """Split an uncompressed dump into ranges of ``chunksize`` records.
+
+    Args:
+        path(str): path of the MARCXML dump.
+        chunksize(int): number of records in each range.
+
+    Yields:
+        tuple: the ``(offset, length)`` in bytes of each range.
+    """
+    if not os.path.getsize(path):
+        return
+
+    with open(path, 'rb') as fd:
+        dump = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            matches = split_marc_bytes.finditer(dump)
+            for chunk in chunker(matches, chunksize):
+                offset = chunk[0].start()
+                yield offset, chunk[-1].end() - offset
+        finally:
+            dump.close()
+
+
+def read_dump_range(path, offset, length):
+    """Read the records of a range of an uncompressed dump.
+
+    Args:
+        path(str): path of the MARCXML dump.
+        offset(int): offset in bytes of the range.
+        length(int): length in bytes of the range.
+
+    Returns:
+        list: the MARCXML of the records in the range.
+    """
+    with open(path, 'rb') as fd:
+        dump = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return [
+                match.group() for match in
+                split_marc_bytes.finditer(dump, offset, offset + length)
+            ]
+        finally:
+            dump.close()
+
+
+def get_shared_dump(source):
+    """Return the path of the uncompressed dump readable by the workers.
+
+    Gzipped dumps are decompressed in ``RECORDS_MIGRATION_SHARED_DIR``,
+    or next to the original dump if it is not set.
+    """
+    source = os.path.abspath(source)
+    if not source.endswith('.gz'):
+        return source
+
+    shared_dir = current_app.config.get('RECORDS_MIGRATION_SHARED_DIR') or \
+        os.path.dirname(source)
+    path = os.path.join(shared_dir, os.path.basename(source)[:-len('.gz')])
+    with gzip.open(source, 'rb') as fd, open(path, 'wb') as out:
+        shutil.copyfileobj(fd, out)
+
+    return path
+
+
 @shared_task(ignore_result=True)
-def remigrate_records(only_broken=True, skip_files=None):
+def remigrate_records(only_broken=True, skip_files=None, force=False):
     """Remigrate records.
 
     Directly migrates the records (declared as broken), e.g. if the dojson
-    conversion script have been corrected.
+    conversion script have been corrected. Valid records that were migrated
+    by the same version of the converter are skipped, unless ``force`` is
+    set.
+
+    Returns:
+        int: the number of records skipped.
     """
     if skip_files is None:
         skip_files = current_app.config.get(
@@ -116,29 +201,63 @@ def remigrate_records(only_broken=True, skip_files=None):
              False,
         )
 
-    query = db.session.query(InspireProdRecords)
+    query = db.session.query(
+        InspireProdRecords._marcxml,
+        InspireProdRecords.content_hash,
+        InspireProdRecords.valid,
+    )
     if only_broken:
         query = query.filter_by(valid=False)
+    query = query.execution_options(stream_results=True)
 
+    skipped = 0
     for i, chunk in enumerate(chunker(query.yield_per(CHUNK_SIZE))):
-        records = [record.marcxml for record in chunk]
+        records = []
+        for row in chunk:
+            marcxml = decompress_marcxml(row._marcxml)
+            if not force and row.valid and \
+                    row.content_hash == get_content_hash(marcxml):
+                skipped += 1
+            else:
+                records.append(marcxml)
         LOGGER.info("Processed {} records".format(i * CHUNK_SIZE))
-        migrate_chunk.delay(records, skip_files=skip_files)
+        if records:
+            migrate_chunk.delay(records, skip_files=skip_files)
+
+    LOGGER.info(
+        "Skipped {} records unchanged since their last migration".format(skipped))
+    return skipped
 
 
 @shared_task(ignore_result=True)
-def migrate(source, wait_for_results=False, skip_files=None):
-    """Main migration function."""
+def migrate(source, wait_for_results=False, skip_files=None, shared=False):
+    """Main migration function.
+
+    If ``shared`` is set, the dump must be on a storage shared with the
+    workers, which receive only the ranges of the dump they have to migrate
+    instead of the records themselves.
+    """
     if skip_files is None:
         skip_files = current_app.config.get(
              'RECORDS_MIGRATION_SKIP_FILES',
              False,
         )
 
-    if source.endswith('.gz'):
-        fd = gzip.open(source)
+    if shared:
+        path = get_shared_dump(source)
+        signatures = (
+            migrate_dump_range.s(path, offset, length, skip_files=skip_files)
+            for offset, length in split_dump_into_ranges(path, CHUNK_SIZE)
+        )
     else:
-        fd = open(source)
+        if source.endswith('.gz'):
+            fd = gzip.open(source)
+        else:
+            fd = open(source)
+        signatures = (
+            migrate_chunk.s(chunk, skip_files=skip_files)
+            for chunk in chunker(split_stream(fd), CHUNK_SIZE)
+        )
 
     if wait_for_results:
         # if the wait_for_results is true we enable returning results from migrate_chunk task
@@ -147,12 +266,12 @@ def migrate(source, wait_for_results=False, skip_files=None):
         tasks = []
         migrate_chunk.ignore_result = False
 
-    for i, chunk in enumerate(chunker(split_stream(fd), CHUNK_SIZE)):
+    for i, signature in enumerate(signatures):
         print("Processed {} records".format(i * CHUNK_SIZE))
         if wait_for_results:
-            tasks.append(migrate_chunk.s(chunk, skip_files=skip_files))
+            tasks.append(signature)
         else:
-            migrate_chunk.delay(chunk, skip_files=skip_files)
+            signature.delay()
 
     if wait_for_results:
         job = group(tasks)
@@ -162,34 +281,79 @@ def migrate(source, wait_for_results=False, skip_files=None):
         print('All migration tasks have been completed.')
 
 
+LEGACY_RECORDS_KEY = 'legacy_records'
+CONTINUOUS_MIGRATION_STATS_KEY = 'continuous_migration_stats'
+
+
 @shared_task(ignore_result=True)
-def continuous_migration(skip_files=None):
-    """Task to continuously migrate what is pushed up by Legacy."""
+def continuous_migration(skip_files=None, batch_size=None):
+    """Task to continuously migrate what is pushed up by Legacy.
+
+    The records are consumed in batches of ``RECORDS_MIGRATION_BATCH_SIZE``,
+    each migrated with one commit and indexed with one bulk request. A batch
+    is removed from the queue only after it has been migrated.
+    """
     if skip_files is None:
         skip_files = current_app.config.get(
              'RECORDS_MIGRATION_SKIP_FILES',
              False,
         )
+    if batch_size is None:
+        batch_size = current_app.config.get('RECORDS_MIGRATION_BATCH_SIZE', CHUNK_SIZE)
     redis_url = current_app.config.get('CACHE_REDIS_URL')
     r = StrictRedis.from_url(redis_url)
     lock = Lock(r, 'continuous_migration', expire=120, auto_renewal=True)
     if lock.acquire(blocking=False):
         try:
-            while r.llen('legacy_records'):
-                raw_record = r.lrange('legacy_records', 0, 0)
-                if raw_record:
-                    migrate_and_insert_record(
-                        zlib.decompress(raw_record[0]),
-                        skip_files=skip_files,
-                    )
-                    db.session.commit()
-                r.lpop('legacy_records')
+            while True:
+                raw_records = r.lrange(LEGACY_RECORDS_KEY, 0, batch_size - 1)
+                if not raw_records:
+                    break
+                start = time.time()
+                migrate_and_index_chunk(
+                    [zlib.decompress(raw_record) for raw_record in raw_records],
+                    skip_files=skip_files,
+                )
+                # Legacy only appends to the queue, so its head is still
+                # the batch that was read.
+                r.ltrim(LEGACY_RECORDS_KEY, len(raw_records), -1)
+                _store_continuous_migration_stats(
+                    r, len(raw_records), time.time() - start)
         finally:
             lock.release()
     else:
         LOGGER.info("Continuous_migration already executed. Skipping.")
 
 
+def _store_continuous_migration_stats(r, batch_size, elapsed):
+    r.hmset(CONTINUOUS_MIGRATION_STATS_KEY, {
+        'last_batch_size': batch_size,
+        'last_batch_seconds': elapsed,
+        'drain_rate': batch_size / elapsed if elapsed else batch_size,
+        'updated': time.time(),
+    })
+
+
+def get_continuous_migration_stats():
+    """Return the state of the queue of records pushed up by Legacy.
+
+    Returns:
+        dict: the ``backlog`` of records in the queue and, once a batch has
+        been migrated, the ``drain_rate`` in records per second of the last
+        batch, its size, its duration, and when it was migrated.
+    """
+    redis_url = current_app.config.get('CACHE_REDIS_URL')
+    r = StrictRedis.from_url(redis_url)
+
+    stats = {
+        key.decode('utf-8') if isinstance(key, bytes) else key: float(value)
+        for key, value in r.hgetall(CONTINUOUS_MIGRATION_STATS_KEY).items()
+    }
+    stats['backlog'] = r.llen(LEGACY_RECORDS_KEY)
+
+    return stats
+
+
 def create_index_op(record):
     index, doc_type = current_record_to_index(record)
 
@@ -204,24 +368,103 @@ def create_index_op(record):
     }
 
 
-@shared_task(ignore_result=False, compress='zlib', acks_late=True)
-def migrate_chunk(chunk, skip_files=False):
+def get_content_hash(raw_record):
+    """Return the hash of a MARCXML record and of the converter version."""
+    if isinstance(raw_record, text_type):
+        raw_record = raw_record.encode('utf8')
+
+    content = CONVERTER_VERSION.encode('utf8') + b'\0' + raw_record
+    return hashlib.sha1(content).hexdigest()
+
+
+def get_recid_from_marcxml(raw_record):
+    if isinstance(raw_record, bytes):
+        raw_record = raw_record.decode('utf8')
+
+    match = marc_recid.search(raw_record)
+    if match:
+        return int(match.group(1))
+
+
+def get_stored_content_hashes(recids):
+    """Return the content hashes of the valid records among ``recids``."""
+    if not recids:
+        return {}
+
+    query = db.session.query(
+        InspireProdRecords.recid,
+        InspireProdRecords.content_hash,
+    ).filter(
+        InspireProdRecords.recid.in_(recids),
+        InspireProdRecords.valid == True,  # noqa: ignore=E712
+    )
+    return dict(query)
+
+
+def upsert_prod_records(prod_records):
+    """Insert or update the ``InspireProdRecords`` rows in one statement."""
+    # A chunk can contain several versions of a record, keep the last one.
+    prod_records = list({
+        prod_record['recid']: prod_record for prod_record in prod_records
+    }.values())
+    if not prod_records:
+        return
+
+    statement = insert(InspireProdRecords.__table__).values(prod_records)
+    statement = statement.on_conflict_do_update(
+        index_elements=['recid'],
+        set_={
+            column: statement.excluded[column]
+            for column in prod_records[0]
+            if column != 'recid'
+        },
+    )
+    db.session.execute(statement)
+
+
+def migrate_and_index_chunk(chunk, skip_files=False):
+    """Migrate raw records with one commit and index them in bulk.
+
+    Records already migrated from the same MARCXML by the same version of
+    the converter are skipped.
+
+    Returns:
+        int: the number of records migrated successfully.
+    """
     models_committed.disconnect(index_after_commit)
 
     index_queue = []
+    prod_records = []
+    skipped = 0
 
     try:
-        for raw_record in chunk:
+        recids = [get_recid_from_marcxml(raw_record) for raw_record in chunk]
+        stored_hashes = get_stored_content_hashes(
+            [recid for recid in recids if recid])
+        for recid, raw_record in zip(recids, chunk):
+            content_hash = get_content_hash(raw_record)
+            if recid and stored_hashes.get(recid) == content_hash:
+                skipped += 1
+                continue
+            stored_hashes.pop(recid, None)
+
             with db.session.begin_nested():
-                record = migrate_and_insert_record(
+                record, prod_record = migrate_and_insert_record(
                     raw_record,
                     skip_files=skip_files,
                 )
+                if prod_record:
+                    prod_records.append(prod_record)
                 if record:
                     index_queue.append(create_index_op(record))
+        upsert_prod_records(prod_records)
         db.session.commit()
     finally:
         db.session.close()
+        models_committed.connect(index_after_commit)
+
+    if skipped:
+        LOGGER.info("Skipped {} unchanged records".format(skipped))
 
     req_timeout = current_app.config['INDEXER_BULK_REQUEST_TIMEOUT']
     es_bulk(
@@ -230,8 +473,23 @@ def migrate_chunk(chunk, skip_files=False):
         stats_only=True,
         request_timeout=req_timeout,
     )
+    bump_index_generation()
+
+    return len(index_queue)
 
-    models_committed.connect(index_after_commit)
+
+@shared_task(ignore_result=False, compress='zlib', acks_late=True)
+def migrate_chunk(chunk, skip_files=False):
+    migrate_and_index_chunk(chunk, skip_files=skip_files)
+
+
+@shared_task(ignore_result=False, acks_late=True)
+def migrate_dump_range(path, offset, length, skip_files=False):
+    """Migrate the records of a range of a dump on shared storage."""
+    migrate_and_index_chunk(
+        read_dump_range(path, offset, length),
+        skip_files=skip_files,
+    )
 
 
 @shared_task()
@@ -297,6 +555,7 @@ def add_citation_counts(chunk_size=500, request_timeout=120):
         request_timeout=request_timeout,
         stats_only=True,
     )
+    bump_index_generation()
     click.echo('... DONE: {} records updated with success. {} failures.'.format(
         success, failed))
 
@@ -329,7 +588,13 @@ def record_insert_or_replace(json, skip_files=False):
 
 
 def migrate_and_insert_record(raw_record, skip_files=False):
-    """Convert a marc21 record to JSON and insert it into the DB."""
+    """Convert a marc21 record to JSON and insert it into the DB.
+
+    Returns:
+        tuple: the inserted record, or ``None`` if it is invalid, and the
+        values of its ``InspireProdRecords`` row, to be upserted by the
+        caller, or ``None`` if the record has no recid.
+    """
     error = None
 
     try:
@@ -343,9 +608,18 @@ def migrate_and_insert_record(raw_record, skip_files=False):
         LOGGER.exception('Migrator DoJSON Error')
         error = e
 
-    recid = json_record['control_number']
-    prod_record = InspireProdRecords(recid=recid)
-    prod_record.marcxml = raw_record
+    if error:
+        recid = get_recid_from_marcxml(raw_record)
+        if recid is None:
+            return None, None
+    else:
+        recid = json_record['control_number']
+    prod_record = {
+        'recid': recid,
+        'marcxml': zlib.compress(raw_record),
+        'content_hash': get_content_hash(raw_record),
+        'last_updated': datetime.utcnow(),
+    }
 
     try:
         if not error:
@@ -363,12 +637,11 @@ def migrate_and_insert_record(raw_record, skip_files=False):
 
     if error:
         # Invalid record, will not get indexed.
-        error_str = u'{0}: Record {1}: {2}'.format(type(error), recid, e)
-        prod_record.valid = False
-        prod_record.errors = error_str
-        db.session.merge(prod_record)
-        return None
+        error_str = u'{0}: Record {1}: {2}'.format(type(error), recid, error)
+        prod_record['valid'] = False
+        prod_record['errors'] = error_str
+        return None, prod_record
     else:
-        prod_record.valid = True
-        db.session.merge(prod_record)
-        return record
+        prod_record['valid'] = True
+        prod_record['errors'] = None
+        return record, prod_record
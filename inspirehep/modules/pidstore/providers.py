@@ -24,14 +24,27 @@
 
 from __future__ import absolute_import, division, print_function
 
+import logging
+
 import requests
 from flask import current_app
+from redis import StrictRedis
 
 from invenio_pidstore.models import PIDStatus, RecordIdentifier
 from invenio_pidstore.providers.base import BaseProvider
 
 
-def _get_next_pid_from_legacy():
+LOGGER = logging.getLogger(__name__)
+
+LEGACY_PID_POOL_KEY = 'legacy_pid_pool'
+LEGACY_PID_POOL_REFILL_KEY = 'legacy_pid_pool_refill'
+
+
+def _get_redis():
+    return StrictRedis.from_url(current_app.config.get('CACHE_REDIS_URL'))
+
+
+def _request_pid_from_legacy(session=requests):
     """Reserve the next pid on legacy.
 
     Sends a request to a legacy instance to reserve the next available
@@ -42,11 +55,65 @@ def _get_next_pid_from_legacy():
     }
 
     url = current_app.config.get('LEGACY_PID_PROVIDER')
-    next_pid = requests.get(url, headers=headers).json()
+    next_pid = session.get(url, headers=headers).json()
 
     return next_pid
 
 
+def _schedule_pool_refill(r):
+    from inspirehep.modules.pidstore.tasks import refill_legacy_pid_pool
+
+    # The refill task deletes the marker when it is done, the timeout only
+    # guards against a refill that never ran.
+    if r.set(LEGACY_PID_POOL_REFILL_KEY, 1, nx=True, ex=600):
+        refill_legacy_pid_pool.delay()
+
+
+def _get_next_pid_from_legacy():
+    """Take the next pid reserved on legacy.
+
+    The pids are taken from a pool, kept in Redis so that it survives
+    restarts and is shared by all the workers, of up to
+    ``LEGACY_PID_PROVIDER_POOL_SIZE`` pids reserved in advance. When it
+    runs below ``LEGACY_PID_PROVIDER_POOL_LOW_WATER_MARK`` it is refilled
+    asynchronously, and while it is empty the pids are reserved on demand.
+    """
+    if not current_app.config.get('LEGACY_PID_PROVIDER_POOL_SIZE'):
+        return _request_pid_from_legacy()
+
+    r = _get_redis()
+    next_pid = r.lpop(LEGACY_PID_POOL_KEY)
+    if r.llen(LEGACY_PID_POOL_KEY) < current_app.config.get(
+            'LEGACY_PID_PROVIDER_POOL_LOW_WATER_MARK', 0):
+        _schedule_pool_refill(r)
+
+    if next_pid is None:
+        LOGGER.warning('Legacy pid pool is empty, reserving a pid on demand.')
+        return _request_pid_from_legacy()
+
+    return int(next_pid)
+
+
+def refill_pool():
+    """Reserve pids on legacy until the pool is full.
+
+    Returns:
+        int: the number of pids added to the pool.
+    """
+    r = _get_redis()
+    size = current_app.config.get('LEGACY_PID_PROVIDER_POOL_SIZE', 0)
+
+    added = 0
+    with requests.Session() as session:
+        for _ in range(size - r.llen(LEGACY_PID_POOL_KEY)):
+            # Push the pids one by one, so that none is lost if the refill
+            # is interrupted.
+            r.rpush(LEGACY_PID_POOL_KEY, _request_pid_from_legacy(session))
+            added += 1
+
+    return added
+
+
 class InspireRecordIdProvider(BaseProvider):
     """Record identifier provider."""
 
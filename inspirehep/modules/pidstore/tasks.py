@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""PID store tasks."""
+
+from __future__ import absolute_import, division, print_function
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from inspirehep.modules.pidstore.providers import (
+    LEGACY_PID_POOL_REFILL_KEY,
+    _get_redis,
+    refill_pool,
+)
+
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(ignore_result=True)
+def refill_legacy_pid_pool():
+    """Fill the pool of pids reserved on legacy."""
+    try:
+        added = refill_pool()
+        logger.info('Reserved %s pids on legacy', added)
+    finally:
+        _get_redis().delete(LEGACY_PID_POOL_REFILL_KEY)
@@ -25,16 +25,24 @@
 from __future__ import absolute_import, division, print_function
 
 import copy
+import hashlib
+import sys
+import tempfile
 from datetime import datetime
+from itertools import chain
+from multiprocessing.pool import ThreadPool
 
 import arrow
+import six
 from elasticsearch.exceptions import NotFoundError
 from flask import current_app
 from fs.opener import fsopen
 
 from inspire_schemas.api import validate
 from inspire_schemas.builders import LiteratureBuilder
-from invenio_files_rest.models import Bucket
+from inspire_utils.dedupers import dedupe_list
+from invenio_files_rest.errors import InvalidOperationError
+from invenio_files_rest.models import Bucket, ObjectVersion
 from invenio_pidstore.errors import PIDDoesNotExistError
 from invenio_pidstore.models import PersistentIdentifier
 from invenio_records_files.api import Record
@@ -47,6 +55,75 @@ from inspirehep.utils.record_getter import (
 
 
 MAX_UNIQUE_KEY_COUNT = 50000
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _download_to_temporary_file(url):
+    """Download ``url`` to a temporary file.
+
+    Returns:
+        tuple: the temporary file, positioned at its start, and the checksum
+        of its contents, in the format used by ``FileInstance``.
+    """
+    md5 = hashlib.md5()
+    temporary_file = tempfile.TemporaryFile()
+    try:
+        stream = fsopen(url, mode='rb')
+        try:
+            while True:
+                chunk = stream.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                md5.update(chunk)
+                temporary_file.write(chunk)
+        finally:
+            stream.close()
+    except Exception:
+        temporary_file.close()
+        raise
+
+    temporary_file.seek(0)
+    return temporary_file, 'md5:{}'.format(md5.hexdigest())
+
+
+def _download_files(urls):
+    """Download ``urls`` in parallel, see ``RECORDS_FILES_DOWNLOAD_POOL_SIZE``.
+
+    If a download fails, the files already downloaded are closed once all
+    the downloads are over, and the first error is raised.
+
+    Returns:
+        dict: the temporary file and checksum of each url, see
+        :func:`_download_to_temporary_file`.
+    """
+    if not urls:
+        return {}
+
+    pool_size = current_app.config.get('RECORDS_FILES_DOWNLOAD_POOL_SIZE', 1)
+    pool = ThreadPool(max(1, min(pool_size, len(urls))))
+    try:
+        results = [
+            pool.apply_async(_download_to_temporary_file, (url,))
+            for url in urls
+        ]
+        downloads = {}
+        error = None
+        for url, result in zip(urls, results):
+            try:
+                downloads[url] = result.get()
+            except Exception:
+                if error is None:
+                    error = sys.exc_info()
+    finally:
+        pool.close()
+        pool.join()
+
+    if error is not None:
+        for temporary_file, _ in downloads.values():
+            temporary_file.close()
+        six.reraise(*error)
+
+    return downloads
 
 
 class InspireRecord(Record):
@@ -212,31 +289,99 @@ class InspireRecord(Record):
             TypeError: if not ``file_name`` nor ``key`` are passed (one of
                 them is required).
         """
-        if not key and not file_name:
-            raise TypeError(
-                'No file_name and no key passed, at least one of them is '
-                'needed.'
-            )
+        return self.add_documents_and_figures([{
+            'metadata': metadata,
+            'stream': stream,
+            'is_document': is_document,
+            'file_name': file_name,
+            'key': key,
+        }])[0]
+
+    def add_documents_and_figures(self, documents_and_figures):
+        """Add many documents and figures to the record at once.
 
-        if not key:
-            key = self._get_unique_files_key(base_file_name=file_name)
+        Unlike calling :meth:`add_document_or_figure` for each of them, the
+        files of the record are listed, and the record copied and updated,
+        only once for the whole list.
+
+        Args:
 
-        if stream is not None:
-            self.files[key] = stream
+            documents_and_figures(list): for each document or figure, a dict
+                with the arguments of :meth:`add_document_or_figure`. It can
+                also contain a ``file_instance``, an existing
+                ``FileInstance`` to use instead of copying a ``stream``.
+                Entries passing the same ``stream`` share the same file.
+
+
+        Returns:
+
+            list: metadata of the added documents and figures.
+
+
+        Raises:
+
+            TypeError: if not ``file_name`` nor ``key`` are passed for an
+                entry (one of them is required).
+
+            InvalidOperationError: if the bucket of the record is locked or
+                deleted.
+        """
+        files = self.files
+        if files.bucket.locked or files.bucket.deleted:
+            raise InvalidOperationError()
+
+        keys = set(files.keys)
+        files_by_stream = {}
+
+        added = []
+        with db.session.begin_nested():
+            for doc_or_fig in documents_and_figures:
+                key = doc_or_fig.get('key')
+                file_name = doc_or_fig.get('file_name')
+                if not key and not file_name:
+                    raise TypeError(
+                        'No file_name and no key passed, at least one of them '
+                        'is needed.'
+                    )
+
+                if not key:
+                    key = self._get_unique_files_key(
+                        base_file_name=file_name,
+                        existing_keys=keys,
+                    )
+                keys.add(key)
+
+                stream = doc_or_fig.get('stream')
+                file_instance = doc_or_fig.get('file_instance')
+                if stream is not None and id(stream) in files_by_stream:
+                    file_instance = files_by_stream[id(stream)]
+
+                if file_instance is not None:
+                    ObjectVersion.create(
+                        files.bucket, key, _file_id=file_instance.id)
+                elif stream is not None:
+                    obj = ObjectVersion.create(files.bucket, key, stream=stream)
+                    files_by_stream[id(stream)] = obj.file
+
+                metadata = doc_or_fig['metadata']
+                metadata['key'] = key
+                metadata['url'] = '/api/files/{bucket}/{key}'.format(
+                    bucket=files.bucket.id,
+                    key=key,
+                )
+                added.append((doc_or_fig.get('is_document', True), metadata))
+
+            files.flush()
 
         builder = LiteratureBuilder(record=self.dumps())
-        metadata['key'] = key
-        metadata['url'] = '/api/files/{bucket}/{key}'.format(
-            bucket=self.files[key].bucket_id,
-            key=key,
-        )
-        if is_document:
-            builder.add_document(**metadata)
-        else:
-            builder.add_figure(**metadata)
+        for is_document, metadata in added:
+            if is_document:
+                builder.add_document(**metadata)
+            else:
+                builder.add_figure(**metadata)
 
         super(InspireRecord, self).update(builder.record)
-        return metadata
+        return [metadata for _, metadata in added]
 
     def _resolve_doc_or_fig_url(
         self,
@@ -352,43 +497,6 @@ class InspireRecord(Record):
             doc_or_fig_obj,
         )
 
-    def _download_to_docs_or_figs(
-        self,
-        document=None,
-        figure=None,
-        src_records=(),
-        only_new=False,
-    ):
-        if not document and not figure:
-            raise TypeError(
-                'No document nor figure passed, at least one is needed.'
-            )
-
-        is_document = bool(document)
-        doc_or_fig_obj = self._resolve_doc_or_fig_url(
-            doc_or_fig_obj=document or figure,
-            src_records=src_records,
-            only_new=only_new,
-        )
-        if doc_or_fig_obj['url'].startswith('/api/files/'):
-            return self.add_document_or_figure(
-                metadata=doc_or_fig_obj,
-                key=doc_or_fig_obj['key'],
-                is_document=is_document,
-            )
-
-        key = doc_or_fig_obj['key']
-        if key not in self.files:
-            key = self._get_unique_files_key(base_file_name=key)
-
-        stream = fsopen(doc_or_fig_obj['url'], mode='rb')
-        return self.add_document_or_figure(
-            metadata=doc_or_fig_obj,
-            key=key,
-            stream=stream,
-            is_document=is_document,
-        )
-
     def download_documents_and_figures(self, only_new=False, src_records=()):
         """Gets all the documents and figures of the record, and downloads them
         to the files property.
@@ -439,6 +547,10 @@ class InspireRecord(Record):
         * if `url` field does not point to the files api: it will try to
           download the new file.
 
+        The new files are downloaded in parallel, and files with the same
+        contents as another file of the record or of the `src_records`
+        share its ``FileInstance``.
+
         Args:
             only_new(bool): If True, will not re-download any files if the
                 document['key'] matches an existing downloaded file.
@@ -452,21 +564,102 @@ class InspireRecord(Record):
         documents_to_download = self.pop('documents', [])
         figures_to_download = self.pop('figures', [])
 
-        for document in documents_to_download:
-            self._download_to_docs_or_figs(
-                document=document,
+        docs_and_figs = [
+            (is_document, self._resolve_doc_or_fig_url(
+                doc_or_fig_obj=doc_or_fig,
                 src_records=src_records,
                 only_new=only_new,
+            ))
+            for is_document, docs_or_figs in (
+                (True, documents_to_download),
+                (False, figures_to_download),
             )
+            for doc_or_fig in docs_or_figs
+        ]
+
+        src_files = {
+            src_file.file.uri: src_file.file
+            for src_record in src_records
+            for src_file in src_record.files
+        }
+        downloads = _download_files(dedupe_list([
+            doc_or_fig['url'] for _, doc_or_fig in docs_and_figs
+            if not doc_or_fig['url'].startswith('/api/files/') and
+            doc_or_fig['url'] not in src_files
+        ]))
 
-        for figure in figures_to_download:
-            self._download_to_docs_or_figs(
-                figure=figure,
-                src_records=src_records,
-                only_new=only_new,
+        try:
+            file_instances = {
+                record_file.file.checksum: record_file.file
+                for record in chain([self], src_records)
+                for record_file in record.files
+            }
+            # Downloads with the same contents share the stream of the first.
+            streams = {}
+            deduped_downloads = {
+                url: (streams.setdefault(checksum, stream), checksum)
+                for url, (stream, checksum) in downloads.items()
+            }
+            keys = set(self.files.keys)
+            self.add_documents_and_figures([
+                self._prepare_doc_or_fig(
+                    doc_or_fig,
+                    is_document,
+                    keys,
+                    src_files,
+                    deduped_downloads,
+                    file_instances,
+                )
+                for is_document, doc_or_fig in docs_and_figs
+            ])
+        finally:
+            for temporary_file, _ in downloads.values():
+                temporary_file.close()
+
+    def _prepare_doc_or_fig(
+        self,
+        doc_or_fig_obj,
+        is_document,
+        keys,
+        src_files,
+        downloads,
+        file_instances,
+    ):
+        """Prepare a resolved document or figure for
+        :meth:`add_documents_and_figures`.
+
+        Files with the same contents as a file of this record or of the
+        source records share its ``FileInstance`` instead of being copied
+        again.
+        """
+        doc_or_fig = {
+            'metadata': doc_or_fig_obj,
+            'key': doc_or_fig_obj['key'],
+            'is_document': is_document,
+        }
+        if doc_or_fig_obj['url'].startswith('/api/files/'):
+            return doc_or_fig
+
+        if doc_or_fig['key'] not in keys:
+            doc_or_fig['key'] = self._get_unique_files_key(
+                base_file_name=doc_or_fig['key'],
+                existing_keys=keys,
             )
+        keys.add(doc_or_fig['key'])
 
-    def _get_unique_files_key(self, base_file_name):
+        url = doc_or_fig_obj['url']
+        if url in src_files:
+            doc_or_fig['file_instance'] = src_files[url]
+        else:
+            stream, checksum = downloads[url]
+            if checksum in file_instances:
+                doc_or_fig['file_instance'] = file_instances[checksum]
+            else:
+                doc_or_fig['stream'] = stream
+
+        return doc_or_fig
+
+    def _get_unique_files_key(self, base_file_name, existing_keys=None):
         def _strip_old_control_number(base_name):
             base_name = base_name.split('_', 1)[-1]
             return base_name
@@ -486,9 +679,12 @@ class InspireRecord(Record):
             base_file_name,
         )
 
+        if existing_keys is None:
+            existing_keys = self.files
+
         new_key = prepended_key
         count = 1
-        while new_key in self.files:
+        while new_key in existing_keys:
             new_key = '%s_%s' % (prepended_key, count)
             count += 1
             # This should never happen, but just in case to abort infinite
@@ -22,8 +22,16 @@
 
 from __future__ import absolute_import, division, print_function
 
-from flask import current_app, session
-from flask_principal import ActionNeed
+import time
+
+from flask import current_app, g, session
+from flask_principal import (
+    ActionNeed,
+    AnonymousIdentity,
+    Identity,
+    RoleNeed,
+    UserNeed,
+)
 from flask_security import current_user
 from werkzeug.local import LocalProxy
 
@@ -70,6 +78,7 @@ def load_user_collections(app, user):
                 role_id=role.id).all()]
         )
     session['restricted_collections'] = user_collections
+    session.pop('hidden_collections', None)
 
 
 def load_restricted_collections():
@@ -99,6 +108,56 @@ def load_restricted_collections():
         return restricted_collections
 
 
+def _is_superuser(user):
+    return 'superuser' in [r.name for r in user.roles]
+
+
+def get_hidden_collections():
+    """Get the restricted collections the current user cannot view.
+
+    The result is computed once every ``INSPIRE_COLLECTIONS_RESTRICTED_CACHE_TIMEOUT``
+    seconds and kept in the session of the logged in users. Anonymous users
+    cannot view any restricted collection.
+    """
+    if current_user.is_anonymous:
+        return frozenset(all_restricted_collections)
+    if _is_superuser(current_user):
+        return frozenset()
+
+    timeout = current_app.config.get(
+        'INSPIRE_COLLECTIONS_RESTRICTED_CACHE_TIMEOUT', 120)
+    hidden_collections = session.get('hidden_collections')
+    if hidden_collections and \
+            time.time() - hidden_collections['computed'] < timeout:
+        return frozenset(hidden_collections['collections'])
+
+    collections = all_restricted_collections - user_collections
+    session['hidden_collections'] = {
+        'collections': sorted(collections),
+        'computed': time.time(),
+    }
+    return frozenset(collections)
+
+
+def filter_readable_records(records):
+    """Keep only the records the current user has read access to.
+
+    The restricted collections hidden from the user are computed once, so
+    checking each record is a single set operation.
+
+    :param records: records, or their sources from the search results.
+    :returns: list of the readable records, in the same order.
+    """
+    hidden_collections = get_hidden_collections()
+    if not hidden_collections:
+        return list(records)
+
+    return [
+        record for record in records
+        if hidden_collections.isdisjoint(record.get('_collections', []))
+    ]
+
+
 def record_read_permission_factory(record=None):
     """Record permission factory."""
     return RecordPermission.create(record=record, action='read')
@@ -141,27 +200,43 @@ class RecordPermission(object):
             return cls(record, deny, user)
 
 
+def _get_identity(user):
+    if user.is_anonymous:
+        return AnonymousIdentity()
+
+    identity = Identity(user.id)
+    identity.provides.add(UserNeed(user.id))
+    for role in user.roles:
+        identity.provides.add(RoleNeed(role.name))
+    return identity
+
+
 def has_read_permission(user, record):
-    """Check if user has read access to the record."""
-    def _cant_view(collection):
-        return not Permission(
-            ParameterizedActionNeed(
-                'view-restricted-collection',
-                collection)).can()
+    """Check if user has read access to the record.
 
-    user_roles = [r.name for r in current_user.roles]
-    if 'superuser' in user_roles:
+    The collections the current user can view are taken from the session,
+    where they are loaded at login. For other users, or when the session was
+    not populated, e.g. for API clients authenticated by a token, the access
+    is checked against the identity of the user.
+    """
+    if user is current_user and \
+            (current_user.is_anonymous or 'restricted_collections' in session):
+        return bool(filter_readable_records([record]))
+
+    if _is_superuser(user):
         return True
 
-    if '_collections' in record:
-        record_collections = set(record['_collections'])
-        restricted_coll = all_restricted_collections & record_collections
-        if restricted_coll:
-            if any(map(_cant_view, restricted_coll)):
-                return False
+    if user is current_user:
+        identity = g.identity
+    else:
+        identity = _get_identity(user)
 
-    # By default we allow access
-    return True
+    record_collections = set(record.get('_collections', []))
+    return all(
+        Permission(ParameterizedActionNeed(
+            'view-restricted-collection', collection)).allows(identity)
+        for collection in all_restricted_collections & record_collections
+    )
 
 
 def has_update_permission(user, record):
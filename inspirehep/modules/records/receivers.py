@@ -46,6 +46,7 @@ from inspire_utils.helpers import force_list
 from inspire_utils.name import generate_name_variations
 from inspire_utils.record import get_value
 from inspirehep.modules.authors.utils import phonetic_blocks
+from inspirehep.modules.records.utils import bump_index_generation
 
 
 #
@@ -112,6 +113,7 @@ def index_after_commit(sender, changes):
     has been really committed to the DB.
     """
     indexer = RecordIndexer()
+    indexed = False
 
     for model_instance, change in changes:
         if isinstance(model_instance, RecordMetadata):
@@ -119,6 +121,10 @@ def index_after_commit(sender, changes):
                 indexer.index(Record(model_instance.json, model_instance))
             else:
                 indexer.delete(Record(model_instance.json, model_instance))
+            indexed = True
+
+    if indexed:
+        bump_index_generation()
 
 
 #
@@ -24,7 +24,7 @@
 
 from __future__ import absolute_import, division, print_function
 
-from invenio_records_rest.serializers.response import search_responsify
+from invenio_records_rest.serializers import json_v1
 
 from .impactgraph_serializer import ImpactGraphSerializer
 from .json_literature import LiteratureJSONBriefSerializer
@@ -39,12 +39,14 @@ from .cvformattext_serializer import CVFORMATTEXTSerializer
 from .schemas.json import RecordSchemaJSONBRIEFV1
 from .marcxml import MARCXMLSerializer
 
-from .response import record_responsify_nocache
+from .response import record_responsify_cached, search_responsify_etag
+
+json_v1_search = search_responsify_etag(json_v1, 'application/json')
 
 json_literature_brief_v1 = LiteratureJSONBriefSerializer(
     RecordSchemaJSONBRIEFV1
 )
-json_literature_brief_v1_search = search_responsify(
+json_literature_brief_v1_search = search_responsify_etag(
     json_literature_brief_v1,
     'application/vnd+inspire.brief+json'
 )
@@ -58,30 +60,41 @@ cvformathtml_v1 = CVFORMATHTMLSerializer()
 cvformattext_v1 = CVFORMATTEXTSerializer()
 marcxml_v1 = MARCXMLSerializer()
 
-bibtex_v1_response = record_responsify_nocache(
-    bibtex_v1, 'application/x-bibtex')
-latexeu_v1_response = record_responsify_nocache(
-    latexeu_v1, 'application/x-latexeu')
-latexus_v1_response = record_responsify_nocache(
-    latexus_v1, 'application/x-latexus')
-cvformatlatex_v1_response = record_responsify_nocache(cvformatlatex_v1,
-                                                      'application/x-cvformatlatex')
-cvformathtml_v1_response = record_responsify_nocache(cvformathtml_v1,
-                                                     'application/x-cvformathtml')
-cvformattext_v1_response = record_responsify_nocache(cvformattext_v1,
-                                                     'application/x-cvformattext')
-marcxml_v1_response = record_responsify_nocache(marcxml_v1, 'application/marcxml+xml')
+bibtex_v1_response = record_responsify_cached(
+    bibtex_v1, 'application/x-bibtex', 'bibtex')
+latexeu_v1_response = record_responsify_cached(
+    latexeu_v1, 'application/x-latexeu', 'latexeu',
+    depends_on_other_records=True)
+latexus_v1_response = record_responsify_cached(
+    latexus_v1, 'application/x-latexus', 'latexus',
+    depends_on_other_records=True)
+cvformatlatex_v1_response = record_responsify_cached(cvformatlatex_v1,
+                                                     'application/x-cvformatlatex',
+                                                     'cvformatlatex',
+                                                     depends_on_other_records=True)
+cvformathtml_v1_response = record_responsify_cached(cvformathtml_v1,
+                                                    'application/x-cvformathtml',
+                                                    'cvformathtml',
+                                                    depends_on_other_records=True)
+cvformattext_v1_response = record_responsify_cached(cvformattext_v1,
+                                                    'application/x-cvformattext',
+                                                    'cvformattext',
+                                                    depends_on_other_records=True)
+marcxml_v1_response = record_responsify_cached(
+    marcxml_v1, 'application/marcxml+xml', 'marcxml')
 
-bibtex_v1_search = search_responsify(bibtex_v1, 'application/x-bibtex')
-latexeu_v1_search = search_responsify(latexeu_v1, 'application/x-latexeu')
-latexus_v1_search = search_responsify(latexus_v1, 'application/x-latexus')
-cvformatlatex_v1_search = search_responsify(cvformatlatex_v1,
-                                            'application/x-cvformatlatex')
-cvformathtml_v1_search = search_responsify(cvformathtml_v1,
-                                           'application/x-cvformathtml')
-cvformattext_v1_search = search_responsify(cvformattext_v1,
-                                           'application/x-cvformattext')
+bibtex_v1_search = search_responsify_etag(bibtex_v1, 'application/x-bibtex')
+latexeu_v1_search = search_responsify_etag(latexeu_v1, 'application/x-latexeu')
+latexus_v1_search = search_responsify_etag(latexus_v1, 'application/x-latexus')
+cvformatlatex_v1_search = search_responsify_etag(cvformatlatex_v1,
+                                                 'application/x-cvformatlatex')
+cvformathtml_v1_search = search_responsify_etag(cvformathtml_v1,
+                                                'application/x-cvformathtml')
+cvformattext_v1_search = search_responsify_etag(cvformattext_v1,
+                                                'application/x-cvformattext')
 impactgraph_v1 = ImpactGraphSerializer()
-impactgraph_v1_response = record_responsify_nocache(impactgraph_v1,
-                                                    'application/x-impact.graph+json')
-marcxml_v1_search = search_responsify(marcxml_v1, 'application/marcxml+xml')
+impactgraph_v1_response = record_responsify_cached(impactgraph_v1,
+                                                   'application/x-impact.graph+json',
+                                                   'impactgraph',
+                                                   depends_on_other_records=True)
+marcxml_v1_search = search_responsify_etag(marcxml_v1, 'application/marcxml+xml')
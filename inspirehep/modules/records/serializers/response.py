@@ -27,7 +27,25 @@ Responsible for creating a HTTP response given the output of a serializer.
 
 from __future__ import absolute_import, division, print_function
 
-from flask import current_app
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request
+from flask_login import current_user
+from six import text_type
+
+from invenio_cache import current_cache
+from invenio_records_rest.serializers.response import add_link_header
+
+from inspirehep.modules.records.utils import (
+    get_index_generation,
+    is_index_generation_refreshed,
+)
+
+SERIALIZATION_CACHE_KEY = 'serialization::{uuid}::{revision}::{format}::{version}'
+
+CACHED_SERIALIZERS = {}
+"""Serializers whose output is cached, by format name."""
 
 
 def record_responsify_nocache(serializer, mimetype):
@@ -48,3 +66,203 @@ def record_responsify_nocache(serializer, mimetype):
             response.headers.extend(headers)
         return response
     return view
+
+
+def _make_etag(*parts):
+    etag_source = '::'.join(str(part) for part in parts)
+    return hashlib.sha1(etag_source.encode('utf-8')).hexdigest()
+
+
+def _get_content_digest(content):
+    if isinstance(content, text_type):
+        content = content.encode('utf-8')
+    return hashlib.sha1(content).hexdigest()
+
+
+def get_search_etag(mimetype):
+    """Return the ETag of the response to the current search request.
+
+    The response to a search depends on the content of the indexes, on
+    the query arguments, and possibly on the permissions of the user, so
+    they are all part of the ETag. A response computed before the indexes
+    are refreshed gets a different ETag than one computed after.
+    """
+    return _make_etag(
+        get_index_generation(),
+        is_index_generation_refreshed(),
+        current_user.get_id(),
+        mimetype,
+        request.full_path,
+    )
+
+
+def _not_modified(mimetype, etag):
+    response = current_app.response_class(mimetype=mimetype)
+    response.status_code = 304
+    response.set_etag(etag)
+    return response
+
+
+def record_responsify_index_etag(serializer, mimetype):
+    """Create a Records-REST response serializer for aggregations.
+
+    Some serializers, e.g. the citations of an author, aggregate the content
+    of other records, so the ``ETag`` of their responses is derived both
+    from the revision of the record and from the generation of the indexes.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    """
+    def view(pid, record, code=200, headers=None, links_factory=None):
+        etag = _make_etag(
+            record.id, record.revision_id, get_search_etag(mimetype))
+        if code == 200 and etag in request.if_none_match:
+            return _not_modified(mimetype, etag)
+
+        response = current_app.response_class(
+            serializer.serialize(pid, record, links_factory=links_factory),
+            mimetype=mimetype)
+        response.status_code = code
+        response.set_etag(etag)
+        if headers is not None:
+            response.headers.extend(headers)
+        return response
+    return view
+
+
+def search_responsify_etag(serializer, mimetype):
+    """Create a Records-REST search response serializer with an ``ETag``.
+
+    Requests with an ``If-None-Match`` matching :func:`get_search_etag` get
+    a ``304 Not Modified`` without serializing the search result.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    """
+    def view(pid_fetcher, search_result, code=200, headers=None, links=None,
+             item_links_factory=None):
+        etag = get_search_etag(mimetype)
+        if code == 200 and etag in request.if_none_match:
+            return _not_modified(mimetype, etag)
+
+        response = current_app.response_class(
+            serializer.serialize_search(pid_fetcher, search_result,
+                                        links=links,
+                                        item_links_factory=item_links_factory),
+            mimetype=mimetype)
+        response.status_code = code
+        response.set_etag(etag)
+        if headers is not None:
+            response.headers.extend(headers)
+        if links is not None:
+            add_link_header(response, links)
+        return response
+    return view
+
+
+def conditional_on_index_generation(f):
+    """Make a view computed from the indexes answer conditional requests.
+
+    The ``ETag`` is computed before calling the view, so a request with a
+    matching ``If-None-Match`` gets a ``304 Not Modified`` without querying
+    Elasticsearch.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        etag = get_search_etag('application/json')
+        if etag in request.if_none_match:
+            return _not_modified('application/json', etag)
+
+        response = make_response(f(*args, **kwargs))
+        if response.status_code == 200:
+            response.set_etag(etag)
+        return response
+    return decorated
+
+
+def _get_serialization_cache_key(record, format_name):
+    return SERIALIZATION_CACHE_KEY.format(
+        uuid=record.id,
+        revision=record.revision_id,
+        format=format_name,
+        version=current_app.config['RECORDS_SERIALIZATION_CACHE_VERSION'],
+    )
+
+
+def get_serialization_etag(record, format_name):
+    """Return the ETag of the serialization of a record in a format."""
+    return _make_etag(_get_serialization_cache_key(record, format_name))
+
+
+def serialize_cached(format_name, pid, record, links_factory=None, refresh=False):
+    """Serialize a record in a format, reusing the cached serialization.
+
+    The cache key contains the record UUID, its revision, the format and
+    ``RECORDS_SERIALIZATION_CACHE_VERSION``, so that a new revision of the
+    record or a new version of the serializers never hits a stale entry.
+    Entries expire after ``RECORDS_SERIALIZATION_CACHE_TIMEOUT`` seconds, as
+    some formats also depend on other records.
+
+    :param format_name: name of a format registered by
+        :func:`record_responsify_cached`.
+    :param refresh: serialize the record even if it is cached.
+    """
+    cache_key = _get_serialization_cache_key(record, format_name)
+    if not refresh:
+        serialized = current_cache.get(cache_key)
+        if serialized is not None:
+            return serialized
+
+    serializer = CACHED_SERIALIZERS[format_name]
+    serialized = serializer.serialize(pid, record, links_factory=links_factory)
+    current_cache.set(
+        cache_key,
+        serialized,
+        timeout=current_app.config['RECORDS_SERIALIZATION_CACHE_TIMEOUT'],
+    )
+    return serialized
+
+
+def record_responsify_cached(serializer, mimetype, format_name,
+                             depends_on_other_records=False):
+    """Create a Records-REST response serializer caching its output.
+
+    The output is cached by :func:`serialize_cached`, and the response
+    carries an ``ETag`` derived from the cache key, so that requests with a
+    matching ``If-None-Match`` get a ``304 Not Modified``.
+
+    The output of the formats depending on other records, e.g. on their
+    citations, changes without a new revision of the record, so their
+    ``ETag`` is also derived from the cached output.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    :param format_name: name of the format in the cache.
+    :param depends_on_other_records: whether the format depends on other
+        records.
+    """
+    CACHED_SERIALIZERS[format_name] = serializer
+
+    def view(pid, record, code=200, headers=None, links_factory=None):
+        serialized = None
+        etag = get_serialization_etag(record, format_name)
+        if depends_on_other_records:
+            serialized = serialize_cached(
+                format_name, pid, record, links_factory=links_factory)
+            etag = _make_etag(etag, _get_content_digest(serialized))
+
+        if code == 200 and etag in request.if_none_match:
+            response = current_app.response_class(mimetype=mimetype)
+            response.status_code = 304
+        else:
+            if serialized is None:
+                serialized = serialize_cached(
+                    format_name, pid, record, links_factory=links_factory)
+            response = current_app.response_class(
+                serialized, mimetype=mimetype)
+            response.status_code = code
+        response.set_etag(etag)
+        if headers is not None:
+            response.headers.extend(headers)
+        return response
+    return view
@@ -24,41 +24,187 @@
 
 from __future__ import absolute_import, division, print_function
 
-from celery import shared_task
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from celery import group, shared_task
 from celery.utils.log import get_task_logger
+from elasticsearch.helpers import bulk as es_bulk
 from elasticsearch.helpers import scan
 from flask import current_app
+from flask_sqlalchemy import models_committed
+from redis import StrictRedis
 from six import iteritems
 
 from invenio_db import db
-from invenio_pidstore.models import PersistentIdentifier
+from invenio_pidstore.models import PersistentIdentifier, PIDStatus, Redirect
+from invenio_records.models import RecordMetadata
 from invenio_search import current_search_client as es
 
 from inspire_dojson.utils import get_recid_from_ref
+from inspirehep.modules.migrator.tasks import chunker, create_index_op
 from inspirehep.modules.records.api import InspireRecord
-from inspirehep.modules.records.utils import get_endpoint_from_record
+from inspirehep.modules.records.receivers import index_after_commit
+from inspirehep.modules.records.serializers.response import serialize_cached
+from inspirehep.modules.records.utils import (
+    bump_index_generation,
+    get_endpoint_from_record,
+)
 from inspirehep.modules.pidstore.utils import get_pid_type_from_schema
 
 
 logger = get_task_logger(__name__)
 
 
+UPDATE_REFS_CHUNKS_KEY = 'update_refs::{}::chunks'
+UPDATE_REFS_COMPLETED_KEY = 'update_refs::{}::completed'
+UPDATE_REFS_DISPATCHED_KEY = 'update_refs::{}::dispatched::{}'
+
+
+def _get_redis():
+    return StrictRedis.from_url(current_app.config.get('CACHE_REDIS_URL'))
+
+
+def get_update_refs_job_id(old_ref, new_ref):
+    """Return the id identifying the update of ``old_ref`` to ``new_ref``."""
+    return hashlib.sha1(
+        '{}::{}'.format(old_ref, new_ref).encode('utf-8')).hexdigest()
+
+
+def get_update_refs_progress(old_ref, new_ref):
+    """Return the progress of a running update of references.
+
+    Returns:
+        dict: the number of ``completed`` chunks and the ``total`` number of
+        chunks, or ``None`` if no update is running.
+    """
+    job_id = get_update_refs_job_id(old_ref, new_ref)
+    r = _get_redis()
+
+    chunks = r.get(UPDATE_REFS_CHUNKS_KEY.format(job_id))
+    if chunks is None:
+        return None
+
+    return {
+        'completed': r.scard(UPDATE_REFS_COMPLETED_KEY.format(job_id)),
+        'total': len(json.loads(chunks)),
+    }
+
+
 @shared_task(ignore_result=True)
-def update_refs(old_ref, new_ref):
+def update_refs(old_ref, new_ref, chunk_size=None):
     """Update references in the entire database.
 
     Replaces all occurrences of ``old_ref`` with ``new_ref``,
     provided that they happen at one of the paths listed in
     ``INSPIRE_REF_UPDATER_WHITELISTS``.
+
+    The records are updated in chunks of ``INSPIRE_REF_UPDATER_CHUNK_SIZE``
+    by a group of :func:`update_refs_chunk` tasks, each committing and
+    reindexing its own records. The chunks, the dispatched ones and the
+    completed ones are tracked in Redis, so that calling this task again for
+    the same references resumes an interrupted update from the chunks that
+    are neither completed nor still in flight. A dispatched chunk is
+    considered lost after ``INSPIRE_REF_UPDATER_CHUNK_TIMEOUT`` seconds, and
+    the whole progress is forgotten after ``INSPIRE_REF_UPDATER_JOB_TIMEOUT``
+    seconds without activity.
+    """
+    if chunk_size is None:
+        chunk_size = current_app.config['INSPIRE_REF_UPDATER_CHUNK_SIZE']
+    job_timeout = current_app.config['INSPIRE_REF_UPDATER_JOB_TIMEOUT']
+    chunk_timeout = current_app.config['INSPIRE_REF_UPDATER_CHUNK_TIMEOUT']
+
+    job_id = get_update_refs_job_id(old_ref, new_ref)
+    chunks_key = UPDATE_REFS_CHUNKS_KEY.format(job_id)
+    completed_key = UPDATE_REFS_COMPLETED_KEY.format(job_id)
+    r = _get_redis()
+
+    chunks = r.get(chunks_key)
+    if chunks is None:
+        uuids = get_uuids_to_update(old_ref)
+        chunks = [
+            uuids[i:i + chunk_size] for i in range(0, len(uuids), chunk_size)
+        ]
+        if not chunks:
+            return
+        r.set(chunks_key, json.dumps(chunks), ex=job_timeout)
+        completed = set()
+        logger.info(
+            'Updating %s -> %s in %d records, %d chunks.',
+            old_ref, new_ref, len(uuids), len(chunks))
+    else:
+        chunks = json.loads(chunks)
+        completed = set(int(index) for index in r.smembers(completed_key))
+        r.expire(chunks_key, job_timeout)
+        r.expire(completed_key, job_timeout)
+        logger.info(
+            'Resuming the update of %s -> %s, %d of %d chunks completed.',
+            old_ref, new_ref, len(completed), len(chunks))
+
+    signatures = []
+    for index, chunk in enumerate(chunks):
+        if index in completed:
+            continue
+        dispatched_key = UPDATE_REFS_DISPATCHED_KEY.format(job_id, index)
+        if not r.set(dispatched_key, 1, nx=True, ex=chunk_timeout):
+            continue
+        signatures.append(
+            update_refs_chunk.s(job_id, index, chunk, old_ref, new_ref))
+
+    if len(signatures) < len(chunks) - len(completed):
+        logger.info(
+            'Not dispatching %d chunks of %s -> %s still in flight.',
+            len(chunks) - len(completed) - len(signatures), old_ref, new_ref)
+
+    group(signatures).apply_async()
+
+
+@shared_task(ignore_result=True, acks_late=True)
+def update_refs_chunk(job_id, index, uuids, old_ref, new_ref):
+    """Update the references in a chunk of the records.
+
+    The records are committed together and reindexed in bulk, then the chunk
+    is marked as completed.
     """
-    records = get_records_to_update(old_ref)
+    models_committed.disconnect(index_after_commit)
+
+    index_queue = []
 
-    with db.session.begin_nested():
-        for record in records:
+    try:
+        for record in InspireRecord.get_records(uuids):
             logger.info('Updated reference: %s -> %s, Record: %s', old_ref, new_ref, record.id)
             update_links(record, old_ref, new_ref)
             record.commit()
-    db.session.commit()
+            index_queue.append(create_index_op(record))
+        db.session.commit()
+    finally:
+        models_committed.connect(index_after_commit)
+
+    es_bulk(
+        es,
+        index_queue,
+        stats_only=True,
+        request_timeout=current_app.config['INDEXER_BULK_REQUEST_TIMEOUT'],
+    )
+    bump_index_generation()
+
+    chunks_key = UPDATE_REFS_CHUNKS_KEY.format(job_id)
+    completed_key = UPDATE_REFS_COMPLETED_KEY.format(job_id)
+    r = _get_redis()
+    r.sadd(completed_key, index)
+    r.expire(completed_key, current_app.config['INSPIRE_REF_UPDATER_JOB_TIMEOUT'])
+    r.delete(UPDATE_REFS_DISPATCHED_KEY.format(job_id, index))
+
+    chunks = r.get(chunks_key)
+    total = len(json.loads(chunks)) if chunks else 0
+    completed = r.scard(completed_key)
+    logger.info(
+        'Updated %s -> %s: %d of %d chunks completed.',
+        old_ref, new_ref, completed, total)
+    if completed >= total:
+        r.delete(chunks_key, completed_key)
 
 
 def update_links(record, old_ref, new_ref):
@@ -84,96 +230,205 @@ def update_links(record, old_ref, new_ref):
         _update_links(record, path.split('.'), old_ref, new_ref)
 
 
-def get_records_to_update(old_ref):
-    def _get_uuids_to_update(old_ref):
-        def _replace_record_with_recid(path):
-            return path.replace('record', 'recid')
-
-        def _ref_to_recid(ref):
-            return int(ref.split('/')[-1])
-
-        result = []
-
-        whitelists = current_app.config['INSPIRE_REF_UPDATER_WHITELISTS']
-        for endpoint, whitelist in iteritems(whitelists):
-            fields = [_replace_record_with_recid(path) for path in whitelist]
-            body = {
-                'query': {
-                    'bool': {
-                        'should': [
-                            {
-                                'term': {
-                                    field: {
-                                        'value': _ref_to_recid(old_ref),
-                                    },
+def get_uuids_to_update(old_ref):
+    """Return the uuids of the records that refer to ``old_ref``."""
+    def _replace_record_with_recid(path):
+        return path.replace('record', 'recid')
+
+    def _ref_to_recid(ref):
+        return int(ref.split('/')[-1])
+
+    result = []
+
+    whitelists = current_app.config['INSPIRE_REF_UPDATER_WHITELISTS']
+    for endpoint, whitelist in iteritems(whitelists):
+        fields = [_replace_record_with_recid(path) for path in whitelist]
+        body = {
+            '_source': False,
+            'query': {
+                'bool': {
+                    'should': [
+                        {
+                            'term': {
+                                field: {
+                                    'value': _ref_to_recid(old_ref),
                                 },
-                            } for field in fields
-                        ],
-                    },
+                            },
+                        } for field in fields
+                    ],
                 },
-            }
-
-            index = current_app.config['INSPIRE_ENDPOINT_TO_INDEX'][endpoint]
-            query = scan(es, query=body, index=index)
+            },
+        }
 
-            result.extend(el['_id'] for el in list(query))
+        index = current_app.config['INSPIRE_ENDPOINT_TO_INDEX'][endpoint]
+        query = scan(es, query=body, index=index)
 
-        return result
+        result.extend(el['_id'] for el in query)
 
-    def _get_records_to_update(uuids):
-        return InspireRecord.get_records(uuids)
+    return result
 
-    uuids = _get_uuids_to_update(old_ref)
-    records = _get_records_to_update(uuids)
 
-    return records
+def get_records_to_update(old_ref):
+    return InspireRecord.get_records(get_uuids_to_update(old_ref))
 
 
 @shared_task
-def merge_merged_records():
-    """Merge all records that were marked as merged."""
-    records = get_merged_records()
+def merge_merged_records(chunk_size=None):
+    """Merge all records that were marked as merged.
 
-    for record in records:
-
-        record_pid = PersistentIdentifier.query.filter_by(object_uuid=record.id).one()
-        deleted_ids = [get_recid_from_ref(ref) for ref in record['deleted_records']]
+    The records are processed in chunks of
+    ``INSPIRE_MERGE_MERGED_RECORDS_CHUNK_SIZE``, each committed on its own.
+    """
+    if chunk_size is None:
+        chunk_size = current_app.config['INSPIRE_MERGE_MERGED_RECORDS_CHUNK_SIZE']
 
-        for deleted_id in deleted_ids:
-                deleted_pid = PersistentIdentifier.query.filter_by(
-                    pid_value=str(deleted_id)
-                ).one_or_none()
+    for uuids in chunker(_get_uuids_to_merge(), chunk_size):
+        redirect_deleted_pids(InspireRecord.get_records(uuids))
+        db.session.commit()
 
-                if not deleted_pid:
-                    deleted_pid = PersistentIdentifier.create(
-                        pid_type=get_pid_type_from_schema(record['$schema']),
-                        pid_value=deleted_id,
-                        object_type='rec'
-                    )
-                    deleted_pid.register()
-                    db.session.add(deleted_pid)
 
-                deleted_pid.redirect(record_pid)
-    db.session.commit()
+def redirect_deleted_pids(records):
+    """Redirect the PIDs of the deleted records to the records they were merged in.
 
+    The PIDs are loaded with one query, the missing ones are created in bulk,
+    and so are the redirects.
+    """
+    pid_types = {
+        record.id: get_pid_type_from_schema(record['$schema'])
+        for record in records
+    }
+    record_pids = {
+        (pid.pid_type, pid.object_uuid): pid
+        for pid in PersistentIdentifier.query.filter(
+            PersistentIdentifier.object_uuid.in_(list(pid_types)),
+        )
+    }
+
+    deleted_ids = {}
+    for record in records:
+        pid_type = pid_types[record.id]
+        record_pid = record_pids[(pid_type, record.id)]
+        for ref in record['deleted_records']:
+            deleted_ids[(pid_type, str(get_recid_from_ref(ref)))] = record_pid
+
+    if not deleted_ids:
+        return
+
+    deleted_pids = {
+        (pid.pid_type, pid.pid_value): pid
+        for pid in PersistentIdentifier.query.filter(
+            PersistentIdentifier.pid_value.in_(
+                [pid_value for _, pid_value in deleted_ids]),
+            PersistentIdentifier.pid_type.in_(set(pid_types.values())),
+        )
+        if (pid.pid_type, pid.pid_value) in deleted_ids
+    }
+
+    missing_pids = [
+        PersistentIdentifier(
+            pid_type=pid_type,
+            pid_value=pid_value,
+            object_type='rec',
+            status=PIDStatus.REGISTERED,
+        ) for pid_type, pid_value in deleted_ids
+        if (pid_type, pid_value) not in deleted_pids
+    ]
+    db.session.add_all(missing_pids)
+    db.session.flush()
+    deleted_pids.update(
+        ((pid.pid_type, pid.pid_value), pid) for pid in missing_pids)
+
+    existing_redirects = {}
+    redirect_ids = [
+        pid.object_uuid for pid in deleted_pids.values() if pid.is_redirected()
+    ]
+    if redirect_ids:
+        existing_redirects = {
+            redirect.id: redirect for redirect in Redirect.query.filter(
+                Redirect.id.in_(redirect_ids),
+            )
+        }
 
-def get_merged_records():
-    def _get_uuids_to_merge():
-        body = {
-            'query': {
-                'exists': {
-                    'field': 'deleted_records',
-                },
+    new_redirects = []
+    for key, deleted_pid in iteritems(deleted_pids):
+        record_pid = deleted_ids[key]
+        if deleted_pid.is_redirected():
+            existing_redirects[deleted_pid.object_uuid].pid_id = record_pid.id
+            continue
+        if not deleted_pid.is_registered():
+            logger.warning(
+                'Cannot redirect %s %s, its status is %s.',
+                deleted_pid.pid_type, deleted_pid.pid_value, deleted_pid.status)
+            continue
+
+        redirect = Redirect(id=uuid.uuid4(), pid_id=record_pid.id)
+        new_redirects.append(redirect)
+        deleted_pid.status = PIDStatus.REDIRECTED
+        deleted_pid.object_type = None
+        deleted_pid.object_uuid = redirect.id
+
+    db.session.add_all(new_redirects)
+    db.session.flush()
+
+
+def _get_uuids_to_merge():
+    body = {
+        '_source': False,
+        'query': {
+            'exists': {
+                'field': 'deleted_records',
             },
-        }
+        },
+    }
 
-        index = 'records-*'
-        query = scan(es, query=body, index=index)
+    index = 'records-*'
+    query = scan(es, query=body, index=index)
 
-        for result in query:
-            yield result['_id']
+    for result in query:
+        yield result['_id']
 
+
+def get_merged_records():
     uuids = _get_uuids_to_merge()
     records = InspireRecord.get_records(uuids)
 
     return records
+
+
+@shared_task(ignore_result=True)
+def warm_up_serialization_cache(period=None, formats=None):
+    """Pre-render the serializations of the recently updated literature.
+
+    The serializations are stored in the cache used by the REST API, see
+    :func:`inspirehep.modules.records.serializers.response.serialize_cached`.
+
+    Args:
+        period(int): the records updated during the last ``period`` seconds
+            are serialized. Defaults to ``RECORDS_SERIALIZATION_WARMUP_PERIOD``.
+        formats(list): the names of the formats. Defaults to
+            ``RECORDS_SERIALIZATION_WARMUP_FORMATS``.
+    """
+    if period is None:
+        period = current_app.config['RECORDS_SERIALIZATION_WARMUP_PERIOD']
+    if formats is None:
+        formats = current_app.config['RECORDS_SERIALIZATION_WARMUP_FORMATS']
+
+    updated_after = datetime.utcnow() - timedelta(seconds=period)
+    pids = PersistentIdentifier.query.join(
+        RecordMetadata,
+        RecordMetadata.id == PersistentIdentifier.object_uuid,
+    ).filter(
+        PersistentIdentifier.pid_type == 'lit',
+        PersistentIdentifier.status == PIDStatus.REGISTERED,
+        RecordMetadata.updated >= updated_after,
+    ).all()
+
+    with current_app.test_request_context():
+        for pid in pids:
+            record = InspireRecord.get_record(pid.object_uuid)
+            for format_name in formats:
+                try:
+                    serialize_cached(format_name, pid, record)
+                except Exception:
+                    logger.exception(
+                        'Cannot serialize record %s as %s', pid.pid_value, format_name)
@@ -24,11 +24,20 @@
 
 from __future__ import absolute_import, division, print_function
 
+import time
+
+from flask import current_app
+
+from invenio_cache import current_cache
+
 from inspirehep.modules.pidstore.utils import (
     get_endpoint_from_pid_type,
     get_pid_type_from_schema
 )
 
+INDEX_GENERATION_CACHE_KEY = 'records_index_generation'
+INDEX_GENERATION_REFRESHING_CACHE_KEY = 'records_index_generation_refreshing'
+
 
 def get_endpoint_from_record(record):
     """Return the endpoint corresponding to a record."""
@@ -36,3 +45,51 @@ def get_endpoint_from_record(record):
     endpoint = get_endpoint_from_pid_type(pid_type)
 
     return endpoint
+
+
+def get_index_generation():
+    """Return the generation of the records indexes.
+
+    The generation is a counter bumped by :func:`bump_index_generation`
+    every time records are indexed or removed from the indexes, so that
+    the responses computed from a search can be identified by it.
+    """
+    generation = current_cache.get(INDEX_GENERATION_CACHE_KEY)
+    if generation is None:
+        _seed_index_generation()
+        generation = current_cache.get(INDEX_GENERATION_CACHE_KEY)
+
+    return int(generation or 0)
+
+
+def bump_index_generation():
+    """Signal that the content of the records indexes changed.
+
+    The changes become searchable only at the next refresh of the indexes,
+    so the generation is marked as refreshing for the following
+    ``RECORDS_INDEX_REFRESH_INTERVAL`` seconds.
+    """
+    _seed_index_generation()
+    current_cache.inc(INDEX_GENERATION_CACHE_KEY)
+    current_cache.set(
+        INDEX_GENERATION_REFRESHING_CACHE_KEY,
+        True,
+        timeout=current_app.config['RECORDS_INDEX_REFRESH_INTERVAL'],
+    )
+
+
+def is_index_generation_refreshed():
+    """Return whether the last changes of the indexes are searchable.
+
+    A response computed while the generation is refreshing may not contain
+    these changes yet, so it must not be identified by the same generation
+    as the responses computed after the refresh.
+    """
+    return not current_cache.get(INDEX_GENERATION_REFRESHING_CACHE_KEY)
+
+
+def _seed_index_generation():
+    # A missing or evicted counter restarts from the current time instead
+    # of from zero, so that it never goes back to a generation for which
+    # clients may still hold an ETag.
+    current_cache.add(INDEX_GENERATION_CACHE_KEY, int(time.time() * 1000))
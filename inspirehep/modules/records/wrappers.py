@@ -78,6 +78,15 @@ class LiteratureRecord(ESRecord, AdminToolsMixin):
         Returns a list with information about conferences related to the
         record.
         """
+        return self.get_conference_information(
+            lambda ref: replace_refs(ref, 'es'))
+
+    def get_conference_information(self, resolve_ref):
+        """Conference information, with the references resolved by a function.
+
+        ``resolve_ref`` takes a ``$ref`` of the ``publication_info`` and
+        returns the referenced record, or ``None``.
+        """
         conf_info = []
         for pub_info in self['publication_info']:
             conference_recid = None
@@ -85,14 +94,13 @@ class LiteratureRecord(ESRecord, AdminToolsMixin):
             parent_rec = {}
             conference_rec = {}
             if 'conference_record' in pub_info:
-                conference_rec = replace_refs(pub_info['conference_record'],
-                                              'es')
+                conference_rec = resolve_ref(pub_info['conference_record'])
                 if conference_rec and conference_rec.get('control_number'):
                     conference_recid = conference_rec['control_number']
                 else:
                     conference_rec = {}
             if 'parent_record' in pub_info:
-                parent_rec = replace_refs(pub_info['parent_record'], 'es')
+                parent_rec = resolve_ref(pub_info['parent_record'])
                 if parent_rec and parent_rec.get('control_number'):
                     parent_recid = parent_rec['control_number']
                 else:
@@ -24,12 +24,31 @@
 
 from __future__ import absolute_import, division, print_function
 
+import hashlib
+
+import six
 from celery import shared_task
 from flask import current_app
 
+from invenio_cache import current_cache
 from invenio_db import db
+from refextract import (
+    extract_references_from_string,
+    extract_references_from_url,
+)
 
 from inspirehep.modules.refextract.utils import KbWriter
+from inspirehep.utils.references import (
+    get_cached_refextract_kbs_path,
+    map_refextract_to_schema,
+)
+
+REFEXTRACT_JOB_CACHE_KEY = 'refextract_job::{}'
+
+REFEXTRACT_EXTRACTORS = {
+    'text': extract_references_from_string,
+    'url': extract_references_from_url,
+}
 
 
 @shared_task()
@@ -85,3 +104,105 @@ def create_journal_kb_file():
                 value=row['title_variant'],
                 kb_key=row['short_title'],
             )
+
+
+def get_refextract_job_id(source_type, source):
+    """Return the id of the job extracting references from ``source``.
+
+    The id is a hash of the input, so that identical inputs share a job.
+
+    Args:
+        source_type(str): either ``text`` or ``url``.
+        source(str): the text or the URL to extract the references from.
+
+    Returns:
+        str: the job id.
+    """
+    job_input = u'{}:{}'.format(source_type, source).encode('utf-8')
+    return hashlib.sha1(job_input).hexdigest()
+
+
+def get_refextract_job(job_id):
+    """Return the state of a refextract job.
+
+    Args:
+        job_id(str): the job id.
+
+    Returns:
+        dict: the job, with its ``status`` being ``pending``, ``done`` or
+        ``error``, and its ``references`` when it is done, or ``None`` if the
+        job is unknown or expired.
+    """
+    return current_cache.get(REFEXTRACT_JOB_CACHE_KEY.format(job_id))
+
+
+def _set_refextract_job(job_id, job):
+    # A pending job whose worker died must not block its input for long.
+    if job['status'] == 'pending':
+        timeout = current_app.config['REFEXTRACT_PENDING_JOB_CACHE_TIMEOUT']
+    else:
+        timeout = current_app.config['REFEXTRACT_JOB_CACHE_TIMEOUT']
+
+    current_cache.set(
+        REFEXTRACT_JOB_CACHE_KEY.format(job_id),
+        job,
+        timeout=timeout,
+    )
+
+
+def submit_refextract_job(source_type, source):
+    """Start extracting references from ``source`` on a Celery worker.
+
+    If a job with the same input is already pending or done, it is reused.
+    A pending job is forgotten after ``REFEXTRACT_PENDING_JOB_CACHE_TIMEOUT``
+    seconds, so that the input is extracted again if its worker was lost.
+
+    Args:
+        source_type(str): either ``text`` or ``url``.
+        source(str): the text or the URL to extract the references from.
+
+    Returns:
+        tuple: the job id and the job.
+    """
+    if source_type not in REFEXTRACT_EXTRACTORS:
+        raise ValueError('Unknown refextract source: {}'.format(source_type))
+
+    job_id = get_refextract_job_id(source_type, source)
+    job = get_refextract_job(job_id)
+    if job is None or job['status'] == 'error':
+        job = {'status': 'pending'}
+        _set_refextract_job(job_id, job)
+        extract_references_job.delay(job_id, source_type, source)
+
+    return job_id, job
+
+
+@shared_task(ignore_result=True)
+def extract_references_job(job_id, source_type, source):
+    """Extract references from ``source`` and store them in the job.
+
+    Args:
+        job_id(str): the job id.
+        source_type(str): either ``text`` or ``url``.
+        source(str): the text or the URL to extract the references from.
+    """
+    extractor = REFEXTRACT_EXTRACTORS[source_type]
+    try:
+        extracted_references = extractor(
+            source,
+            override_kbs_files=get_cached_refextract_kbs_path(),
+            reference_format=u'{title},{volume},{page}'
+        )
+        job = {
+            'status': 'done',
+            'references': map_refextract_to_schema(extracted_references),
+        }
+    except Exception as err:
+        current_app.logger.exception(
+            'Refextract job %s failed on %s %s', job_id, source_type, source)
+        job = {
+            'status': 'error',
+            'message': six.text_type(err),
+        }
+
+    _set_refextract_job(job_id, job)
@@ -25,7 +25,6 @@ from __future__ import absolute_import, division, print_function
 import logging
 
 from flask import request
-from flask_security import current_user
 
 from elasticsearch import RequestError
 from elasticsearch_dsl.query import Q
@@ -33,10 +32,7 @@ from elasticsearch_dsl.query import Q
 from invenio_search.api import DefaultFilter, RecordsSearch
 from invenio_search import current_search_client as es
 
-from inspirehep.modules.records.permissions import (
-    all_restricted_collections,
-    user_collections
-)
+from inspirehep.modules.records.permissions import get_hidden_collections
 
 from .query_factory import inspire_query_factory
 
@@ -97,21 +93,31 @@ class SearchMixin(object):
         return results
 
 
+def collections_visibility_filter():
+    """Filter out the restricted collections hidden from the current user.
+
+    :returns: a single ``terms`` exclusion, or ``None`` if the user can view
+        all the collections.
+    """
+    hidden_collections = get_hidden_collections()
+    if not hidden_collections:
+        return None
+
+    # ``_collections`` is indexed lowercased with a keyword tokenizer.
+    return ~Q('terms', _collections=sorted(
+        collection.lower() for collection in hidden_collections))
+
+
 def inspire_filter():
     """Filter applied to all queries."""
     if request:
         collection = request.values.get('cc', 'Literature')
 
-        user_roles = [r.name for r in current_user.roles]
-        if 'superuser' in user_roles:
-            user_coll = all_restricted_collections
-        else:
-            user_coll = user_collections
-
         query = Q('match', _collections=collection)
 
-        for collection in list(all_restricted_collections - user_coll):
-            query = query & ~Q('match', _collections=collection)
+        visibility_filter = collections_visibility_filter()
+        if visibility_filter is not None:
+            query = query & visibility_filter
 
         return query
 
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Search CLI."""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+
+import click
+from flask import current_app
+from flask_cli import with_appcontext
+from redis import StrictRedis
+
+from .suggest import (
+    SUGGESTIONS_CACHE_KEY,
+    _get_local_cache,
+    get_suggestions,
+    normalize_prefix,
+    query_suggestions,
+)
+
+
+@click.group()
+def suggest():
+    """Commands related to the typeahead suggestions."""
+
+
+def _clear_suggestions_cache():
+    _get_local_cache().clear()
+
+    r = StrictRedis.from_url(current_app.config.get('CACHE_REDIS_URL'))
+    pattern = current_app.config.get('CACHE_KEY_PREFIX', '') + \
+        SUGGESTIONS_CACHE_KEY.format(field='*', prefix='*')
+    for key in r.scan_iter(match=pattern):
+        r.delete(key)
+
+
+def _percentile(sorted_values, percent):
+    index = int(round(percent / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+@suggest.command()
+@click.argument('keystroke_log', type=click.File('r'))
+@click.option('--field', '-f', default='authors.name_suggest',
+              help='Completion field of the lines without one.')
+@click.option('--uncached', is_flag=True,
+              help='Query Elasticsearch for every keystroke, as a baseline.')
+@click.option('--cold', is_flag=True,
+              help='Clear the suggestions cache before the replay.')
+@with_appcontext
+def benchmark(keystroke_log, field, uncached, cold):
+    """Replay a keystroke log against the suggestions.
+
+    Each line of the log is a query typed in the search bar, optionally
+    preceded by its completion field and a tab.
+    """
+    keystrokes = []
+    for line in keystroke_log:
+        line = line.rstrip('\n')
+        if not line:
+            continue
+        if '\t' in line:
+            keystrokes.append(tuple(line.split('\t', 1)))
+        else:
+            keystrokes.append((field, line))
+
+    if cold:
+        _clear_suggestions_cache()
+
+    timings = []
+    for keystroke_field, query in keystrokes:
+        start = time.time()
+        if uncached:
+            query_suggestions(keystroke_field, normalize_prefix(query))
+        else:
+            get_suggestions(keystroke_field, query)
+        timings.append(time.time() - start)
+
+    if not timings:
+        click.echo('The keystroke log is empty.')
+        return
+
+    timings.sort()
+    click.echo('Keystrokes: {}'.format(len(timings)))
+    click.echo('Total: {:.3f} s'.format(sum(timings)))
+    click.echo('Mean: {:.2f} ms'.format(1000 * sum(timings) / len(timings)))
+    click.echo('p50: {:.2f} ms'.format(1000 * _percentile(timings, 50)))
+    click.echo('p95: {:.2f} ms'.format(1000 * _percentile(timings, 95)))
+    click.echo('Max: {:.2f} ms'.format(1000 * timings[-1]))
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Typeahead suggestions.
+
+The suggestions for a prefix are cached in two layers: a small LRU cache in
+the memory of each process, and the Redis cache shared by all processes.
+Identical prefixes requested concurrently are coalesced, so that only one
+of the requests queries Elasticsearch.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+import time
+from collections import OrderedDict
+
+import six
+from flask import current_app
+from redis import StrictRedis
+from redis_lock import Lock
+
+from invenio_cache import current_cache
+
+from .api import LiteratureSearch
+
+SUGGESTIONS_CACHE_KEY = 'suggest::{field}::{prefix}'
+SUGGESTIONS_LOCK_NAME = 'suggest::{field}::{prefix}'
+
+
+class LRUCache(object):
+    """Thread-safe LRU cache whose entries expire after ``timeout`` seconds."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                stored_at, value = self._entries.pop(key)
+            except KeyError:
+                return None
+            if time.time() - stored_at > self.timeout:
+                return None
+            self._entries[key] = (stored_at, value)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time(), value)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local_cache = None
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def _get_local_cache():
+    global _local_cache
+
+    if _local_cache is None:
+        _local_cache = LRUCache(
+            current_app.config['SEARCH_SUGGEST_LOCAL_CACHE_SIZE'],
+            current_app.config['SEARCH_SUGGEST_LOCAL_CACHE_TIMEOUT'],
+        )
+    return _local_cache
+
+
+def normalize_prefix(query):
+    """Normalize a typeahead query, as the completion suggester does."""
+    return (query or '').strip().lower()
+
+
+def query_suggestions(field, prefix):
+    """Query Elasticsearch for the suggestions of a prefix."""
+    search = LiteratureSearch()
+    search = search.suggest(
+        'suggestions', prefix, completion={"field": field}
+    )
+    suggestions = search.execute_suggest()
+    options = suggestions['suggestions'][0]['options']
+
+    if field == "authors.name_suggest":
+        bai_name_map = OrderedDict()
+        for suggestion in options:
+            bai = suggestion['payload']['bai']
+            bai_name_map.setdefault(bai, []).append(suggestion['text'])
+
+        return [
+            {
+                'name': max(value, key=len),
+                'value': key,
+                'template': 'author'
+            } for key, value in six.iteritems(bai_name_map)
+        ]
+
+    return [{'value': s['text']} for s in options]
+
+
+def get_suggestions(field, query):
+    """Return the typeahead suggestions for a query.
+
+    Queries shorter than ``SEARCH_SUGGEST_MIN_PREFIX_LENGTH`` get no
+    suggestions.
+
+    Args:
+        field(str): the completion field of the literature index.
+        query(str): the text typed by the user.
+
+    Returns:
+        list: the suggestions, in the format expected by typeahead.js.
+    """
+    prefix = normalize_prefix(query)
+    if len(prefix) < current_app.config['SEARCH_SUGGEST_MIN_PREFIX_LENGTH']:
+        return []
+
+    cache_key = SUGGESTIONS_CACHE_KEY.format(field=field, prefix=prefix)
+    local_cache = _get_local_cache()
+
+    suggestions = local_cache.get(cache_key)
+    if suggestions is not None:
+        return suggestions
+
+    with _in_flight_lock:
+        event = _in_flight.get(cache_key)
+        is_leader = event is None
+        if is_leader:
+            event = _in_flight[cache_key] = threading.Event()
+
+    if not is_leader:
+        event.wait(current_app.config['SEARCH_SUGGEST_COALESCE_TIMEOUT'])
+        suggestions = local_cache.get(cache_key)
+        if suggestions is not None:
+            return suggestions
+
+    try:
+        suggestions = _get_shared_suggestions(field, prefix, cache_key)
+        local_cache.set(cache_key, suggestions)
+        return suggestions
+    finally:
+        if is_leader:
+            with _in_flight_lock:
+                del _in_flight[cache_key]
+            event.set()
+
+
+def _get_shared_suggestions(field, prefix, cache_key):
+    suggestions = current_cache.get(cache_key)
+    if suggestions is not None:
+        return suggestions
+
+    # Waiting for the lock does not poll: the holder wakes up the waiters
+    # when it releases it, and after the timeout they query themselves.
+    coalesce_timeout = current_app.config['SEARCH_SUGGEST_COALESCE_TIMEOUT']
+    r = StrictRedis.from_url(current_app.config.get('CACHE_REDIS_URL'))
+    lock = Lock(
+        r,
+        SUGGESTIONS_LOCK_NAME.format(field=field, prefix=prefix),
+        expire=coalesce_timeout,
+    )
+    acquired = lock.acquire(timeout=coalesce_timeout)
+    try:
+        if acquired:
+            suggestions = current_cache.get(cache_key)
+            if suggestions is not None:
+                return suggestions
+
+        suggestions = query_suggestions(field, prefix)
+        current_cache.set(
+            cache_key,
+            suggestions,
+            timeout=current_app.config['SEARCH_SUGGEST_CACHE_TIMEOUT'],
+        )
+        return suggestions
+    finally:
+        if acquired:
+            lock.release()
@@ -26,10 +26,9 @@ from __future__ import absolute_import, division, print_function
 
 import json
 
-import six
 from flask import Blueprint, current_app, jsonify, request, render_template
 
-from inspirehep.modules.search import LiteratureSearch
+from .suggest import get_suggestions
 
 
 blueprint = Blueprint(
@@ -79,42 +78,8 @@ def suggest():
     field = request.values.get('field')
     query = request.values.get('query')
 
-    search = LiteratureSearch()
-    search = search.suggest(
-        'suggestions', query, completion={"field": field}
-    )
-    suggestions = search.execute_suggest()
-
-    if field == "authors.name_suggest":
-        bai_name_map = {}
-        for suggestion in suggestions['suggestions'][0]['options']:
-            bai = suggestion['payload']['bai']
-            if bai in bai_name_map:
-                bai_name_map[bai].append(
-                    suggestion['text']
-                )
-            else:
-                bai_name_map[bai] = [suggestion['text']]
-
-        result = []
-        for key, value in six.iteritems(bai_name_map):
-            result.append(
-                {
-                    'name': max(value, key=len),
-                    'value': key,
-                    'template': 'author'
-                }
-            )
-
-        return jsonify({
-            'results': result
-        })
-
     return jsonify({
-        'results': [
-            {'value': s['text']}
-            for s in suggestions['suggestions'][0]['options']
-        ]
+        'results': get_suggestions(field, query),
     })
 
 
@@ -27,23 +27,30 @@ from __future__ import absolute_import, division, print_function
 import json
 import re
 import time
-from collections import Iterable
+from collections import Iterable, defaultdict
 from datetime import datetime
 from operator import itemgetter
 
 import six
 from flask import current_app, url_for
 from jinja2.filters import do_join, evalcontextfilter
+from six.moves.urllib.parse import urlparse
 from werkzeug.urls import url_decode
 
 from inspire_utils.date import format_date as _format_date
 from inspire_utils.dedupers import dedupe_list
 from inspirehep.modules.records.wrappers import LiteratureRecord
-from inspirehep.modules.search import InstitutionsSearch, LiteratureSearch
+from inspirehep.modules.search import (
+    ConferencesSearch,
+    InstitutionsSearch,
+    LiteratureSearch,
+)
 from inspirehep.utils.jinja2 import render_template_to_string
 from inspirehep.utils.template import render_macro_from_template
 
+from .prefetch import execute_prefetched, filter_search
 from .views import blueprint
+from .widgets import PublicLiteratureSearch
 
 
 def apply_template_on_array(array, template_path, **common_context):
@@ -214,16 +221,25 @@ def experiment_date(record):
         return ', '.join(r for r in result)
 
 
+@filter_search('proceedings_link')
+def proceedings_search(record):
+    cnum = record.get('cnum', '')
+    if not cnum:
+        return None
+
+    return LiteratureSearch().query_from_iq(
+        'cnum:%s and 980__a:proceedings' % cnum
+    )
+
+
 @blueprint.app_template_filter()
 def proceedings_link(record):
-    cnum = record.get('cnum', '')
     out = ''
-    if not cnum:
+    search = proceedings_search(record)
+    if search is None:
         return out
 
-    records = LiteratureSearch().query_from_iq(
-        'cnum:%s and 980__a:proceedings' % cnum
-    ).execute()
+    records = execute_prefetched(search, 'proceedings_link')
 
     if len(records):
         if len(records) > 1:
@@ -305,16 +321,25 @@ def format_cnum_with_hyphons(value):
             return cnum + day
 
 
-@blueprint.app_template_filter()
-def link_to_hep_affiliation(record):
+@filter_search('link_to_hep_affiliation')
+def hep_affiliation_search(record):
     try:
         icn = record['ICN']
     except KeyError:
-        return ''
+        return None
 
-    records = InstitutionsSearch().query_from_iq(
+    return InstitutionsSearch().query_from_iq(
         'affiliation:%s' % icn
-    ).execute()
+    )
+
+
+@blueprint.app_template_filter()
+def link_to_hep_affiliation(record):
+    search = hep_affiliation_search(record)
+    if search is None:
+        return ''
+
+    records = execute_prefetched(search, 'link_to_hep_affiliation')
     results = records.hits.total
 
     if results:
@@ -473,6 +498,54 @@ def json_dumps(data):
     return json.dumps(data)
 
 
+PUBLICATION_INFO_SEARCH_CLASSES = {
+    'conferences': ConferencesSearch,
+    'literature': PublicLiteratureSearch,
+}
+"""Search classes of the records referenced by the publication info, by
+endpoint."""
+
+
+def _get_publication_info_ref_key(ref):
+    path_parts = urlparse(ref.get('$ref', '')).path.strip('/').split('/')
+    if len(path_parts) < 2:
+        return None
+
+    return path_parts[-2], path_parts[-1]
+
+
+def _get_publication_info_searches(record):
+    recids_by_endpoint = defaultdict(set)
+    for pub_info in record.get('publication_info', []):
+        for field in ('conference_record', 'parent_record'):
+            key = _get_publication_info_ref_key(pub_info.get(field, {}))
+            if key and key[0] in PUBLICATION_INFO_SEARCH_CLASSES:
+                recids_by_endpoint[key[0]].add(key[1])
+
+    return {
+        endpoint: PUBLICATION_INFO_SEARCH_CLASSES[endpoint]().filter(
+            'terms', control_number=sorted(recids),
+        ).source(['control_number', 'titles'])[:len(recids)]
+        for endpoint, recids in six.iteritems(recids_by_endpoint)
+    }
+
+
+@filter_search('publication_info')
+def publication_info_searches(record):
+    searches = _get_publication_info_searches(record)
+    return [searches[endpoint] for endpoint in sorted(searches)]
+
+
+def _resolve_publication_info_refs(record):
+    resolved = {}
+    searches = _get_publication_info_searches(record)
+    for endpoint, search in six.iteritems(searches):
+        for hit in execute_prefetched(search, 'publication_info'):
+            resolved[endpoint, str(hit.control_number)] = hit.to_dict()
+
+    return lambda ref: resolved.get(_get_publication_info_ref_key(ref))
+
+
 @blueprint.app_template_filter()
 def publication_info(record):
     """Display inline publication and conference information.
@@ -497,7 +570,9 @@ def publication_info(record):
             result['pub_info'] = pub_infos
 
         # Conference info line
-        for conf_info in record.conference_information:
+        conference_information = record.get_conference_information(
+            _resolve_publication_info_refs(record))
+        for conf_info in conference_information:
             if conf_info.get('conference_recid') and conf_info.get('parent_recid'):
                 if result:
                     result['conf_info'] = render_macro_from_template(
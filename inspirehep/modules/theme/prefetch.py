@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Prefetching of the data needed by the template filters.
+
+Some template filters query Elasticsearch. Instead of running these queries
+one after another while the template renders, a view can prefetch them with
+:func:`prefetch_template_filters`, which runs them all in one ``msearch``
+and keeps the responses on the request.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import logging
+
+from elasticsearch_dsl import MultiSearch
+from flask import has_request_context, request
+
+from invenio_search import current_search_client as es
+
+logger = logging.getLogger(__name__)
+
+FILTER_SEARCHES = {}
+"""Functions building the search of a template filter, by filter name."""
+
+
+def filter_search(filter_name):
+    """Register the function building the search of a template filter.
+
+    The function takes the argument of the filter and returns an
+    Elasticsearch DSL search, a list of searches, or ``None`` if the filter
+    does not need any.
+    """
+    def decorator(f):
+        FILTER_SEARCHES[filter_name] = f
+        return f
+    return decorator
+
+
+def _get_prefetched_responses():
+    if not hasattr(request, 'prefetched_responses'):
+        request.prefetched_responses = {}
+    return request.prefetched_responses
+
+
+def get_filter_searches(value, filter_name):
+    """Return the list of the searches of a template filter."""
+    searches = FILTER_SEARCHES[filter_name](value)
+    if searches is None:
+        return []
+    if not isinstance(searches, list):
+        return [searches]
+    return searches
+
+
+def _get_search_key(search):
+    return json.dumps([search._index, search.to_dict()], sort_keys=True)
+
+
+def prefetch_template_filters(values, filter_names):
+    """Run the searches of some template filters in one request.
+
+    Args:
+        values(list): the arguments the filters will be called with,
+            usually records.
+        filter_names(list): the names of the filters.
+    """
+    prefetched = _get_prefetched_responses()
+
+    searches = {}
+    for value in values:
+        for filter_name in filter_names:
+            for search in get_filter_searches(value, filter_name):
+                key = _get_search_key(search)
+                if key not in prefetched:
+                    searches[key] = search
+
+    if not searches:
+        return
+
+    keys = list(searches)
+    multi_search = MultiSearch(using=es)
+    for key in keys:
+        multi_search = multi_search.add(searches[key])
+
+    responses = multi_search.execute(raise_on_error=False)
+    for key, response in zip(keys, responses):
+        if response is not None:
+            prefetched[key] = response
+
+
+def execute_prefetched(search, filter_name):
+    """Return the response to the search of a template filter.
+
+    Within a request, the prefetched response is used if there is one,
+    otherwise the search is executed and a warning is logged.
+    """
+    if not has_request_context():
+        return search.execute()
+
+    prefetched = _get_prefetched_responses()
+    key = _get_search_key(search)
+
+    response = prefetched.get(key)
+    if response is None:
+        logger.warning(
+            'The search of the template filter %s was not prefetched.',
+            filter_name,
+        )
+        response = prefetched[key] = search.execute()
+
+    return response
@@ -101,6 +101,9 @@
           $('#record-institution-people-table').DataTable({
             "bLengthChange": false,
             "bInfo" : false,
+            "serverSide": true,
+            "ordering": false,
+            "searching": false,
             "ajax": {
               "url": "/ajax/institutions/people",
               "data": {
@@ -112,7 +115,7 @@
               if ( json.data.length > 0 ) {
                 $("#record-institution-people .datatables-loading").hide();
                 $("#datatables-wrapper ul.pagination").addClass("pagination-sm");
-                var total_text = json.data.length + " Authors ";
+                var total_text = json.recordsTotal + " Authors ";
                 $("#record-institution-people .panel-heading").html(total_text);
                 $('#record-institution-people .datatables-wrapper').show();
               }
@@ -123,9 +126,8 @@
             "aaSorting": [],
             "autoWidth": false,
             // "paging": false,
-            "searching": false,
             dom:
-              "<'row'<'col-sm-6'l><'col-sm-6'f>>" +
+              "<'row'<'col-sm-6'l>>" +
               "<'row'<'col-sm-12'tr>>" +
               "<'row'<'col-sm-12'p>>"
           });
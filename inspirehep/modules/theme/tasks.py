@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Theme tasks."""
+
+from __future__ import absolute_import, division, print_function
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from invenio_cache import current_cache
+
+from inspirehep.modules.theme.widgets import (
+    WIDGET_REFRESH_KEY,
+    WIDGETS,
+    refresh_widget,
+)
+
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(ignore_result=True)
+def refresh_landing_page_widget(name):
+    """Refresh a stale widget of the landing pages."""
+    try:
+        refresh_widget(name)
+    finally:
+        current_cache.delete(WIDGET_REFRESH_KEY.format(name))
+
+
+@shared_task(ignore_result=True)
+def refresh_landing_page_widgets():
+    """Refresh all the widgets of the landing pages."""
+    for name in WIDGETS:
+        try:
+            refresh_widget(name)
+        except Exception:
+            logger.exception('Cannot refresh the widget %s', name)
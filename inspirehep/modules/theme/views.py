@@ -25,11 +25,9 @@
 from __future__ import absolute_import, division, print_function
 
 import sys
-from datetime import date
 from functools import wraps
 
 import six
-from dateutil.relativedelta import relativedelta
 from flask import (
     Blueprint,
     abort,
@@ -44,20 +42,22 @@ from flask_login import current_user
 from flask_menu import current_menu
 from sqlalchemy.orm.exc import NoResultFound
 
+from invenio_cache import current_cache
 from invenio_mail.tasks import send_email
 from invenio_pidstore.models import PersistentIdentifier
+from invenio_records_ui.views import default_view_method
 
 from inspirehep.modules.pidstore.utils import (
     get_endpoint_from_pid_type,
     get_pid_type_from_endpoint,
 )
+from inspirehep.modules.records.serializers.response import (
+    conditional_on_index_generation,
+)
 from inspirehep.modules.search import (
     AuthorsSearch,
-    ConferencesSearch,
-    DataSearch,
     ExperimentsSearch,
     InstitutionsSearch,
-    JournalsSearch,
     LiteratureSearch
 )
 from inspirehep.utils.citations import get_and_format_citations
@@ -73,6 +73,15 @@ from inspirehep.utils.record import get_title
 from inspirehep.utils.references import get_and_format_references
 from inspirehep.utils.template import render_macro_from_template
 
+from .prefetch import prefetch_template_filters
+from .widgets import (
+    PublicLiteratureSearch,
+    get_widget,
+    public_literature_query,
+)
+
+INSTITUTION_PEOPLE_CACHE_KEY = 'institution_people::{}'
+
 CONFERENCE_CATEGORIES_TO_SERIES = [
     {
         'name': 'Accelerators',
@@ -223,7 +232,7 @@ blueprint = Blueprint(
 def index():
     """View for literature collection landing page."""
     if current_app.config['INSPIRE_FULL_THEME']:
-        number_of_records = LiteratureSearch().count()
+        number_of_records = get_widget('literature_count')
 
         return render_template(
             'inspirehep_theme/search/collection_literature.html',
@@ -238,7 +247,7 @@ def index():
 @blueprint.route('/collection/authors', methods=['GET', ])
 def hepnames():
     """View for authors collection landing page."""
-    number_of_records = AuthorsSearch().count()
+    number_of_records = get_widget('authors_count')
 
     return render_template(
         'inspirehep_theme/search/collection_authors.html',
@@ -250,8 +259,8 @@ def hepnames():
 @blueprint.route('/conferences', methods=['GET', ])
 def conferences():
     """View for conferences collection landing page."""
-    number_of_records = ConferencesSearch().count()
-    upcoming_conferences = _get_upcoming_conferences()
+    number_of_records = get_widget('conferences_count')
+    upcoming_conferences = get_widget('upcoming_conferences')
 
     return render_template(
         'inspirehep_theme/search/collection_conferences.html',
@@ -271,8 +280,8 @@ def jobs():
 @blueprint.route('/institutions', methods=['GET', ])
 def institutions():
     """View for institutions collection landing page."""
-    number_of_records = InstitutionsSearch().count()
-    some_institutions = _get_some_institutions()
+    number_of_records = get_widget('institutions_count')
+    some_institutions = get_widget('some_institutions')
 
     return render_template(
         'inspirehep_theme/search/collection_institutions.html',
@@ -285,7 +294,7 @@ def institutions():
 @blueprint.route('/experiments', methods=['GET', ])
 def experiments():
     """View for experiments collection landing page."""
-    number_of_records = ExperimentsSearch().count()
+    number_of_records = get_widget('experiments_count')
 
     return render_template(
         'inspirehep_theme/search/collection_experiments.html',
@@ -297,7 +306,7 @@ def experiments():
 @blueprint.route('/journals', methods=['GET', ])
 def journals():
     """View for journals collection landing page."""
-    number_of_records = JournalsSearch().count()
+    number_of_records = get_widget('journals_count')
 
     return render_template(
         'inspirehep_theme/search/collection_journals.html',
@@ -309,7 +318,7 @@ def journals():
 @blueprint.route('/data', methods=['GET', ])
 def data():
     """View for data collection landing page."""
-    number_of_records = DataSearch().count()
+    number_of_records = get_widget('data_count')
 
     return render_template(
         'inspirehep_theme/search/collection_data.html',
@@ -364,11 +373,29 @@ def ping():
     return 'OK'
 
 
+#
+# Detailed views
+#
+
+def render_record(pid, record, template=None, **kwargs):
+    """Render a detailed record, prefetching the data of its filters.
+
+    The template filters whose data is prefetched are listed by PID type in
+    ``THEME_PREFETCHED_TEMPLATE_FILTERS``.
+    """
+    filter_names = current_app.config[
+        'THEME_PREFETCHED_TEMPLATE_FILTERS'].get(pid.pid_type, [])
+    prefetch_template_filters([record], filter_names)
+
+    return default_view_method(pid, record, template=template, **kwargs)
+
+
 #
 # Handlers for AJAX requests regarding references and citations
 #
 
 @blueprint.route('/ajax/references', methods=['GET'])
+@conditional_on_index_generation
 def ajax_references():
     """Handler for datatables references view"""
     recid = request.args.get('recid', '')
@@ -383,6 +410,7 @@ def ajax_references():
 
 
 @blueprint.route('/ajax/citations', methods=['GET'])
+@conditional_on_index_generation
 def ajax_citations():
     """Handler for datatables citations view"""
     recid = request.args.get('recid', '')
@@ -458,14 +486,28 @@ def get_experiment_publications(experiment_name):
     return search.execute().hits.total
 
 
-def get_institution_people_datatables_rows(recid):
+def get_institution_authors(recid):
     """
-    Datatable rows to render people working in an institution.
+    Get the authors affiliated with an institution.
+
+    The result is cached for ``THEME_INSTITUTION_PEOPLE_CACHE_TIMEOUT``
+    seconds, as computing it for big institutions is expensive. As it is
+    shared by all the users, only the papers that anonymous users can view
+    are counted.
 
     :param recid: id of the institution.
     :type recid: string
+    :return: list of (author recid, number of papers) pairs, sorted by
+        decreasing number of papers.
     """
-    query = LiteratureSearch().query(
+    cache_key = INSTITUTION_PEOPLE_CACHE_KEY.format(recid)
+    authors = current_cache.get(cache_key)
+    if authors is not None:
+        return authors
+
+    query = PublicLiteratureSearch().query(
+        public_literature_query()
+    ).filter(
         "term",
         authors__affiliations__recid=recid
     )
@@ -475,55 +517,87 @@ def get_institution_people_datatables_rows(recid):
         .bucket("affiliated", "filter", term={
             "authors.affiliations.recid": recid
         })\
-        .bucket('byrecid', 'terms', field='authors.recid')
+        .bucket('byrecid', 'terms', field='authors.recid',
+                size=current_app.config['THEME_INSTITUTION_PEOPLE_MAX_AUTHORS'])
 
     records_from_es = query.execute().to_dict()
 
-    # Extract all the record ids from the aggregation
     papers_per_author = records_from_es[
         'aggregations'
     ]['authors']['affiliated']['byrecid']['buckets']
-    recids = [int(paper['key']) for paper in papers_per_author]
+    authors = [
+        (int(author['key']), author['doc_count'])
+        for author in papers_per_author
+    ]
+
+    current_cache.set(
+        cache_key,
+        authors,
+        timeout=current_app.config['THEME_INSTITUTION_PEOPLE_CACHE_TIMEOUT'],
+    )
+    return authors
 
-    # Generate query to retrieve records from author index
-    query = ""
-    for i, recid in enumerate(recids):
-        query += "recid:{}".format(recid)
-        if i != len(recids) - 1:
-            query += " OR "
 
-    results = AuthorsSearch().query_from_iq(
-        query
-    ).params(
-        size=9999,
-        _source=['control_number', 'name']
-    ).execute()
+def get_author_names(recids):
+    """
+    Get the names of authors from the authors index.
 
-    recid_map = dict(
-        [(result.control_number, result.name) for result in results]
-    )
+    The authors are looked up by their control number, in batches of
+    ``THEME_INSTITUTION_PEOPLE_BATCH_SIZE``.
+
+    :param recids: ids of the authors.
+    :type recids: list
+    :return: dictionary from the author ids to their names.
+    """
+    batch_size = current_app.config['THEME_INSTITUTION_PEOPLE_BATCH_SIZE']
+
+    names = {}
+    for i in range(0, len(recids), batch_size):
+        batch = recids[i:i + batch_size]
+        results = AuthorsSearch().filter(
+            'terms',
+            control_number=batch
+        ).params(
+            size=len(batch),
+            _source=['control_number', 'name']
+        ).execute()
+        names.update(
+            (result.control_number, result.name) for result in results
+        )
+
+    return names
+
+
+def get_institution_people_datatables_rows(recid, start=0, length=None):
+    """
+    Datatable rows to render people working in an institution.
+
+    :param recid: id of the institution.
+    :type recid: string
+    :param start: index of the first row.
+    :type start: int
+    :param length: number of rows, all of them if ``None``.
+    :type length: int
+    """
+    authors = get_institution_authors(recid)
+    if length is None:
+        authors = authors[start:]
+    else:
+        authors = authors[start:start + length]
+
+    names = get_author_names([author_recid for author_recid, _ in authors])
 
     result = []
     author_html_link = u"<a href='/authors/{recid}'>{name}</a>"
-    for author in papers_per_author:
-        row = []
-        try:
-            row.append(
-                author_html_link.format(
-                    recid=author['key'],
-                    name=recid_map[author['key']].preferred_name
-                )
-            )
-        except Exception:
-            # No preferred name, use value
-            row.append(
-                author_html_link.format(
-                    recid=author['key'],
-                    name=recid_map[author['key']].value
-                )
-            )
-        row.append(author['doc_count'])
-        result.append(row)
+    for author_recid, papers_count in authors:
+        name = names.get(author_recid)
+        # No preferred name, use value
+        display_name = getattr(name, 'preferred_name', None) or \
+            getattr(name, 'value', None) or author_recid
+        result.append([
+            author_html_link.format(recid=author_recid, name=display_name),
+            papers_count,
+        ])
 
     return result
 
@@ -595,18 +669,30 @@ def get_institution_papers_datatables_rows(hits):
 
 
 @blueprint.route('/ajax/institutions/people', methods=['GET'])
+@conditional_on_index_generation
 def ajax_institutions_people():
     """Datatable handler to get people working in an institution."""
     institution_recid = request.args.get('recid', '')
+    start = request.args.get('start', 0, type=int)
+    length = request.args.get('length', None, type=int)
+    if length is not None and length < 0:
+        length = None
+
+    total = len(get_institution_authors(institution_recid))
 
     return jsonify(
         {
-            "data": get_institution_people_datatables_rows(institution_recid)
+            "data": get_institution_people_datatables_rows(
+                institution_recid, start, length),
+            "draw": request.args.get('draw', 0, type=int),
+            "recordsFiltered": total,
+            "recordsTotal": total,
         }
     )
 
 
 @blueprint.route('/ajax/institutions/experiments', methods=['GET'])
+@conditional_on_index_generation
 def ajax_institutions_experiments():
     """Datatable handler to get experiments in an institution."""
     recid = request.args.get('recid', '')
@@ -629,6 +715,7 @@ def ajax_institutions_experiments():
 
 
 @blueprint.route('/ajax/institutions/papers', methods=['GET'])
+@conditional_on_index_generation
 def ajax_institutions_papers():
     """Datatable handler to get papers from an institution."""
     recid = request.args.get('recid', '')
@@ -742,6 +829,7 @@ def literature_new():
 #
 
 @blueprint.route('/ajax/conferences/series', methods=['GET'])
+@conditional_on_index_generation
 def ajax_other_conferences():
     """Handler for other conferences in the series"""
     recid = request.args.get('recid', '')
@@ -757,6 +845,7 @@ def ajax_other_conferences():
 
 
 @blueprint.route('/ajax/conferences/contributions', methods=['GET'])
+@conditional_on_index_generation
 def ajax_conference_contributions():
     """Handler for other conference contributions"""
     cnum = request.args.get('cnum', '')
@@ -772,6 +861,7 @@ def ajax_conference_contributions():
 
 
 @blueprint.route('/ajax/experiments/contributions', methods=['GET'])
+@conditional_on_index_generation
 def ajax_experiment_contributions():
     """Handler for experiment contributions"""
     experiment_name = request.args.get('experiment_name', '')
@@ -787,6 +877,7 @@ def ajax_experiment_contributions():
 
 
 @blueprint.route('/ajax/experiments/people', methods=['GET'])
+@conditional_on_index_generation
 def ajax_experiments_people():
     """Datatable handler to get people working in an experiment."""
     experiment_name = request.args.get('experiment_name', '')
@@ -809,28 +900,3 @@ def ajax_experiments_people():
 def linkedaccounts():
     """Redirect to the homepage when logging in with ORCID."""
     return redirect('/')
-
-
-#
-# Helpers
-#
-
-def _get_some_institutions():
-    some_institutions = InstitutionsSearch().query_from_iq(
-        ''
-    )[:250].execute()
-
-    return [hit['_source'] for hit in some_institutions.to_dict()['hits']['hits']]
-
-
-def _get_upcoming_conferences():
-    today = date.today()
-    in_six_months = today + relativedelta(months=+6)
-
-    upcoming_conferences = ConferencesSearch().query_from_iq(
-        'opening_date:{0}->{1}'.format(str(today), str(in_six_months))
-    ).sort(
-        {'opening_date': 'asc'}
-    )[1:100].execute()
-
-    return [hit['_source'] for hit in upcoming_conferences.to_dict()['hits']['hits']]
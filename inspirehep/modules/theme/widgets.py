@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Cached widgets of the collection landing pages.
+
+The landing pages show numbers and lists that change slowly, so they are
+served from the cache. An entry older than ``THEME_WIDGETS_TTL`` is still
+served, while a Celery task computes the new one in the background.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from elasticsearch_dsl.query import Q
+from flask import current_app
+
+from invenio_cache import current_cache
+
+from inspirehep.modules.records.permissions import all_restricted_collections
+from inspirehep.modules.search import (
+    AuthorsSearch,
+    ConferencesSearch,
+    DataSearch,
+    ExperimentsSearch,
+    InstitutionsSearch,
+    JournalsSearch,
+    LiteratureSearch,
+)
+
+WIDGET_CACHE_KEY = 'theme_widget::{}'
+WIDGET_REFRESH_KEY = 'theme_widget_refresh::{}'
+
+
+class PublicLiteratureSearch(LiteratureSearch):
+    """Literature search that does not depend on the request or the user.
+
+    The widgets are shared by all the users and are also computed by Celery,
+    where there is no request, so they cannot use the default filter of
+    :class:`LiteratureSearch`.
+    """
+
+    class Meta:
+        index = LiteratureSearch.Meta.index
+        doc_types = LiteratureSearch.Meta.doc_types
+
+
+def public_literature_query():
+    """Match the Literature records that anonymous users can view."""
+    query = Q('match', _collections='Literature')
+    if all_restricted_collections:
+        # ``_collections`` is indexed lowercased with a keyword tokenizer.
+        query = query & ~Q('terms', _collections=sorted(
+            collection.lower() for collection in all_restricted_collections))
+
+    return query
+
+
+def get_literature_count():
+    """Count the Literature records that anonymous users can view."""
+    return PublicLiteratureSearch().query(public_literature_query()).count()
+
+
+def get_some_institutions():
+    some_institutions = InstitutionsSearch().query_from_iq(
+        ''
+    )[:250].execute()
+
+    return [hit['_source'] for hit in some_institutions.to_dict()['hits']['hits']]
+
+
+def get_upcoming_conferences():
+    today = date.today()
+    in_six_months = today + relativedelta(months=+6)
+
+    upcoming_conferences = ConferencesSearch().query_from_iq(
+        'opening_date:{0}->{1}'.format(str(today), str(in_six_months))
+    ).sort(
+        {'opening_date': 'asc'}
+    )[1:100].execute()
+
+    return [hit['_source'] for hit in upcoming_conferences.to_dict()['hits']['hits']]
+
+
+WIDGETS = {
+    'authors_count': lambda: AuthorsSearch().count(),
+    'conferences_count': lambda: ConferencesSearch().count(),
+    'data_count': lambda: DataSearch().count(),
+    'experiments_count': lambda: ExperimentsSearch().count(),
+    'institutions_count': lambda: InstitutionsSearch().count(),
+    'journals_count': lambda: JournalsSearch().count(),
+    'literature_count': get_literature_count,
+    'some_institutions': get_some_institutions,
+    'upcoming_conferences': get_upcoming_conferences,
+}
+"""Functions computing the value of each widget, by name."""
+
+
+def refresh_widget(name):
+    """Compute the value of a widget and store it in the cache."""
+    value = WIDGETS[name]()
+    current_cache.set(
+        WIDGET_CACHE_KEY.format(name),
+        {'value': value, 'refreshed': time.time()},
+        timeout=current_app.config['THEME_WIDGETS_CACHE_TIMEOUT'],
+    )
+    return value
+
+
+def get_widget(name):
+    """Return the value of a widget.
+
+    The value is computed on the request path only when it is not cached
+    at all, which should only happen right after a deploy, as the widgets
+    are refreshed periodically by
+    :func:`inspirehep.modules.theme.tasks.refresh_landing_page_widgets`.
+    """
+    entry = current_cache.get(WIDGET_CACHE_KEY.format(name))
+    if entry is None:
+        return refresh_widget(name)
+
+    age = time.time() - entry['refreshed']
+    if age > current_app.config['THEME_WIDGETS_TTL']:
+        _schedule_refresh(name)
+
+    return entry['value']
+
+
+def _schedule_refresh(name):
+    from inspirehep.modules.theme.tasks import refresh_landing_page_widget
+
+    refresh_key = WIDGET_REFRESH_KEY.format(name)
+    timeout = current_app.config['THEME_WIDGETS_TTL']
+    if current_cache.add(refresh_key, True, timeout=timeout):
+        refresh_landing_page_widget.delay(name)
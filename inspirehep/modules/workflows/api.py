@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Holding Pen records API."""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+from contextlib import contextmanager
+
+from elasticsearch.helpers import bulk
+from flask import current_app, g
+
+from invenio_search import current_search_client as es
+from invenio_workflows import workflow_object_class
+from invenio_workflows.models import WorkflowObjectModel
+from invenio_workflows_ui.api import WorkflowUIRecord
+
+
+class InspireWorkflowUIRecord(WorkflowUIRecord):
+    """Holding Pen record that can postpone its indexing.
+
+    Every time a workflow object is saved, ``invenio-workflows-ui`` calls
+    ``create`` to index it in the Holding Pen. Inside a
+    :func:`bulk_holdingpen_indexing` block the ids of the saved objects are
+    collected instead, and indexed with a single bulk request at the end.
+    Inside a :func:`deferred_holdingpen_indexing` block the objects that were
+    indexed recently are not indexed again.
+    """
+
+    @classmethod
+    def create(cls, workflow_object, **kwargs):
+        """Create a indexable workflow JSON, indexing it unless deferred."""
+        if workflow_object.id is None:
+            return super(InspireWorkflowUIRecord, cls).create(
+                workflow_object, **kwargs)
+
+        deferred_ids = getattr(g, 'deferred_holdingpen_ids', None)
+        if deferred_ids is not None:
+            deferred_ids.add(workflow_object.id)
+            return cls(cls.record_from_object(workflow_object),
+                       workflow=workflow_object, **kwargs)
+
+        if getattr(g, 'holdingpen_indexing_deferred', False) and \
+                _is_recently_indexed(workflow_object.id):
+            return cls(cls.record_from_object(workflow_object),
+                       workflow=workflow_object, **kwargs)
+
+        record = super(InspireWorkflowUIRecord, cls).create(
+            workflow_object, **kwargs)
+        _get_indexed_at()[workflow_object.id] = time.time()
+        return record
+
+
+def _get_indexed_at():
+    if getattr(g, 'holdingpen_indexed_at', None) is None:
+        g.holdingpen_indexed_at = {}
+    return g.holdingpen_indexed_at
+
+
+def _is_recently_indexed(workflow_id):
+    indexed_at = _get_indexed_at().get(workflow_id)
+    if indexed_at is None:
+        return False
+
+    interval = current_app.config['WORKFLOWS_HOLDINGPEN_INDEXING_INTERVAL']
+    return time.time() - indexed_at < interval
+
+
+def bulk_index_holdingpen(workflow_ids):
+    """Index the given workflow objects with a single bulk request.
+
+    Args:
+        workflow_ids(iterable): ids of workflow objects.
+
+    Returns:
+        tuple: the number of indexed objects and the list of errors.
+    """
+    workflow_ids = list(workflow_ids)
+    if not workflow_ids:
+        return 0, []
+
+    indexer = InspireWorkflowUIRecord.indexer
+    models = WorkflowObjectModel.query.filter(
+        WorkflowObjectModel.id.in_(workflow_ids)).all()
+
+    actions = []
+    for model in models:
+        workflow_object = workflow_object_class(model)
+        record = InspireWorkflowUIRecord(
+            InspireWorkflowUIRecord.record_from_object(workflow_object),
+            workflow=workflow_object,
+        )
+        index, doc_type = indexer.record_to_index(record)
+        if not index or not doc_type:
+            continue
+
+        actions.append({
+            '_op_type': 'index',
+            '_index': index,
+            '_type': doc_type,
+            '_id': str(model.id),
+            '_source': indexer._prepare_record(record, index, doc_type),
+        })
+
+    indexed_at = _get_indexed_at()
+    now = time.time()
+    for action in actions:
+        indexed_at[int(action['_id'])] = now
+
+    return bulk(es, actions, raise_on_error=False)
+
+
+@contextmanager
+def bulk_holdingpen_indexing():
+    """Index the workflow objects saved in the block with one bulk request.
+
+    The objects are indexed when the block exits, so everything saved in it
+    must have been committed by then. Nested blocks are merged into the
+    outermost one.
+    """
+    if getattr(g, 'deferred_holdingpen_ids', None) is not None:
+        yield
+        return
+
+    g.deferred_holdingpen_ids = set()
+    try:
+        yield
+        deferred_ids = g.deferred_holdingpen_ids
+    finally:
+        g.deferred_holdingpen_ids = None
+
+    bulk_index_holdingpen(deferred_ids)
+
+
+def is_holdingpen_indexing_deferred():
+    """Return whether workflow steps may postpone Holding Pen indexing."""
+    return current_app.config.get('WORKFLOWS_DEFER_HOLDINGPEN_INDEXING', False)
+
+
+@contextmanager
+def deferred_holdingpen_indexing():
+    """Postpone the indexing of the workflow objects saved in the block.
+
+    Has an effect only when ``WORKFLOWS_DEFER_HOLDINGPEN_INDEXING`` is set.
+    A workflow object saved in the block is still indexed if it was not
+    indexed yet in the current application context, or if it was indexed
+    more than ``WORKFLOWS_HOLDINGPEN_INDEXING_INTERVAL`` seconds ago.
+    Otherwise its indexing is left to the next save outside such a block,
+    like the one done by the workflow engine when the workflow halts or
+    completes.
+    """
+    if not is_holdingpen_indexing_deferred() or \
+            getattr(g, 'holdingpen_indexing_deferred', False):
+        yield
+        return
+
+    g.holdingpen_indexing_deferred = True
+    try:
+        yield
+    finally:
+        g.holdingpen_indexing_deferred = False
@@ -105,3 +105,41 @@ class WorkflowsRecordSources(db.Model):
         ),
         default=lambda: dict(),
     )
+
+
+class WorkflowsTicketOutbox(db.Model):
+
+    __tablename__ = 'workflows_ticket_outbox'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+
+    workflow_id = db.Column(
+        db.Integer,
+        db.ForeignKey('workflows_object.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True,
+    )
+
+    # One of ``create``, ``reply`` or ``close``
+    action = db.Column(db.Text, nullable=False)
+    payload = db.Column(
+        JSONType().with_variant(
+            postgresql.JSON(none_as_null=True),
+            'postgresql',
+        ),
+        default=lambda: dict(),
+    )
+
+    # One of ``pending``, ``sent`` or ``failed``
+    status = db.Column(db.Text, default='pending', nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text, default='', nullable=False)
+    ticket_id = db.Column(db.Integer, nullable=True)
+
+    created = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+    )
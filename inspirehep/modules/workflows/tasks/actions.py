@@ -36,6 +36,7 @@ from invenio_workflows import ObjectStatus
 
 from inspire_schemas.builders import LiteratureBuilder
 from inspire_utils.record import get_value
+from inspirehep.modules.workflows.api import deferred_holdingpen_indexing
 from inspirehep.modules.workflows.utils import (
     get_pdf_in_workflow,
     log_workflows_action,
@@ -323,6 +324,10 @@ def save_workflow(obj, eng):
         The ``save`` function only indexes the current workflow. For this
         reason, we need to ``db.session.commit()``.
 
+        When ``WORKFLOWS_DEFER_HOLDINGPEN_INDEXING`` is set, the Holding
+        Pen document is not reindexed if it was indexed recently, but the
+        changes are still committed.
+
     TODO:
         Refactor: move this logic inside ``WorkflowObject.save()``.
 
@@ -333,7 +338,9 @@ def save_workflow(obj, eng):
     Returns:
         None
     """
-    obj.save()
+    with deferred_holdingpen_indexing():
+        obj.save()
+
     db.session.commit()
 
 
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Tasks to process harvested articles in micro-batches."""
+
+from __future__ import absolute_import, division, print_function
+
+import copy
+import json
+from collections import Counter
+from multiprocessing.pool import ThreadPool
+
+import requests
+from celery import shared_task
+from flask import current_app
+from six.moves.urllib.parse import urlparse
+
+from inspire_crawler.errors import CrawlerJobError
+from inspire_crawler.models import CrawlerJob, CrawlerWorkflowObject, JobStatus
+from inspire_crawler.tasks import submit_results as submit_crawler_results
+from invenio_db import db
+from invenio_workflows import ObjectStatus, start, workflow_object_class
+
+from inspire_utils.dedupers import dedupe_list
+from inspire_utils.record import get_value
+from inspirehep.modules.workflows.api import bulk_holdingpen_indexing
+from inspirehep.modules.workflows.utils import (
+    json_api_request,
+    with_debug_logging,
+)
+
+from .actions import is_experimental_paper
+from .beard import get_beard_url, prepare_payload
+from .magpie import get_magpie_url, prepare_magpie_payload
+from .matching import (
+    is_being_harvested_on_legacy,
+    is_too_old,
+    match_many,
+    search_holdingpen_matches,
+    split_holdingpen_matches,
+)
+
+
+@shared_task(ignore_result=True)
+def submit_results(job_id, errors, log_file, results_uri, results_data=None):
+    """Receive the results of a crawl job and start their workflows.
+
+    This is the task the crawler sends its results to. Unless
+    ``WORKFLOWS_ARTICLE_BATCHING`` is set, or if the job does not run the
+    ``article`` workflow, the results are handed over to
+    :func:`inspire_crawler.tasks.submit_results`, which starts one workflow
+    per record. Otherwise the records are started by
+    :func:`start_articles_in_batches`.
+
+    Args:
+        job_id(str): the id of the crawl job.
+        errors(list): the errors of the crawl job, if any.
+        log_file(str): the path to the log of the crawl job.
+        results_uri(str): the URI of the results of the crawl job.
+        results_data(list): the results, if they are not read from
+            ``results_uri``.
+    """
+    job = CrawlerJob.get_by_job(job_id)
+    if not current_app.config.get('WORKFLOWS_ARTICLE_BATCHING') or \
+            job.workflow != 'article':
+        submit_crawler_results(
+            job_id, errors, log_file, results_uri, results_data=results_data)
+        return
+
+    job.logs = log_file
+    job.results = results_uri
+    if errors:
+        job.status = JobStatus.ERROR
+        job.save()
+        db.session.commit()
+        raise CrawlerJobError(str(errors))
+
+    results_path = urlparse(results_uri).path
+    if results_data is None:
+        with open(results_path) as results_file:
+            results_data = [json.loads(line) for line in results_file if line.strip()]
+
+    records = []
+    records_extra_data = []
+    for crawl_result in results_data:
+        crawl_result = copy.deepcopy(crawl_result)
+        record = crawl_result.pop('record')
+        if crawl_result.get('errors'):
+            obj = workflow_object_class.create(
+                data=record,
+                data_type='hep',
+                status=ObjectStatus.ERROR,
+                extra_data={'crawl_errors': crawl_result},
+            )
+            db.session.add(CrawlerWorkflowObject(job_id=job_id, object_id=obj.id))
+            continue
+
+        extra_data = {
+            'crawler_job_id': job_id,
+            'crawler_results_path': results_path,
+        }
+        record_extra = record.pop('extra_data', {})
+        if record_extra:
+            extra_data['record_extra'] = record_extra
+        extra_data['source_data'] = {
+            'data': copy.deepcopy(record),
+            'extra_data': copy.deepcopy(extra_data),
+        }
+        records.append(record)
+        records_extra_data.append(extra_data)
+    db.session.commit()
+
+    object_ids = start_articles_in_batches(
+        records,
+        extra_data=records_extra_data,
+        queue=current_app.config.get('CRAWLER_CELERY_QUEUE'),
+    )
+    for object_id in object_ids:
+        db.session.add(CrawlerWorkflowObject(job_id=job_id, object_id=object_id))
+
+    current_app.logger.info('Parsed {} records.'.format(len(results_data)))
+    job.status = JobStatus.FINISHED
+    job.save()
+    db.session.commit()
+
+
+@shared_task(ignore_result=True)
+def start_articles_in_batches(records, batch_size=None, extra_data=None, queue=None):
+    """Start the ``article`` workflow on many harvested records.
+
+    The records are split in batches of ``WORKFLOWS_ARTICLE_BATCH_SIZE``
+    elements. The workflow objects of a batch are created together and
+    prepared by :func:`prepare_articles_batch`, then each of them runs its
+    own ``article`` workflow, which reuses the precomputed results.
+
+    Args:
+        records(list): the harvested records.
+        batch_size(int): overrides ``WORKFLOWS_ARTICLE_BATCH_SIZE``.
+        extra_data(list): the initial ``extra_data`` of each workflow object.
+        queue(str): the Celery queue of the workflows.
+
+    Returns:
+        list: the ids of the workflow objects.
+    """
+    if batch_size is None:
+        batch_size = current_app.config['WORKFLOWS_ARTICLE_BATCH_SIZE']
+    if extra_data is None:
+        extra_data = [{} for _ in records]
+
+    object_ids = []
+    for i in range(0, len(records), batch_size):
+        objs = [
+            workflow_object_class.create(
+                data=record,
+                data_type='hep',
+                extra_data=copy.deepcopy(record_extra_data),
+            )
+            for record, record_extra_data in zip(
+                records[i:i + batch_size], extra_data[i:i + batch_size])
+        ]
+        db.session.commit()
+
+        prepare_articles_batch(objs)
+
+        for obj in objs:
+            start.apply_async(
+                kwargs={'workflow_name': 'article', 'object_id': obj.id},
+                queue=queue,
+            )
+        object_ids.extend(obj.id for obj in objs)
+
+    return object_ids
+
+
+def prepare_articles_batch(objs):
+    """Run the matching and prediction steps over a batch of articles.
+
+    The matches in the Holding Pen and in the Literature collection are
+    fetched with one ``msearch`` each, and the Beard and Magpie predictions
+    are requested in parallel. The results are stored in
+    ``extra_data['_batch_results']``, where the corresponding workflow steps
+    look for them before calling the external services themselves. Only the
+    ids of the matches are kept, and the field is not indexed in the Holding
+    Pen.
+
+    Objects of the batch sharing an arXiv eprint or a DOI would have matched
+    each other in the Holding Pen, so their Holding Pen matching is left to
+    the workflow. Objects that the workflow stops before matching, because
+    they are harvested on Legacy or too old, are not prepared at all.
+
+    The predictions are requested for all the other objects, even if the
+    workflow may still stop after matching them in the Holding Pen, as that
+    depends on the Holding Pen when the workflow runs. Their payloads only
+    use the titles, the abstracts and the arXiv categories, which the steps
+    before the predictions do not change.
+
+    Finally the objects are saved with a single commit and indexed in the
+    Holding Pen with a single bulk request.
+
+    Args:
+        objs(list): workflow objects.
+    """
+    objs = [obj for obj in objs if not _stops_before_matching(obj)]
+    if not objs:
+        return
+
+    holdingpen_matches = search_holdingpen_matches(objs)
+    record_matches = match_many([obj.data for obj in objs])
+    predictions = get_batch_predictions(objs)
+    duplicated_ids = _get_duplicated_ids(objs)
+
+    with bulk_holdingpen_indexing():
+        for obj, obj_holdingpen_matches, obj_record_matches, obj_predictions \
+                in zip(objs, holdingpen_matches, record_matches, predictions):
+            batch_results = dict(obj_predictions)
+            batch_results['record_matches'] = [
+                el['_source']['control_number']
+                for el in dedupe_list(obj_record_matches)
+            ]
+            if not set(_get_identifiers(obj)) & duplicated_ids:
+                batch_results['holdingpen_matches'] = split_holdingpen_matches(
+                    obj.data, obj_holdingpen_matches)
+
+            obj.extra_data['_batch_results'] = batch_results
+            obj.save()
+
+        db.session.commit()
+
+
+def get_batch_predictions(objs):
+    """Request the Beard and Magpie predictions of a batch of articles.
+
+    Beard and Magpie take one document per request, so the requests are sent
+    in parallel, at most ``PREDICTION_API_MAX_CONCURRENT_REQUESTS`` at a time.
+    Failed requests are left out, so that the workflow retries them.
+
+    Args:
+        objs(list): workflow objects.
+
+    Returns:
+        list: for each workflow object, a dictionary from prediction name to
+        the response of the corresponding service.
+    """
+    beard_url = get_beard_url()
+    magpie_url = get_magpie_url()
+
+    prediction_requests = []
+    for position, obj in enumerate(objs):
+        if beard_url:
+            prediction_requests.append(
+                (position, 'beard_coreness', beard_url, prepare_payload(obj.data)))
+        if magpie_url:
+            corpora = ['keywords', 'categories']
+            if is_experimental_paper(obj, None):
+                corpora.append('experiments')
+
+            for corpus in corpora:
+                prediction_requests.append((
+                    position,
+                    'magpie_' + corpus,
+                    magpie_url,
+                    prepare_magpie_payload(obj.data, corpus=corpus),
+                ))
+
+    predictions = [{} for _ in objs]
+    if not prediction_requests:
+        return predictions
+
+    app = current_app._get_current_object()
+
+    def _send(prediction_request):
+        _, _, url, payload = prediction_request
+        with app.app_context():
+            try:
+                return json_api_request(url, payload)
+            except requests.exceptions.RequestException:
+                return None
+
+    pool = ThreadPool(min(
+        len(prediction_requests),
+        current_app.config['PREDICTION_API_MAX_CONCURRENT_REQUESTS'],
+    ))
+    try:
+        results = pool.map(_send, prediction_requests)
+    finally:
+        pool.close()
+        pool.join()
+
+    for (position, name, _, _), result in zip(prediction_requests, results):
+        if result is not None:
+            predictions[position][name] = result
+
+    return predictions
+
+
+@with_debug_logging
+def clear_batch_results(obj, eng):
+    """Forget the results computed by a batch that were not consumed."""
+    obj.extra_data.pop('_batch_results', None)
+
+
+def _stops_before_matching(obj):
+    return is_being_harvested_on_legacy(obj.data) or is_too_old(
+        obj.data,
+        days_ago=current_app.config.get('INSPIRE_ACCEPTANCE_TIMEOUT', 5),
+    )
+
+
+def _get_identifiers(obj):
+    return get_value(obj.data, 'arxiv_eprints.value', []) + \
+        get_value(obj.data, 'dois.value', [])
+
+
+def _get_duplicated_ids(objs):
+    counts = Counter(
+        identifier
+        for obj in objs
+        for identifier in set(_get_identifiers(obj))
+    )
+    return {identifier for identifier, count in counts.items() if count > 1}
@@ -28,7 +28,10 @@ import requests
 from flask import current_app
 
 from inspire_utils.record import get_value
-from inspirehep.modules.workflows.utils import json_api_request
+from inspirehep.modules.workflows.utils import (
+    json_api_request,
+    pop_batch_result,
+)
 
 from ..utils import with_debug_logging
 
@@ -70,14 +73,16 @@ def guess_coreness(obj, eng):
     if not predictor_url:
         return
 
-    # FIXME: Have option to select different prediction models when
-    # available in the API
-    payload = prepare_payload(obj.data)
+    results = pop_batch_result(obj, 'beard_coreness')
+    if results is None:
+        # FIXME: Have option to select different prediction models when
+        # available in the API
+        payload = prepare_payload(obj.data)
 
-    try:
-        results = json_api_request(predictor_url, payload)
-    except requests.exceptions.RequestException:
-        results = {}
+        try:
+            results = json_api_request(predictor_url, payload)
+        except requests.exceptions.RequestException:
+            results = {}
 
     if results:
         scores = results.get('scores') or []
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Tasks to continue the workflows waiting for a callback from Legacy."""
+
+from __future__ import absolute_import, division, print_function
+
+import re
+from collections import OrderedDict
+from os.path import join
+
+from celery import shared_task
+from flask import current_app
+
+from invenio_db import db
+from invenio_workflows import workflow_object_class
+from invenio_workflows.models import WorkflowObjectModel
+
+from inspirehep.modules.workflows.api import bulk_holdingpen_indexing
+
+
+def get_base_url():
+    """Return base URL for generated URLs for remote reference."""
+    base_url = current_app.config.get(
+        "LEGACY_ROBOTUPLOAD_URL",
+        current_app.config["SERVER_NAME"],
+    )
+    if not re.match('^https?://', base_url):
+        base_url = 'http://{}'.format(base_url)
+    return base_url
+
+
+@shared_task(ignore_result=True)
+def continue_workflows_from_callback(callbacks, batch_size=None):
+    """Continue the workflows that received a callback from Legacy.
+
+    The callbacks are split in batches of ``WORKFLOWS_CALLBACK_BATCH_SIZE``
+    elements. The workflow objects of a batch are loaded with one query,
+    updated with the callback data, saved with a single commit and indexed
+    in the Holding Pen with a single bulk request, then continued.
+
+    Args:
+        callbacks(list): dictionaries with the ``workflow_id`` of a workflow
+            and the ``recid`` of its record on Legacy, and optionally the
+            ``result`` sent by Legacy.
+        batch_size(int): overrides ``WORKFLOWS_CALLBACK_BATCH_SIZE``.
+    """
+    if batch_size is None:
+        batch_size = current_app.config['WORKFLOWS_CALLBACK_BATCH_SIZE']
+
+    for i in range(0, len(callbacks), batch_size):
+        _continue_workflows_batch(callbacks[i:i + batch_size])
+
+
+def _continue_workflows_batch(callbacks):
+    workflow_ids = [int(callback['workflow_id']) for callback in callbacks]
+    models = {
+        model.id: model for model in WorkflowObjectModel.query.filter(
+            WorkflowObjectModel.id.in_(workflow_ids)
+        )
+    }
+
+    base_url = get_base_url()
+    workflow_objects = OrderedDict()
+    with bulk_holdingpen_indexing():
+        for workflow_id, callback in zip(workflow_ids, callbacks):
+            if workflow_id not in workflow_objects:
+                model = models.get(workflow_id)
+                if model is None:
+                    current_app.logger.error(
+                        'No workflow object with the id %s could be found.',
+                        workflow_id,
+                    )
+                    continue
+                workflow_objects[workflow_id] = workflow_object_class(model)
+
+            workflow_object = workflow_objects[workflow_id]
+            recid = callback['recid']
+            workflow_object.extra_data['url'] = join(
+                base_url,
+                'record',
+                str(recid)
+            )
+            workflow_object.extra_data['recid'] = recid
+            workflow_object.extra_data['callback_result'] = callback.get(
+                'result', {})
+            workflow_object.save()
+
+        db.session.commit()
+
+    for workflow_object in workflow_objects.values():
+        workflow_object.continue_workflow(delayed=True)
@@ -29,7 +29,10 @@ import requests
 from flask import current_app
 
 from inspire_utils.record import get_value
-from inspirehep.modules.workflows.utils import json_api_request
+from inspirehep.modules.workflows.utils import (
+    json_api_request,
+    pop_batch_result,
+)
 
 from ..utils import with_debug_logging
 
@@ -78,11 +81,13 @@ def guess_keywords(obj, eng):
     if not magpie_url:
         # Skip task if no API URL set
         return
-    payload = prepare_magpie_payload(obj.data, corpus="keywords")
-    try:
-        results = json_api_request(magpie_url, payload)
-    except requests.exceptions.RequestException:
-        results = {}
+    results = pop_batch_result(obj, 'magpie_keywords')
+    if results is None:
+        payload = prepare_magpie_payload(obj.data, corpus="keywords")
+        try:
+            results = json_api_request(magpie_url, payload)
+        except requests.exceptions.RequestException:
+            results = {}
 
     if results:
         labels = results.get('labels', [])
@@ -106,8 +111,10 @@ def guess_categories(obj, eng):
     if not magpie_url:
         # Skip task if no API URL set
         return
-    payload = prepare_magpie_payload(obj.data, corpus="categories")
-    results = json_api_request(magpie_url, payload)
+    results = pop_batch_result(obj, 'magpie_categories')
+    if results is None:
+        payload = prepare_magpie_payload(obj.data, corpus="categories")
+        results = json_api_request(magpie_url, payload)
     if results:
         labels = results.get('labels', [])
         categories = filter_magpie_response(labels, limit=0.22)
@@ -131,8 +138,10 @@ def guess_experiments(obj, eng):
         # Skip task if no API URL set
         return
 
-    payload = prepare_magpie_payload(obj.data, corpus="experiments")
-    results = json_api_request(magpie_url, payload)
+    results = pop_batch_result(obj, 'magpie_experiments')
+    if results is None:
+        payload = prepare_magpie_payload(obj.data, corpus="experiments")
+        results = json_api_request(magpie_url, payload)
     if results:
         all_predictions = results.get('labels', [])
         selected_experiments = filter_magpie_response(
@@ -27,18 +27,44 @@ from __future__ import absolute_import, division, print_function
 import datetime
 from functools import wraps
 
+from celery import shared_task
 from flask import current_app
+from werkzeug.utils import import_string
 
 from invenio_db import db
+from invenio_search import current_search_client as es
 from invenio_workflows import workflow_object_class, WorkflowEngine
+from invenio_workflows.models import WorkflowObjectModel
 
 from inspire_matcher.api import match
+from inspire_matcher.core import compile as compile_matcher_query
 from inspire_utils.dedupers import dedupe_list
 from inspirehep.utils.datefilter import date_older_than
 from inspirehep.utils.record import get_arxiv_categories, get_arxiv_id, get_value
+from inspirehep.modules.workflows.api import deferred_holdingpen_indexing
 from inspirehep.modules.workflows.tasks.actions import mark
 
-from ..utils import with_debug_logging
+from ..utils import pop_batch_result, with_debug_logging
+
+
+HOLDINGPEN_MATCH_QUERIES = [
+    {
+        'path': 'arxiv_eprints.value',
+        'search_path': 'metadata.arxiv_eprints.value.raw',
+        'type': 'exact',
+    },
+    {
+        'path': 'dois.value',
+        'search_path': 'metadata.dois.value.raw',
+        'type': 'exact',
+    },
+]
+
+HOLDINGPEN_MATCH_SOURCE = [
+    '_extra_data.approved',
+    '_workflow.status',
+    'metadata.acquisition_source.source',
+]
 
 
 @with_debug_logging
@@ -96,8 +122,10 @@ def article_exists(obj, eng):
         ``False`` otherwise.
 
     """
-    matches = dedupe_list(match(obj.data))
-    record_ids = [el['_source']['control_number'] for el in matches]
+    record_ids = pop_batch_result(obj, 'record_matches')
+    if record_ids is None:
+        matches = dedupe_list(match(obj.data))
+        record_ids = [el['_source']['control_number'] for el in matches]
     if record_ids:
         obj.extra_data['record_matches'] = record_ids
         return True
@@ -152,6 +180,15 @@ def previously_rejected(days_ago=None):
     return _previously_rejected
 
 
+def _is_non_completed(base_record, match_result):
+    return not get_value(match_result, '_source._workflow.status') == 'COMPLETED'
+
+
+def _is_rejected_and_completed(base_record, match_result):
+    return get_value(match_result, '_source._workflow.status') == 'COMPLETED' and \
+        get_value(match_result, '_source._extra_data.approved') is False
+
+
 def match_non_completed_wf_in_holdingpen(obj, eng):
     """Return ``True`` if a matching wf is processing in the HoldingPen.
 
@@ -171,10 +208,7 @@ def match_non_completed_wf_in_holdingpen(obj, eng):
         Pen that is not COMPLETED, ``False`` otherwise.
 
     """
-    def _non_completed(base_record, match_result):
-        return not get_value(match_result, '_source._workflow.status') == 'COMPLETED'
-
-    matched_ids = _pending_in_holding_pen(obj, _non_completed)
+    matched_ids = _pending_in_holding_pen(obj, _is_non_completed)
     obj.extra_data['holdingpen_matches'] = matched_ids
     return bool(matched_ids)
 
@@ -198,15 +232,163 @@ def match_previously_rejected_wf_in_holdingpen(obj, eng):
         Pen that is not COMPLETED, ``False`` otherwise.
 
     """
-    def _rejected_and_completed(base_record, match_result):
-        return get_value(match_result, '_source._workflow.status') == 'COMPLETED' and \
-            get_value(match_result, '_source._extra_data.approved') is False
-
-    matched_ids = _pending_in_holding_pen(obj, _rejected_and_completed)
+    matched_ids = _pending_in_holding_pen(obj, _is_rejected_and_completed)
     obj.extra_data['previously_rejected_matches'] = matched_ids
     return bool(matched_ids)
 
 
+@with_debug_logging
+def match_wfs_in_holdingpen(obj, eng):
+    """Match the current workflow object against the HoldingPen once.
+
+    Equivalent to running both :func:`match_non_completed_wf_in_holdingpen`
+    and :func:`match_previously_rejected_wf_in_holdingpen`, but sends all the
+    queries in a single ``msearch`` and splits the hits afterwards using the
+    ``_source`` fields returned by Elasticsearch.
+
+    Sets ``holdingpen_matches`` and ``previously_rejected_matches`` in
+    ``extra_data`` to the lists of ids that matched.
+
+    Arguments:
+        obj: a workflow object.
+        eng: a workflow engine.
+
+    Returns:
+        None
+
+    """
+    matched_ids = pop_batch_result(obj, 'holdingpen_matches')
+    if matched_ids is None:
+        matched_ids = split_holdingpen_matches(
+            obj.data, search_holdingpen_matches([obj])[0])
+
+    obj.extra_data.update(matched_ids)
+
+
+def split_holdingpen_matches(data, matches):
+    """Split the Holding Pen hits matching ``data`` by workflow state.
+
+    Args:
+        data(dict): the record being matched.
+        matches(list): its hits returned by :func:`search_holdingpen_matches`.
+
+    Returns:
+        (dict): the ids of the non completed workflows under
+        ``holdingpen_matches`` and those of the rejected ones under
+        ``previously_rejected_matches``.
+
+    """
+    return {
+        'holdingpen_matches': [
+            int(el['_id']) for el in matches if _is_non_completed(data, el)
+        ],
+        'previously_rejected_matches': [
+            int(el['_id']) for el in matches
+            if _is_rejected_and_completed(data, el)
+        ],
+    }
+
+
+def search_holdingpen_matches(objs):
+    """Return the hits matching each of ``objs`` in the holdingpen.
+
+    Matches the holdingpen records by their ``arxiv_eprint`` and their
+    ``doi``, like :func:`_pending_in_holding_pen` does, but the queries for
+    all the given workflow objects are sent in a single ``msearch``. Only the
+    fields listed in ``HOLDINGPEN_MATCH_SOURCE`` are returned in the
+    ``_source`` of each hit.
+
+    Args:
+        objs(list): workflow objects.
+
+    Returns:
+        (list): for each workflow object, the list of its deduplicated hits
+        excluding the object itself.
+
+    """
+    config = {
+        'algorithm': [
+            {
+                'queries': HOLDINGPEN_MATCH_QUERIES,
+                'validator': lambda record, result: True,
+            },
+        ],
+        'doc_type': 'hep',
+        'index': 'holdingpen-hep',
+    }
+    matches = match_many(
+        [obj.data for obj in objs],
+        config,
+        source=HOLDINGPEN_MATCH_SOURCE,
+    )
+
+    return [
+        [el for el in dedupe_list(obj_hits) if int(el['_id']) != obj.id]
+        for obj, obj_hits in zip(objs, matches)
+    ]
+
+
+def _get_matcher_validator(validator):
+    if callable(validator):
+        return validator
+
+    return import_string(
+        validator or 'inspire_matcher.validators:default_validator')
+
+
+def match_many(records, config=None, source=None):
+    """Return the matches of several records, using a single ``msearch``.
+
+    Works like ``inspire_matcher.api.match`` and takes the same
+    configuration, but the queries of all the given records are sent to
+    Elasticsearch in one request.
+
+    Args:
+        records(list): the records to match.
+        config(dict): a matcher configuration, by default the one in
+            ``MATCHER_DEFAULT_CONFIGURATION``.
+        source(list): if given, only these fields are returned in the
+            ``_source`` of each hit.
+
+    Returns:
+        (list): for each record, the list of hits that were validated.
+
+    """
+    if config is None:
+        config = current_app.config['MATCHER_DEFAULT_CONFIGURATION']
+
+    body = []
+    owners = []
+    for position, record in enumerate(records):
+        for step in config['algorithm']:
+            validator = _get_matcher_validator(step.get('validator'))
+            for query in step['queries']:
+                query_body = compile_matcher_query(dict(query), record)
+                if not query_body:
+                    continue
+
+                if source:
+                    query_body['_source'] = source
+                body.extend([{}, query_body])
+                owners.append((position, validator))
+
+    matches = [[] for _ in records]
+    if not body:
+        return matches
+
+    responses = es.msearch(
+        index=config['index'],
+        doc_type=config['doc_type'],
+        body=body,
+    )['responses']
+    for (position, validator), response in zip(owners, responses):
+        for hit in get_value(response, 'hits.hits', []):
+            if validator(records[position], hit):
+                matches[position].append(hit)
+
+    return matches
+
+
 @with_debug_logging
 def _pending_in_holding_pen(obj, validation_func):
     """Return the list of matching workflows in the holdingpen.
@@ -226,18 +408,7 @@ def _pending_in_holding_pen(obj, validation_func):
     config = {
         'algorithm': [
             {
-                'queries': [
-                    {
-                        'path': 'arxiv_eprints.value',
-                        'search_path': 'metadata.arxiv_eprints.value.raw',
-                        'type': 'exact',
-                    },
-                    {
-                        'path': 'dois.value',
-                        'search_path': 'metadata.dois.value.raw',
-                        'type': 'exact',
-                    },
-                ],
+                'queries': HOLDINGPEN_MATCH_QUERIES,
                 'validator': validation_func,
             },
         ],
@@ -248,6 +419,46 @@ def _pending_in_holding_pen(obj, validation_func):
     return [int(el['_id']) for el in matches if int(el['_id']) != obj.id]
 
 
+def _get_holdingpen_sources(workflow_ids):
+    """Return the acquisition source of the given holdingpen workflows.
+
+    The sources are read from the ``holdingpen-hep`` index with a single
+    ``mget``. The workflows that are missing from the index are loaded from
+    the database in a single query instead.
+
+    Args:
+        workflow_ids(list): ids of workflow objects.
+
+    Returns:
+        dict: a mapping from workflow id to its lowercased source.
+
+    """
+    if not workflow_ids:
+        return {}
+
+    sources = {}
+    documents = es.mget(
+        index='holdingpen-hep',
+        doc_type='hep',
+        body={'ids': workflow_ids},
+        _source_include=['metadata.acquisition_source.source'],
+    )
+    for document in documents['docs']:
+        if document.get('found'):
+            sources[int(document['_id'])] = get_value(
+                document, '_source.metadata.acquisition_source.source', '')
+
+    missing_ids = [wf_id for wf_id in workflow_ids if wf_id not in sources]
+    if missing_ids:
+        models = WorkflowObjectModel.query.filter(
+            WorkflowObjectModel.id.in_(missing_ids)).all()
+        for model in models:
+            sources[model.id] = get_value(
+                model.data, 'acquisition_source.source', '')
+
+    return {wf_id: source.lower() for wf_id, source in sources.items()}
+
+
 @with_debug_logging
 def delete_self_and_stop_processing(obj, eng):
     """Delete both versions of itself and stops the workflow."""
@@ -296,12 +507,8 @@ def has_same_source(extra_data_key):
         except KeyError:
             workflows = []
 
-        for wf_id in workflows:
-            wf = workflow_object_class.get(wf_id)
-            wf_source = get_value(wf.data, 'acquisition_source.source').lower()
-            if wf_source == current_source:
-                return True
-        return False
+        wf_sources = _get_holdingpen_sources(workflows)
+        return current_source in wf_sources.values()
 
     return _get_wfs_same_source
 
@@ -318,6 +525,10 @@ def stop_matched_holdingpen_wfs(obj, eng):
     to stop the first workflow and let the current one being processed,
     since it the latest metadata.
 
+    The matched workflows are stopped asynchronously by
+    :func:`stop_holdingpen_workflows`, which is why the current workflow
+    object is committed first.
+
     Args:
         obj: a workflow object.
         eng: a workflow engine.
@@ -325,14 +536,37 @@ def stop_matched_holdingpen_wfs(obj, eng):
     Returns:
         None
     """
-    stopping_steps = [mark('stopped-by-wf', int(obj.id)), stop_processing]
+    with deferred_holdingpen_indexing():
+        obj.save()
+    db.session.commit()
+
+    stop_holdingpen_workflows.delay(
+        obj.extra_data['holdingpen_matches'],
+        int(obj.id),
+    )
+
 
-    obj.save()
+@shared_task(ignore_result=True)
+def stop_holdingpen_workflows(workflow_ids, stopped_by):
+    """Stop the given workflow objects in the holdingpen.
 
-    for holdingpen_wf_id in obj.extra_data['holdingpen_matches']:
-        holdingpen_wf = workflow_object_class.get(holdingpen_wf_id)
+    All the workflow objects are loaded with a single query, then each of
+    them gets its steps replaced by a ``stop`` step and is processed.
+
+    Args:
+        workflow_ids(list): ids of the workflow objects to stop.
+        stopped_by(int): id of the workflow object that caused the stop.
+    """
+    stopping_steps = [mark('stopped-by-wf', stopped_by), stop_processing]
+
+    models = WorkflowObjectModel.query.filter(
+        WorkflowObjectModel.id.in_(workflow_ids)).all()
+    for model in models:
+        holdingpen_wf = workflow_object_class(model)
         holdingpen_wf_eng = WorkflowEngine.from_uuid(holdingpen_wf.id_workflow)
 
         # stop this holdingpen workflow by replacing its steps with a stop step
         holdingpen_wf_eng.callbacks.replace(stopping_steps)
         holdingpen_wf_eng.process([holdingpen_wf])
+
+    db.session.commit()
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Outbox of the RT ticket operations requested by workflows."""
+
+from __future__ import absolute_import, division, print_function
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from multiprocessing.pool import ThreadPool
+
+from celery import shared_task
+from flask import current_app
+from redis import StrictRedis
+from redis_lock import Lock
+from six import text_type
+from sqlalchemy import func, or_
+from sqlalchemy.orm import aliased
+
+from invenio_db import db
+
+from inspirehep.modules.workflows.models import WorkflowsTicketOutbox
+from inspirehep.utils import tickets
+
+
+def is_ticket_outbox_enabled():
+    """Return whether workflow steps queue their RT operations."""
+    return current_app.config.get('WORKFLOWS_TICKET_OUTBOX', False)
+
+
+def queue_ticket_action(obj, action, **payload):
+    """Queue an RT operation of a workflow in the outbox.
+
+    The operation is stored in the same transaction as the workflow object,
+    then :func:`dispatch_ticket_outbox` is scheduled to send it.
+
+    Args:
+        obj: a workflow object.
+        action(str): one of ``create``, ``reply`` or ``close``.
+        payload: the arguments of the operation. ``create`` expects
+            ``queue``, ``requestors``, ``subject``, ``body``, ``recid`` and
+            ``ticket_id_key``, the key under which the ticket id is looked
+            up by :func:`get_outbox_ticket_id`. ``reply`` expects ``body`` and ``keep_new``, and
+            ``close`` expects ``recid``. Both take the ``ticket_id``, or the
+            ``ticket_id_key`` of a ticket created by a previous operation.
+    """
+    db.session.add(WorkflowsTicketOutbox(
+        workflow_id=obj.id,
+        action=action,
+        payload=payload,
+    ))
+    obj.save()
+    db.session.commit()
+    obj.log.info(u'Ticket operation {0} queued'.format(action))
+
+    dispatch_ticket_outbox.delay()
+
+
+def get_outbox_ticket_id(obj, ticket_id_key='ticket_id'):
+    """Return the id of a ticket of a workflow created through the outbox.
+
+    The ids of the tickets created through the outbox are kept only in the
+    outbox, as writing them to ``extra_data`` would overwrite the changes
+    saved meanwhile by the running workflow.
+
+    Returns:
+        int: the id of the last ticket created under ``ticket_id_key``, or
+        ``None`` if it is not created yet.
+    """
+    sent_creations = WorkflowsTicketOutbox.query.filter(
+        WorkflowsTicketOutbox.workflow_id == obj.id,
+        WorkflowsTicketOutbox.action == 'create',
+        WorkflowsTicketOutbox.status == 'sent',
+    ).order_by(WorkflowsTicketOutbox.id.desc())
+    for entry in sent_creations:
+        if entry.payload.get('ticket_id_key') == ticket_id_key:
+            return entry.ticket_id
+
+
+@shared_task(ignore_result=True)
+def dispatch_ticket_outbox():
+    """Send the pending RT operations of the outbox.
+
+    Only one dispatcher runs at a time. The operations of a workflow are
+    sent in order, while those of different workflows are sent in
+    parallel, at most ``WORKFLOWS_TICKET_OUTBOX_MAX_CONCURRENT_REQUESTS`` at
+    a time. Failed operations are retried after
+    ``WORKFLOWS_TICKET_OUTBOX_RETRY_DELAY`` seconds, up to
+    ``WORKFLOWS_TICKET_OUTBOX_MAX_ATTEMPTS`` times.
+    """
+    redis_url = current_app.config.get('CACHE_REDIS_URL')
+    r = StrictRedis.from_url(redis_url)
+    lock = Lock(r, 'workflows_ticket_outbox', expire=120, auto_renewal=True)
+    if lock.acquire(blocking=False):
+        try:
+            while _dispatch_outbox_batch():
+                pass
+        finally:
+            lock.release()
+
+
+def _dispatch_outbox_batch():
+    config = current_app.config
+    retry_before = datetime.utcnow() - timedelta(
+        seconds=config['WORKFLOWS_TICKET_OUTBOX_RETRY_DELAY'])
+
+    def is_ready(model):
+        return or_(model.attempts == 0, model.updated < retry_before)
+
+    # The operations of a workflow waiting for the retry of a previous one
+    # are sent after it, so they are left out of the batch.
+    first_pending = db.session.query(
+        WorkflowsTicketOutbox.workflow_id.label('workflow_id'),
+        func.min(WorkflowsTicketOutbox.id).label('entry_id'),
+    ).filter(
+        WorkflowsTicketOutbox.status == 'pending',
+    ).group_by(
+        WorkflowsTicketOutbox.workflow_id,
+    ).subquery()
+    first_pending_entry = aliased(WorkflowsTicketOutbox)
+
+    entries = WorkflowsTicketOutbox.query.join(
+        first_pending,
+        first_pending.c.workflow_id == WorkflowsTicketOutbox.workflow_id,
+    ).join(
+        first_pending_entry,
+        first_pending_entry.id == first_pending.c.entry_id,
+    ).filter(
+        WorkflowsTicketOutbox.status == 'pending',
+        is_ready(WorkflowsTicketOutbox),
+        is_ready(first_pending_entry),
+    ).order_by(
+        WorkflowsTicketOutbox.id,
+    ).limit(
+        config['WORKFLOWS_TICKET_OUTBOX_BATCH_SIZE'],
+    ).all()
+    if not entries:
+        return False
+
+    entries_by_workflow = OrderedDict()
+    for entry in entries:
+        entries_by_workflow.setdefault(entry.workflow_id, []).append(entry)
+
+    known_ticket_ids = _get_known_ticket_ids(list(entries_by_workflow))
+    jobs = [
+        (
+            [(entry.id, entry.action, entry.payload) for entry in workflow_entries],
+            known_ticket_ids.get(workflow_id, {}),
+        )
+        for workflow_id, workflow_entries in entries_by_workflow.items()
+    ]
+    results = _send_concurrently(jobs)
+
+    _store_results(entries_by_workflow, results)
+    return True
+
+
+def _get_known_ticket_ids(workflow_ids):
+    """Return the ticket ids already created for the given workflows."""
+    known_ticket_ids = {}
+    sent_creations = WorkflowsTicketOutbox.query.filter(
+        WorkflowsTicketOutbox.workflow_id.in_(workflow_ids),
+        WorkflowsTicketOutbox.action == 'create',
+        WorkflowsTicketOutbox.status == 'sent',
+    ).order_by(WorkflowsTicketOutbox.id)
+    for entry in sent_creations:
+        known_ticket_ids.setdefault(entry.workflow_id, {})[
+            entry.payload['ticket_id_key']] = entry.ticket_id
+
+    return known_ticket_ids
+
+
+def _send_concurrently(jobs):
+    app = current_app._get_current_object()
+
+    def _send(job):
+        with app.app_context():
+            return _send_workflow_operations(*job)
+
+    pool = ThreadPool(min(
+        len(jobs),
+        current_app.config['WORKFLOWS_TICKET_OUTBOX_MAX_CONCURRENT_REQUESTS'],
+    ))
+    try:
+        return pool.map(_send, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _send_workflow_operations(operations, known_ticket_ids):
+    """Send the operations of a workflow in order, up to the first failure.
+
+    Returns:
+        list: for each sent operation, a tuple with the outbox entry id, the
+        ticket id, and the error message or ``None``.
+    """
+    ticket_ids = dict(known_ticket_ids)
+    results = []
+    for entry_id, action, payload in operations:
+        try:
+            ticket_id = _send_operation(action, payload, ticket_ids)
+        except Exception as err:
+            current_app.logger.exception(
+                'Failed to send the ticket operation %s', entry_id)
+            results.append((entry_id, None, text_type(err)))
+            break
+        results.append((entry_id, ticket_id, None))
+
+    return results
+
+
+def _send_operation(action, payload, ticket_ids):
+    if action == 'create':
+        ticket_id = tickets.create_ticket(
+            payload['queue'],
+            payload['requestors'],
+            payload['body'],
+            payload.get('subject'),
+            payload.get('recid'),
+        )
+        if ticket_id == -1:
+            raise ValueError('RT failed to create the ticket.')
+        ticket_ids[payload['ticket_id_key']] = ticket_id
+        return ticket_id
+
+    ticket_id = payload.get('ticket_id') or ticket_ids.get(
+        payload.get('ticket_id_key', 'ticket_id'))
+    if not ticket_id:
+        raise ValueError('No ticket ID found!')
+
+    if action == 'reply':
+        tickets.reply_ticket(ticket_id, payload['body'], payload.get('keep_new', False))
+    elif action == 'close':
+        tickets.resolve_ticket(ticket_id, recid=payload.get('recid'))
+    else:
+        raise ValueError('Unknown ticket operation: {}'.format(action))
+
+    return int(ticket_id)
+
+
+def _store_results(entries_by_workflow, results):
+    """Store the outcome of the operations, with the created ticket ids."""
+    max_attempts = current_app.config['WORKFLOWS_TICKET_OUTBOX_MAX_ATTEMPTS']
+    entries = {
+        entry.id: entry
+        for workflow_entries in entries_by_workflow.values()
+        for entry in workflow_entries
+    }
+
+    for workflow_results in results:
+        for entry_id, ticket_id, error in workflow_results:
+            entry = entries[entry_id]
+            entry.attempts += 1
+            if error is None:
+                entry.status = 'sent'
+                entry.ticket_id = ticket_id
+                entry.error = ''
+                if entry.action == 'create':
+                    current_app.logger.info(
+                        'Ticket %s created for workflow %s',
+                        ticket_id, entry.workflow_id)
+            else:
+                entry.error = error
+                if entry.attempts >= max_attempts:
+                    entry.status = 'failed'
+            entry.updated = datetime.utcnow()
+
+    db.session.commit()
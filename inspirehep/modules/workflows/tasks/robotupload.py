@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Tasks to ship the records of many workflows to Legacy together."""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import json
+import uuid
+
+from celery import shared_task
+from flask import current_app
+from redis import StrictRedis
+from redis_lock import Lock
+from six import text_type
+
+from invenio_db import db
+from invenio_workflows import ObjectStatus, workflow_object_class
+from invenio_workflows.models import WorkflowObjectModel
+
+from inspirehep.modules.workflows.api import bulk_holdingpen_indexing
+from inspirehep.utils.robotupload import (
+    make_robotupload_marcxml,
+    make_robotupload_marcxml_collection,
+)
+
+ROBOTUPLOAD_QUEUE_KEY = 'robotupload_batch::{}'
+ROBOTUPLOAD_NONCE_PREFIX = 'batch-'
+ROBOTUPLOAD_NONCE_KEY = 'robotupload_batch_nonce::{}'
+
+
+def is_robotupload_batching_enabled():
+    """Return whether robotuploads waiting for a callback are batched."""
+    return current_app.config.get('WORKFLOWS_ROBOTUPLOAD_BATCH_WINDOW', 0) > 0
+
+
+def _get_redis():
+    return StrictRedis.from_url(current_app.config.get('CACHE_REDIS_URL'))
+
+
+def queue_robotupload(obj, recid, url, marcxml, mode, callback_url):
+    """Queue the MARCXML of a workflow to be shipped with others.
+
+    The records queued with the same ``url``, ``mode`` and ``callback_url``
+    during ``WORKFLOWS_ROBOTUPLOAD_BATCH_WINDOW`` seconds are shipped by
+    :func:`ship_robotupload_batch` as a single MARCXML collection. The
+    results of Legacy are matched to the workflows by the recids of their
+    records.
+
+    Args:
+        obj: a workflow object.
+        recid(int): the recid of the record.
+        url(str): the Legacy URL, or ``None`` to use the configured one.
+        marcxml(str): the MARCXML of the record.
+        mode(str): the robotupload mode.
+        callback_url(str): the URL called back by Legacy.
+    """
+    params = [url, mode, callback_url]
+    queue_key = ROBOTUPLOAD_QUEUE_KEY.format(
+        hashlib.sha1(json.dumps(params).encode('utf-8')).hexdigest())
+    if not isinstance(marcxml, text_type):
+        marcxml = marcxml.decode('utf-8')
+
+    _get_redis().rpush(queue_key, json.dumps({
+        'workflow_id': obj.id,
+        'recid': recid,
+        'marcxml': marcxml,
+        'params': params,
+    }))
+    ship_robotupload_batch.apply_async(
+        args=(queue_key,),
+        countdown=current_app.config['WORKFLOWS_ROBOTUPLOAD_BATCH_WINDOW'],
+    )
+
+
+@shared_task(ignore_result=True)
+def ship_robotupload_batch(queue_key):
+    """Ship the records queued by :func:`queue_robotupload`.
+
+    The queue is emptied by batches of ``WORKFLOWS_ROBOTUPLOAD_BATCH_SIZE``
+    records, each shipped in one robotupload. Its nonce identifies the
+    batch, whose workflows are kept in Redis by recid so that
+    :func:`get_robotupload_batch_workflows` can match the results of Legacy
+    to them. A batch is removed from the queue only once it was shipped.
+    If it could not be, its workflows are put in error state.
+
+    Args:
+        queue_key(str): the Redis key of the queue.
+    """
+    batch_size = current_app.config['WORKFLOWS_ROBOTUPLOAD_BATCH_SIZE']
+    r = _get_redis()
+    lock = Lock(r, queue_key, expire=120, auto_renewal=True)
+    if not lock.acquire(blocking=False):
+        # The batches of this queue are being shipped, the ones queued in
+        # the meantime will be shipped too.
+        return
+
+    try:
+        while True:
+            items = r.lrange(queue_key, 0, batch_size - 1)
+            if not items:
+                return
+
+            items = [json.loads(item) for item in items]
+            try:
+                _ship_robotupload(items)
+            except Exception as error:
+                current_app.logger.exception(
+                    'Robotupload of workflows %s failed',
+                    [item['workflow_id'] for item in items],
+                )
+                _put_workflows_in_error_state(
+                    [item['workflow_id'] for item in items],
+                    'Error while submitting robotupload: {0}'.format(error),
+                )
+            finally:
+                r.ltrim(queue_key, len(items), -1)
+    finally:
+        lock.release()
+
+
+def _ship_robotupload(items):
+    url, mode, callback_url = items[0]['params']
+    workflow_ids = [item['workflow_id'] for item in items]
+    nonce = ROBOTUPLOAD_NONCE_PREFIX + uuid.uuid4().hex
+
+    timeout = current_app.config['WORKFLOWS_ROBOTUPLOAD_CALLBACK_TIMEOUT']
+    r = _get_redis()
+    nonce_key = ROBOTUPLOAD_NONCE_KEY.format(nonce)
+    r.hmset(nonce_key, {item['recid']: item['workflow_id'] for item in items})
+    # Kept a bit longer than the timeout, for the late callbacks to be logged.
+    r.expire(nonce_key, 2 * timeout)
+
+    result = make_robotupload_marcxml(
+        url=url,
+        marcxml=make_robotupload_marcxml_collection(
+            [item['marcxml'] for item in items]),
+        callback_url=callback_url,
+        mode=mode,
+        nonce=nonce,
+        priority=5,
+    )
+    if "[INFO]" in result.text:
+        current_app.logger.info(
+            'Robotupload %s of workflows %s sent: %s',
+            nonce, workflow_ids, result.text)
+        expire_robotupload_batch.apply_async(args=(nonce,), countdown=timeout)
+        return
+
+    r.delete(nonce_key)
+    current_app.logger.error(
+        'Robotupload of workflows %s failed: %s', workflow_ids, result.text)
+    _put_workflows_in_error_state(
+        workflow_ids,
+        "Error while submitting robotupload: {0}".format(result.text),
+    )
+
+
+def _put_workflows_in_error_state(workflow_ids, error_message):
+    models = WorkflowObjectModel.query.filter(
+        WorkflowObjectModel.id.in_(workflow_ids)).all()
+    with bulk_holdingpen_indexing():
+        for model in models:
+            obj = workflow_object_class(model)
+            obj.status = ObjectStatus.ERROR
+            obj.extra_data['_error_msg'] = error_message
+            obj.save()
+
+        db.session.commit()
+
+
+def is_robotupload_batch_nonce(nonce):
+    """Return whether ``nonce`` is the one of a batched robotupload."""
+    return text_type(nonce).startswith(ROBOTUPLOAD_NONCE_PREFIX)
+
+
+def get_robotupload_batch_workflows(nonce):
+    """Return the workflows of a batch still waiting for their result.
+
+    Returns:
+        dict: the workflow ids by the recids of their records.
+    """
+    workflows = _get_redis().hgetall(ROBOTUPLOAD_NONCE_KEY.format(nonce))
+    return {int(recid): int(workflow_id) for recid, workflow_id in workflows.items()}
+
+
+def acknowledge_robotupload_batch_results(nonce, recids):
+    """Mark the workflows of the given recids as having got their result."""
+    if recids:
+        _get_redis().hdel(ROBOTUPLOAD_NONCE_KEY.format(nonce), *recids)
+
+
+@shared_task(ignore_result=True)
+def expire_robotupload_batch(nonce):
+    """Put in error state the workflows of a batch that got no result.
+
+    Runs ``WORKFLOWS_ROBOTUPLOAD_CALLBACK_TIMEOUT`` seconds after the batch
+    was shipped.
+    """
+    workflows = get_robotupload_batch_workflows(nonce)
+    _get_redis().delete(ROBOTUPLOAD_NONCE_KEY.format(nonce))
+    if not workflows:
+        return
+
+    current_app.logger.error(
+        'No result from Legacy for the records %s of robotupload %s',
+        sorted(workflows), nonce)
+    _put_workflows_in_error_state(
+        list(workflows.values()),
+        'No result received from Legacy for robotupload {0}.'.format(nonce),
+    )
@@ -31,7 +31,7 @@ from pprint import pformat
 
 import backoff
 import rt
-from flask import current_app
+from flask import current_app, render_template
 
 from invenio_accounts.models import User
 
@@ -41,6 +41,12 @@ from inspirehep.utils import tickets
 from inspirehep.utils.proxies import rt_instance
 
 from .actions import in_production_mode
+from .outbox import (
+    get_outbox_ticket_id,
+    is_ticket_outbox_enabled,
+    queue_ticket_action,
+)
+from .robotupload import is_robotupload_batching_enabled, queue_robotupload
 from ..utils import with_debug_logging
 
 
@@ -68,14 +74,27 @@ def submit_rt_ticket(obj,
     return True
 
 
+def _get_ticket_id(obj, ticket_id_key):
+    ticket_id = obj.extra_data.get(ticket_id_key)
+    if not ticket_id:
+        ticket_id = get_outbox_ticket_id(obj, ticket_id_key)
+
+    return ticket_id or ""
+
+
 def create_ticket(template,
                   context_factory=None,
                   queue="Test",
-                  ticket_id_key="ticket_id"):
+                  ticket_id_key="ticket_id",
+                  wait=False):
     """Create a ticket for the submission.
 
     Creates the ticket in the given queue and stores the ticket ID
     in the extra_data key specified in ticket_id_key.
+
+    When ``WORKFLOWS_TICKET_OUTBOX`` is set, the ticket is queued in the
+    outbox and its ID is kept there once it is created, unless ``wait`` is
+    set because the next steps need the ticket ID in extra_data.
     """
     @with_debug_logging
     @wraps(create_ticket)
@@ -102,6 +121,19 @@ def create_ticket(template,
 
         recid = obj.extra_data.get("recid") or obj.data.get("control_number")
 
+        if is_ticket_outbox_enabled() and not wait:
+            queue_ticket_action(
+                obj,
+                'create',
+                queue=queue,
+                requestors=user.email,
+                subject=context.get("subject"),
+                body=render_template(template, **context).strip(),
+                recid=recid,
+                ticket_id_key=ticket_id_key,
+            )
+            return
+
         submit_rt_ticket(obj,
                          queue,
                          template,
@@ -116,11 +148,16 @@ def create_ticket(template,
 def reply_ticket(template=None,
                  context_factory=None,
                  keep_new=False):
-    """Reply to a ticket for the submission."""
+    """Reply to a ticket for the submission.
+
+    When ``WORKFLOWS_TICKET_OUTBOX`` is set, the reply is queued in the
+    outbox, after the creation of the ticket if it is still queued.
+    """
     @with_debug_logging
     @wraps(reply_ticket)
     def _reply_ticket(obj, eng):
-        ticket_id = obj.extra_data.get("ticket_id", "")
+        ticket_id = _get_ticket_id(obj, "ticket_id")
+        use_outbox = is_ticket_outbox_enabled()
 
         if not rt_instance:
             obj.log.error("No RT instance available. Skipping!")
@@ -131,7 +168,7 @@ def reply_ticket(template=None,
             )
             return
 
-        if not ticket_id:
+        if not ticket_id and not use_outbox:
             obj.log.error("No ticket ID found!")
             return
 
@@ -145,29 +182,48 @@ def reply_ticket(template=None,
             context = {}
             if context_factory:
                 context = context_factory(user, obj)
-            tickets.reply_ticket_with_template(ticket_id,
-                                               template,
-                                               context,
-                                               keep_new)
+            if use_outbox:
+                body = render_template(template, **context).strip()
+            else:
+                tickets.reply_ticket_with_template(ticket_id,
+                                                   template,
+                                                   context,
+                                                   keep_new)
+                return
         else:
             # Body already rendered in reason.
             body = obj.extra_data.get("reason", "")
-            if body:
-                tickets.reply_ticket(ticket_id, body, keep_new)
-            else:
+            if not body:
                 obj.log.error("No body for ticket reply. Skipping reply.")
                 return
+            if not use_outbox:
+                tickets.reply_ticket(ticket_id, body, keep_new)
+                return
+
+        queue_ticket_action(
+            obj,
+            'reply',
+            ticket_id=ticket_id,
+            ticket_id_key="ticket_id",
+            body=body,
+            keep_new=keep_new,
+        )
 
     return _reply_ticket
 
 
 def close_ticket(ticket_id_key="ticket_id"):
-    """Close the ticket associated with this record found in given key."""
+    """Close the ticket associated with this record found in given key.
+
+    When ``WORKFLOWS_TICKET_OUTBOX`` is set, the closure is queued in the
+    outbox, after the creation of the ticket if it is still queued.
+    """
     @with_debug_logging
     @wraps(close_ticket)
     def _close_ticket(obj, eng):
-        ticket_id = obj.extra_data.get(ticket_id_key, "")
-        if not ticket_id:
+        ticket_id = _get_ticket_id(obj, ticket_id_key)
+        use_outbox = is_ticket_outbox_enabled()
+        if not ticket_id and not use_outbox:
             obj.log.error("No ticket ID found!")
             return
 
@@ -180,6 +236,16 @@ def close_ticket(ticket_id_key="ticket_id"):
             )
             return
 
+        if use_outbox:
+            queue_ticket_action(
+                obj,
+                'close',
+                ticket_id=ticket_id,
+                ticket_id_key=ticket_id_key,
+                recid=obj.extra_data.get("recid") or obj.data.get("control_number"),
+            )
+            return
+
         tickets.resolve_ticket(ticket_id)
 
     return _close_ticket
@@ -194,7 +260,9 @@ def send_robotupload(
     """Get the MARCXML from the model and ship it.
 
     If callback_url is set the workflow will halt and the callback is
-    responsible for resuming it.
+    responsible for resuming it. In this case, when
+    ``WORKFLOWS_ROBOTUPLOAD_BATCH_WINDOW`` is set, the record is shipped
+    together with the others sent during that window.
     """
     @with_debug_logging
     @wraps(send_robotupload)
@@ -238,6 +306,21 @@ def send_robotupload(
             )
             return
 
+        # Batched results are matched to the workflows by recid.
+        if callback_url and is_robotupload_batching_enabled() and \
+                'control_number' in data:
+            queue_robotupload(
+                obj,
+                recid=data['control_number'],
+                url=url,
+                marcxml=marcxml,
+                mode=mode,
+                callback_url=combined_callback_url,
+            )
+            obj.log.info("Robotupload queued!")
+            eng.halt("Waiting for robotupload batch.")
+            return
+
         result = make_robotupload_marcxml(
             url=url,
             marcxml=marcxml,
@@ -30,6 +30,7 @@ from invenio_db import db
 
 from inspirehep.modules.pidstore.minters import inspire_recid_minter
 from inspirehep.modules.records.api import InspireRecord
+from inspirehep.modules.workflows.api import deferred_holdingpen_indexing
 
 from ..utils import with_debug_logging
 
@@ -55,7 +56,8 @@ def store_record(obj, eng):
         obj.extra_data['head_uuid'] = str(record.id)
 
     record.commit()
-    obj.save()
+    with deferred_holdingpen_indexing():
+        obj.save()
     db.session.commit()
 
 
@@ -153,6 +153,32 @@ def with_debug_logging(func):
     return _decorator
 
 
+def pop_batch_result(obj, key):
+    """Return and forget a result computed for ``obj`` by a batch.
+
+    When articles are started in micro-batches, some steps are run for the
+    whole batch beforehand and their results are stored in
+    ``extra_data['_batch_results']``. The step consuming a result removes it,
+    so that restarting the workflow computes it again.
+
+    Args:
+        obj: a workflow object.
+        key(str): the name of the result.
+
+    Returns:
+        the result, or ``None`` if it was not computed by a batch.
+    """
+    batch_results = obj.extra_data.get('_batch_results')
+    if not batch_results or key not in batch_results:
+        return None
+
+    result = batch_results.pop(key)
+    if not batch_results:
+        del obj.extra_data['_batch_results']
+
+    return result
+
+
 @with_debug_logging
 def get_pdf_in_workflow(obj):
     """Return the fullpath to the PDF attached to a workflow object"""
@@ -24,16 +24,24 @@
 
 from __future__ import absolute_import, division, print_function
 
-import re
+from collections import OrderedDict
 
-from os.path import join
 from flask import Blueprint, jsonify, request, current_app
 
 from invenio_db import db
 from invenio_workflows import workflow_object_class, ObjectStatus
 from invenio_workflows.errors import WorkflowsMissingObject
+from invenio_workflows.models import WorkflowObjectModel
 
 from inspirehep.modules.workflows.models import WorkflowsPendingRecord
+from inspirehep.modules.workflows.tasks.callbacks import (
+    continue_workflows_from_callback,
+)
+from inspirehep.modules.workflows.tasks.robotupload import (
+    acknowledge_robotupload_batch_results,
+    get_robotupload_batch_workflows,
+    is_robotupload_batch_nonce,
+)
 
 blueprint = Blueprint(
     'inspire_workflows',
@@ -44,71 +52,20 @@ blueprint = Blueprint(
 )
 
 
-def _get_base_url():
-    """Return base URL for generated URLs for remote reference."""
-    base_url = current_app.config.get(
-        "LEGACY_ROBOTUPLOAD_URL",
-        current_app.config["SERVER_NAME"],
-    )
-    if not re.match('^https?://', base_url):
-        base_url = 'http://{}'.format(base_url)
-    return base_url
-
-
-def _continue_workflow(workflow_id, recid, result=None):
-    """Small wrapper to continue a workflow.
-
-    Will prepare the needed data from the record id and the result data if
-    passed.
-
-    :return: True if succeeded, False if the specified workflow id does not
-        exist.
-    """
-    result = result if result is not None else {}
-    base_url = _get_base_url()
+def _get_existing_workflow_ids(workflow_ids):
+    """Return the ids of the given workflows that exist, with one query."""
     try:
-        workflow_object = workflow_object_class.get(workflow_id)
-    except WorkflowsMissingObject:
-        current_app.logger.error(
-            'No workflow object with the id %s could be found.',
-            workflow_id,
-        )
-        return False
+        workflow_ids = [int(workflow_id) for workflow_id in workflow_ids]
+    except (TypeError, ValueError):
+        return set()
 
-    workflow_object.extra_data['url'] = join(
-        base_url,
-        'record',
-        str(recid)
-    )
-    workflow_object.extra_data['recid'] = recid
-    workflow_object.extra_data['callback_result'] = result
-    workflow_object.save()
-    db.session.commit()
-    workflow_object.continue_workflow(delayed=True)
+    if not workflow_ids:
+        return set()
 
-    return True
-
-
-def _find_and_continue_workflow(workflow_id, recid, result=None):
-    workflow_found = _continue_workflow(
-        workflow_id=workflow_id,
-        recid=recid,
-        result=result,
+    query = db.session.query(WorkflowObjectModel.id).filter(
+        WorkflowObjectModel.id.in_(workflow_ids)
     )
-    if not workflow_found:
-        current_app.logger.warning(
-            'The workflow %s was not found.',
-            workflow_id,
-        )
-        return {
-            'success': False,
-            'message': 'workflow with id %s not found.' % workflow_id,
-        }
-
-    return {
-        'success': True,
-        'message': 'workflow with id %s continued.' % workflow_id,
-    }
+    return {workflow_id for (workflow_id,) in query}
 
 
 def _put_workflow_in_error_state(workflow_id, error_message, result):
@@ -141,7 +98,9 @@ def webcoll_callback():
     """Handle a callback from webcoll with the record ids processed.
 
     Expects the request data to contain a list of record ids in the
-    recids field.
+    recids field. The corresponding entries of the pending list are removed
+    with a single commit, and the workflows are continued in batches by
+    :func:`~inspirehep.modules.workflows.tasks.callbacks.continue_workflows_from_callback`.
 
     Example:
         An example of callback::
@@ -157,36 +116,37 @@ def webcoll_callback():
     pending_records = WorkflowsPendingRecord.query.filter(
         WorkflowsPendingRecord.record_id.in_(recids)
     ).all()
+    existing_workflow_ids = _get_existing_workflow_ids(
+        pending_record.workflow_id for pending_record in pending_records
+    )
+
     response = {}
+    callbacks = []
     for pending_record in pending_records:
         recid = int(pending_record.record_id)
         workflow_id = pending_record.workflow_id
-        continue_response = _find_and_continue_workflow(
-            workflow_id=workflow_id,
-            recid=recid,
-        )
-        if continue_response['success']:
-            current_app.logger.debug(
-                'Successfully restarted workflow %s',
-                workflow_id,
-            )
+        if workflow_id in existing_workflow_ids:
+            callbacks.append({'workflow_id': workflow_id, 'recid': recid})
             response[recid] = {
                 'success': True,
                 'message': 'Successfully restarted workflow %s' % workflow_id,
             }
         else:
-            current_app.logger.debug(
-                'Error restarting workflow %s: %s',
+            current_app.logger.warning(
+                'The workflow %s was not found.',
                 workflow_id,
-                continue_response['message'],
             )
             response[recid] = {
                 'success': False,
-                'message': continue_response['message'],
+                'message': 'workflow with id %s not found.' % workflow_id,
             }
 
         db.session.delete(pending_record)
-        db.session.commit()
+
+    db.session.commit()
+
+    if callbacks:
+        continue_workflows_from_callback.delay(callbacks)
 
     return jsonify(response)
 
@@ -209,70 +169,73 @@ def _robotupload_has_error(result):
     return True, message
 
 
-def _parse_robotupload_result(result, workflow_id):
-    response = {}
-    recid = int(result.get('recid'))
+def _parse_robotupload_results(results, workflow_id):
+    """Add the created records to the pending list and continue the workflow.
 
-    result_has_error, error_message = _robotupload_has_error(result)
-    if result_has_error:
-        response = {
-            'success': False,
-            'message': error_message,
-        }
-        return response
+    The records are added to the pending list with a single commit, and the
+    workflow is continued by a Celery task.
+    """
+    responses = {}
+    if not results:
+        return responses
 
-    already_pending_ones = WorkflowsPendingRecord.query.filter_by(
-        record_id=recid,
-    ).all()
-    if already_pending_ones:
-        current_app.logger.warning(
-            'The record %s was already found on the pending list.',
-            recid
+    already_pending_ids = {
+        int(pending_record.record_id)
+        for pending_record in WorkflowsPendingRecord.query.filter(
+            WorkflowsPendingRecord.record_id.in_(list(results))
         )
-        response = {
-            'success': False,
-            'message': 'Recid %s already in pending list.' % recid,
-        }
-        return response
+    }
+    workflow_found = bool(_get_existing_workflow_ids([workflow_id]))
+
+    callbacks = []
+    for recid, result in results.items():
+        if recid in already_pending_ids:
+            current_app.logger.warning(
+                'The record %s was already found on the pending list.',
+                recid
+            )
+            responses[recid] = {
+                'success': False,
+                'message': 'Recid %s already in pending list.' % recid,
+            }
+            continue
 
-    pending_entry = WorkflowsPendingRecord(
-        workflow_id=workflow_id,
-        record_id=recid,
-    )
-    db.session.add(pending_entry)
-    db.session.commit()
-    current_app.logger.debug(
-        'Successfully added recid:workflow %s:%s to pending list.',
-        recid,
-        workflow_id,
-    )
+        if not workflow_found:
+            current_app.logger.warning(
+                'The workflow %s was not found.',
+                workflow_id,
+            )
+            responses[recid] = {
+                'success': False,
+                'message': 'workflow with id %s not found.' % workflow_id,
+            }
+            continue
 
-    continue_response = _find_and_continue_workflow(
-        workflow_id=workflow_id,
-        recid=recid,
-        result=result,
-    )
-    if continue_response['success']:
+        db.session.add(WorkflowsPendingRecord(
+            workflow_id=workflow_id,
+            record_id=recid,
+        ))
+        callbacks.append({
+            'workflow_id': workflow_id,
+            'recid': recid,
+            'result': result,
+        })
         current_app.logger.debug(
-            'Successfully restarted workflow %s',
+            'Successfully added recid:workflow %s:%s to pending list.',
+            recid,
             workflow_id,
         )
-        response = {
+        responses[recid] = {
             'success': True,
             'message': 'Successfully restarted workflow %s' % workflow_id,
         }
-    else:
-        current_app.logger.debug(
-            'Error restarting workflow %s: %s',
-            workflow_id,
-            continue_response['message'],
-        )
-        response = {
-            'success': False,
-            'message': continue_response['message'],
-        }
 
-    return response
+    db.session.commit()
+
+    if callbacks:
+        continue_workflows_from_callback.delay(callbacks)
+
+    return responses
 
 
 @blueprint.route('/workflows/robotupload', methods=['POST'])
@@ -286,6 +249,9 @@ def robotupload_callback():
     If robotupload encountered an error sends an email
     to site administrator informing him about the error.
 
+    When several records were uploaded together, the "nonce" identifies
+    the batch, and each result is matched to its workflow by its recid.
+
     Examples:
         An example of failed callback that did not get to create a recid (the
         "nonce" is the workflow id)::
@@ -341,33 +307,91 @@ def robotupload_callback():
     """
 
     request_data = request.get_json()
-    workflow_id = request_data.get('nonce', '')
-    results = request_data.get('results', [])
-    responses = {}
-    for result in results:
+    nonce = request_data.get('nonce', '')
+    if is_robotupload_batch_nonce(nonce):
+        return jsonify(_handle_robotupload_batch_results(
+            nonce, request_data.get('results', [])))
+
+    workflow_id = nonce
+    results = OrderedDict()
+    for result in request_data.get('results', []):
         recid = int(result.get('recid'))
 
-        if recid in responses:
+        if recid in results:
             # this should never happen
             current_app.logger.warning('Received duplicated recid: %s', recid)
             continue
 
-        response = _parse_robotupload_result(
-            result=result,
+        results[recid] = result
+
+    return jsonify(_handle_robotupload_results(results, workflow_id))
+
+
+def _handle_robotupload_batch_results(nonce, results):
+    """Handle the results of a batched robotupload.
+
+    Each result is matched to its workflow by the recid of its record, the
+    results that match no workflow waiting for one are only logged.
+    """
+    workflows = get_robotupload_batch_workflows(nonce)
+    results_by_workflow = OrderedDict()
+    responses = {}
+    for result in results:
+        recid = int(result.get('recid'))
+        workflow_id = workflows.get(recid)
+        if workflow_id is None:
+            current_app.logger.warning(
+                'Received a result of robotupload %s matching no waiting '
+                'workflow: %s', nonce, result)
+            responses[recid] = {
+                'success': False,
+                'message': 'no workflow waiting for recid %s.' % recid,
+            }
+            continue
+
+        results_by_workflow.setdefault(workflow_id, OrderedDict())[recid] = result
+
+    acknowledge_robotupload_batch_results(nonce, [
+        recid for results in results_by_workflow.values() for recid in results
+    ])
+    for workflow_id, results in results_by_workflow.items():
+        responses.update(_handle_robotupload_results(results, workflow_id))
+
+    return responses
+
+
+def _handle_robotupload_results(results, workflow_id):
+    responses = {}
+    successful_results = OrderedDict()
+    for recid, result in results.items():
+        result_has_error, error_message = _robotupload_has_error(result)
+        if result_has_error:
+            responses[recid] = {
+                'success': False,
+                'message': error_message,
+            }
+        else:
+            successful_results[recid] = result
+
+    responses.update(_parse_robotupload_results(
+        results=successful_results,
+        workflow_id=workflow_id,
+    ))
+
+    for recid, result in results.items():
+        response = responses[recid]
+        if response['success']:
+            continue
+
+        error_set_result = _put_workflow_in_error_state(
             workflow_id=workflow_id,
+            error_message='Error in robotupload: %s' % response['message'],
+            result=result,
         )
-        if not response['success']:
-            error_set_result = _put_workflow_in_error_state(
-                workflow_id=workflow_id,
-                error_message='Error in robotupload: %s' % response['message'],
-                result=result,
+        if not error_set_result['success']:
+            response['message'] += (
+                '\nFailed to put the workflow in error state:%s' %
+                error_set_result['message']
             )
-            if not error_set_result['success']:
-                response['message'] += (
-                    '\nFailed to put the workflow in error state:%s' %
-                    error_set_result['message']
-                )
-
-        responses[recid] = response
 
-    return jsonify(responses)
+    return responses
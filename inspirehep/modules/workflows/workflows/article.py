@@ -59,6 +59,7 @@ from inspirehep.modules.workflows.tasks.classifier import (
     classify_paper,
     filter_core_keywords,
 )
+from inspirehep.modules.workflows.tasks.batch import clear_batch_results
 from inspirehep.modules.workflows.tasks.beard import guess_coreness
 from inspirehep.modules.workflows.tasks.magpie import (
     guess_keywords,
@@ -67,8 +68,7 @@ from inspirehep.modules.workflows.tasks.magpie import (
 )
 from inspirehep.modules.workflows.tasks.matching import (
     stop_processing,
-    match_non_completed_wf_in_holdingpen,
-    match_previously_rejected_wf_in_holdingpen,
+    match_wfs_in_holdingpen,
     article_exists,
     already_harvested,
     previously_rejected,
@@ -144,6 +144,7 @@ ENHANCE_RECORD = [
     ),
     guess_keywords,
     guess_coreness,
+    clear_batch_results,
 ]
 
 
@@ -252,8 +253,9 @@ STORE_RECORD = [
 
 
 MARK_IF_MATCH_IN_HOLDINGPEN = [
+    match_wfs_in_holdingpen,
     IF_ELSE(
-        match_non_completed_wf_in_holdingpen,
+        is_marked('holdingpen_matches'),
         [
             mark('already-in-holding-pen', True),
             save_workflow,
@@ -262,7 +264,7 @@ MARK_IF_MATCH_IN_HOLDINGPEN = [
     ),
 
     IF_ELSE(
-        match_previously_rejected_wf_in_holdingpen,
+        is_marked('previously_rejected_matches'),
         [
             mark('previously_rejected', True),
             save_workflow,
@@ -287,6 +289,7 @@ PROCESS_HOLDINGPEN_MATCH_HARVEST = [
             has_same_source('previously_rejected_matches'),
             [
                 mark('approved', False),  # auto-reject
+                clear_batch_results,
                 save_workflow,
                 stop_processing,
             ],
@@ -306,6 +309,7 @@ PROCESS_HOLDINGPEN_MATCH_HARVEST = [
                 # else, it's an update from another source
                 # keep the old one
                 mark('stopped-matched-holdingpen-wf', False),
+                clear_batch_results,
                 save_workflow,
                 stop_processing
             ],
@@ -27,6 +27,8 @@ from inspirehep.utils.jinja2 import render_template_to_string
 
 
 def get_and_format_citations(record):
+    from inspirehep.modules.theme.prefetch import prefetch_template_filters
+
     result = []
 
     citations = LiteratureSearch().query(
@@ -40,8 +42,13 @@ def get_and_format_citations(record):
         ]
     ).execute().hits
 
-    for citation in citations:
-        citation_from_es = LiteratureSearch().get_source(citation.meta.id)
+    citations_from_es = [
+        LiteratureSearch().get_source(citation.meta.id)
+        for citation in citations
+    ]
+    prefetch_template_filters(citations_from_es, ['publication_info'])
+
+    for citation, citation_from_es in zip(citations, citations_from_es):
         row = []
 
         row.append(
@@ -23,6 +23,7 @@
 from __future__ import absolute_import, division, print_function
 
 import os
+import time
 from contextlib import contextmanager
 
 from flask import current_app
@@ -30,12 +31,17 @@ from flask import current_app
 from inspire_schemas.api import ReferenceBuilder
 from inspire_utils.helpers import force_list
 
+from inspirehep.modules.records.permissions import filter_readable_records
 from inspirehep.utils.jinja2 import render_template_to_string
 from inspirehep.utils.record_getter import get_es_records
 from inspirehep.utils.url import retrieve_uri
 
+_CACHED_KBS_PATHS = {}
+
 
 def get_and_format_references(record):
+    from inspirehep.modules.theme.prefetch import prefetch_template_filters
+
     out = []
     references = record.get('references')
     if references:
@@ -47,6 +53,7 @@ def get_and_format_references(record):
             'lit',
             reference_recids,
             _source=[
+                '_collections',
                 'authors',
                 'citation_count',
                 'collaboration',
@@ -60,13 +67,10 @@ def get_and_format_references(record):
 
         # Create mapping to keep reference order
         recid_to_reference = {
-            ref['control_number']: ref for ref in resolved_references
+            ref['control_number']: ref
+            for ref in filter_readable_records(resolved_references)
         }
         for reference in references:
-            row = []
-            ref_record = recid_to_reference.get(
-                reference.get('recid'), {}
-            )
             if 'reference' in reference:
                 reference.update(reference['reference'])
                 del reference['reference']
@@ -74,6 +78,17 @@ def get_and_format_references(record):
                 reference['publication_info'] = force_list(
                     reference['publication_info']
                 )
+
+        prefetch_template_filters([
+            recid_to_reference.get(reference.get('recid')) or reference
+            for reference in references
+        ], ['publication_info'])
+
+        for reference in references:
+            row = []
+            ref_record = recid_to_reference.get(
+                reference.get('recid'), {}
+            )
             row.append(render_template_to_string(
                 'inspirehep_theme/references.html',
                 record=ref_record,
@@ -130,3 +145,27 @@ def local_refextract_kbs_path():
     finally:
         if os.path.exists(temp_journal_kb_path):
             os.unlink(temp_journal_kb_path)
+
+
+def get_cached_refextract_kbs_path():
+    """Get the path to a local copy of the refextract kbs, reused across calls.
+
+    Unlike :func:`local_refextract_kbs_path`, the kbs are not retrieved at
+    every call: the local copy is kept for ``REFEXTRACT_KB_CACHE_TIMEOUT``
+    seconds, after which it is retrieved again to pick up the kbs generated
+    by ``create_journal_kb_file``.
+    """
+    journal_kb_path = current_app.config.get('REFEXTRACT_JOURNAL_KB_PATH')
+    timeout = current_app.config.get('REFEXTRACT_KB_CACHE_TIMEOUT', 3600)
+
+    cached_path, retrieved_at = _CACHED_KBS_PATHS.get(journal_kb_path, (None, 0))
+    if cached_path and os.path.exists(cached_path) and \
+            time.time() - retrieved_at < timeout:
+        return {'journals': cached_path}
+
+    temp_journal_kb_path = retrieve_uri(journal_kb_path)
+    _CACHED_KBS_PATHS[journal_kb_path] = (temp_journal_kb_path, time.time())
+    if cached_path and os.path.exists(cached_path):
+        os.unlink(cached_path)
+
+    return {'journals': temp_journal_kb_path}
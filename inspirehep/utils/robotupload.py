@@ -32,6 +32,22 @@ from flask import current_app
 
 from .url import make_user_agent_string
 
+MARCXML_COLLECTION_TEMPLATE = u'''\
+<?xml version="1.0" encoding="UTF-8" ?>
+<collection xmlns="http://www.loc.gov/MARC21/slim">
+{}
+</collection>
+'''
+
+
+def make_robotupload_marcxml_collection(marcxml_records):
+    """Join MARCXML records in a collection shipped by a single robotupload."""
+    marcxml_records = [
+        marcxml.decode('utf8') if not isinstance(marcxml, text_type) else marcxml
+        for marcxml in marcxml_records
+    ]
+    return MARCXML_COLLECTION_TEMPLATE.format(u'\n'.join(marcxml_records))
+
 
 def make_robotupload_marcxml(url, marcxml, mode, **kwargs):
     """Make a robotupload request."""
@@ -25,13 +25,22 @@
 from __future__ import absolute_import, division, print_function
 
 from functools import wraps
+from multiprocessing.pool import ThreadPool
+from threading import Lock
 from urlparse import urljoin, urlparse
 
 from flask import current_app, render_template
 from rt import ALL_QUEUES, AuthorizationError, Rt
 
+from invenio_cache import current_cache
+
 from .proxies import rt_instance
 
+RT_LIST_CACHE_KEY = 'rt_{}s'
+RT_TICKETS_CACHE_KEY = 'rt_tickets::{}'
+
+_relogin_lock = Lock()
+
 
 class InspireRt(Rt):
 
@@ -73,20 +82,33 @@ def relogin_if_needed(f):
 
     This decorator should be used to wrap any function calling into RT.
 
+    The RT session is shared by the threads sending requests concurrently,
+    so the relogins are serialized, and the threads that failed with the
+    same session log in only once.
+
     FIXME: The real solution would be to enable auth/digest authentication
     on RT side. Then this trick would no longer be needed, as long as the
     extension is properly initialized in ext.py.
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        rt = rt_instance._get_current_object()
+        login_count = getattr(rt, 'login_count', 0)
         try:
             return f(*args, **kwargs)
         except AuthorizationError:
-            rt_instance.login()
+            _relogin(rt, login_count)
             return f(*args, **kwargs)
     return decorated_function
 
 
+def _relogin(rt, failed_login_count):
+    with _relogin_lock:
+        if getattr(rt, 'login_count', 0) == failed_login_count:
+            rt.login()
+            rt.login_count = failed_login_count + 1
+
+
 @relogin_if_needed
 def create_ticket(queue,
                   requestors,
@@ -144,7 +166,11 @@ def create_ticket(queue,
     if requestors and "admin@inspirehep.net" not in requestors:
         payload["requestors"] = requestors
 
-    return rt_instance.create_ticket(**payload)
+    ticket_id = rt_instance.create_ticket(**payload)
+    if recid:
+        invalidate_tickets_cache(recid)
+
+    return ticket_id
 
 
 def create_ticket_with_template(queue,
@@ -190,10 +216,14 @@ def create_ticket_with_template(queue,
 
 
 @relogin_if_needed
-def resolve_ticket(ticket_id):
+def resolve_ticket(ticket_id, recid=None):
     """Resolves the given ticket
 
     :type ticket_id: integer
+
+    :param recid: record id of the ticket, whose cached tickets are
+        invalidated
+    :type recid: integer
     """
     try:
         rt_instance.edit_ticket(
@@ -206,21 +236,48 @@ def resolve_ticket(ticket_id):
         if ticket["Status"] != "resolved":
             raise EditTicketException()
 
+    if recid:
+        invalidate_tickets_cache(recid)
+
 
-def get_queues():
+def get_queues(refresh=False):
     """Returns list of all queues as {id, name} dict
 
+    The list is cached for ``RT_LISTS_CACHE_TIMEOUT`` seconds.
+
+    :param refresh: flag to download the list again even if it is cached
+
     :rtype: dict - with ``name (string)``, ``id (integer)`` properties
     """
-    return _get_all_of("queue")
+    return _get_cached_all_of("queue", refresh=refresh)
 
 
-def get_users():
+def get_users(refresh=False):
     """Returns list of all users as {id, name} dict
 
+    The list is cached for ``RT_LISTS_CACHE_TIMEOUT`` seconds.
+
+    :param refresh: flag to download the list again even if it is cached
+
     :rtype: dict - with ``name (string)``, ``id (integer)`` properties
     """
-    return _get_all_of("user")
+    return _get_cached_all_of("user", refresh=refresh)
+
+
+def _get_cached_all_of(query_type, refresh=False):
+    cache_key = RT_LIST_CACHE_KEY.format(query_type)
+    if not refresh:
+        result = current_cache.get(cache_key)
+        if result is not None:
+            return result
+
+    result = list(_get_all_of(query_type))
+    current_cache.set(
+        cache_key,
+        result,
+        timeout=current_app.config['RT_LISTS_CACHE_TIMEOUT'],
+    )
+    return result
 
 
 @relogin_if_needed
@@ -263,14 +320,54 @@ def _strip_lines(multiline_string):
     )
 
 
-@relogin_if_needed
 def get_tickets_by_recid(recid,
                          exclude_resolved=True,
-                         with_extra_attributes=True):
+                         with_extra_attributes=True,
+                         refresh=False):
     """Returns all tickets that are associated with the given recid
 
+    The unresolved tickets with their extra attributes are cached for
+    ``RT_TICKETS_CACHE_TIMEOUT`` seconds, and invalidated when a ticket of
+    the record is created or resolved through this module.
+
     :type recid: integer
+
+    :param refresh: flag to search the tickets again even if they are cached
     """
+    if not (exclude_resolved and with_extra_attributes):
+        return _get_tickets_by_recid(
+            recid,
+            exclude_resolved=exclude_resolved,
+            with_extra_attributes=with_extra_attributes,
+        )
+
+    cache_key = RT_TICKETS_CACHE_KEY.format(recid)
+    if not refresh:
+        tickets_for_recid = current_cache.get(cache_key)
+        if tickets_for_recid is not None:
+            return tickets_for_recid
+
+    tickets_for_recid = _get_tickets_by_recid(recid)
+    current_cache.set(
+        cache_key,
+        tickets_for_recid,
+        timeout=current_app.config['RT_TICKETS_CACHE_TIMEOUT'],
+    )
+    return tickets_for_recid
+
+
+def invalidate_tickets_cache(recid):
+    """Forget the cached tickets of the given recid
+
+    :type recid: integer
+    """
+    current_cache.delete(RT_TICKETS_CACHE_KEY.format(recid))
+
+
+@relogin_if_needed
+def _get_tickets_by_recid(recid,
+                          exclude_resolved=True,
+                          with_extra_attributes=True):
     search_params = dict(
         Queue=ALL_QUEUES,
         CF_RecordID=str(recid)
@@ -279,11 +376,39 @@ def get_tickets_by_recid(recid,
         search_params['Status__notexact'] = 'resolved'
     tickets_for_recid = rt_instance.search(**search_params)
     if with_extra_attributes:
-        return map(_set_extra_attributes, tickets_for_recid)
+        return _set_extra_attributes_concurrently(tickets_for_recid)
     else:
         return tickets_for_recid
 
 
+def _set_extra_attributes_concurrently(tickets):
+    """Sets the extra attributes of the given tickets in parallel
+
+    At most ``RT_MAX_CONCURRENT_REQUESTS`` tickets are fetched at a time.
+    The tickets were just found in RT, so the shared session is logged in
+    before the requests fan out.
+    """
+    if not tickets:
+        return []
+
+    app = current_app._get_current_object()
+
+    def _set_extra_attributes_in_app_context(ticket):
+        with app.app_context():
+            return _set_extra_attributes(ticket)
+
+    pool = ThreadPool(min(
+        len(tickets),
+        current_app.config['RT_MAX_CONCURRENT_REQUESTS'],
+    ))
+    try:
+        return pool.map(_set_extra_attributes_in_app_context, tickets)
+    finally:
+        pool.close()
+        pool.join()
+
+
+@relogin_if_needed
 def _set_extra_attributes(ticket):
     """Sets better ticket id, Text and Link for given ticket"""
     # `ticket['id']` has format of `'ticket/<ticket_id>'`
@@ -296,11 +421,14 @@ def _set_extra_attributes(ticket):
 
 def _get_ticket_text(ticket_id):
     """Returns the first plain text attachment or empty string for given ticket
+
+    The content types are read from the attachment list, so that only the
+    plain text attachment is downloaded.
     """
-    attachments_ids = rt_instance.get_attachments_ids(ticket_id)
-    for attachment_id in attachments_ids:
-        attachment = rt_instance.get_attachment(ticket_id, attachment_id)
-        if attachment['ContentType'] == 'text/plain':
+    attachments = rt_instance.get_attachments(ticket_id) or []
+    for attachment_id, _, content_type, _ in attachments:
+        if content_type == 'text/plain':
+            attachment = rt_instance.get_attachment(ticket_id, attachment_id)
             return attachment['Content']
     return ''
 
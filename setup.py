@@ -226,8 +226,15 @@ setup(
         ],
         'invenio_celery.tasks': [
             'inspire_migrator = inspirehep.modules.migrator.tasks',
+            'inspire_pidstore = inspirehep.modules.pidstore.tasks',
             'inspire_records = inspirehep.modules.records.tasks',
             'inspire_refextract = inspirehep.modules.refextract.tasks',
+            'inspire_theme = inspirehep.modules.theme.tasks',
+            'inspire_workflows_batch = inspirehep.modules.workflows.tasks.batch',
+            'inspire_workflows_callbacks = inspirehep.modules.workflows.tasks.callbacks',
+            'inspire_workflows_matching = inspirehep.modules.workflows.tasks.matching',
+            'inspire_workflows_outbox = inspirehep.modules.workflows.tasks.outbox',
+            'inspire_workflows_robotupload = inspirehep.modules.workflows.tasks.robotupload',
         ],
         'invenio_db.alembic': [
             'inspirehep = inspirehep:alembic',
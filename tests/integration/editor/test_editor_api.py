@@ -129,6 +129,19 @@ def test_get_revisions(log_in_as_cataloger, record_with_two_revisions, api_clien
     assert result[1]['user_email'] == 'system'
 
 
+def test_get_revisions_paginated(log_in_as_cataloger, record_with_two_revisions, api_client):
+    response = api_client.get(
+        '/editor/literature/111/revisions?page=2&size=1',
+        content_type='application/json',
+    )
+
+    result = json.loads(response.data)
+
+    assert len(result) == 1
+    assert result[0]['revision_id'] == 1
+    assert response.headers['X-Total-Count'] == '3'
+
+
 def test_revert_to_revision(log_in_as_cataloger, record_with_two_revisions, api_client):
     record = get_db_record('lit', 111)
 
@@ -425,6 +438,46 @@ def test_refextract_url(log_in_as_cataloger, api_client):
     assert get_value({'references': references}, 'references.reference.publication_info.journal_title')
 
 
+def test_refextract_job(log_in_as_cataloger, api_client):
+    schema = load_schema('hep')
+    subschema = schema['properties']['references']
+
+    response = api_client.post(
+        '/editor/refextract/jobs',
+        content_type='application/json',
+        data=json.dumps({
+            'text': (
+                u'J. M. Maldacena. “The Large N Limit of Superconformal Field '
+                u'Theories and Supergravity”. Adv. Theor. Math. Phys. 2 (1998), '
+                u'pp. 231–252.'
+            ),
+        }),
+    )
+    job_id = json.loads(response.data)['job_id']
+
+    assert response.status_code == 202
+
+    response = api_client.get(
+        '/editor/refextract/jobs/' + job_id,
+        content_type='application/json',
+    )
+    job = json.loads(response.data)
+
+    assert response.status_code == 200
+    assert job['status'] == 'done'
+    assert validate(job['references'], subschema) is None
+    assert get_value({'references': job['references']}, 'references.reference.publication_info.journal_title')
+
+
+def test_refextract_job_not_found(log_in_as_cataloger, api_client):
+    response = api_client.get(
+        '/editor/refextract/jobs/does-not-exist',
+        content_type='application/json',
+    )
+
+    assert response.status_code == 404
+
+
 @patch('inspirehep.modules.editor.api.start_merger')
 def test_manual_merge(mock_start_merger, log_in_as_cataloger, api_client):
     mock_start_merger.return_value = 100
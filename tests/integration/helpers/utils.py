@@ -31,6 +31,7 @@ from invenio_db import db
 from invenio_pidstore.models import PersistentIdentifier, RecordIdentifier
 from invenio_search import current_search_client as es
 
+from inspirehep.modules.migrator.models import InspireProdRecords
 from inspirehep.modules.migrator.tasks import record_insert_or_replace
 from inspirehep.utils.record_getter import get_db_record
 
@@ -45,6 +46,8 @@ def _delete_record(pid_type, pid_value):
     if recpid:
         db.session.delete(recpid)
 
+    InspireProdRecords.query.filter_by(recid=pid_value).delete()
+
     object_uuid = pid.object_uuid
     PersistentIdentifier.query.filter(
         object_uuid == PersistentIdentifier.object_uuid).delete()
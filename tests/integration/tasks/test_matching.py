@@ -37,6 +37,7 @@ from inspirehep.modules.workflows.tasks.matching import (
     has_same_source,
     match_non_completed_wf_in_holdingpen,
     match_previously_rejected_wf_in_holdingpen,
+    match_wfs_in_holdingpen,
     stop_matched_holdingpen_wfs,
 )
 
@@ -104,6 +105,32 @@ def test_match_previously_rejected_wf_in_holdingpen(app, simple_record):
     assert not match_previously_rejected_wf_in_holdingpen(obj2, None)
 
 
+def test_match_wfs_in_holdingpen(app, simple_record):
+    pending = workflow_object_class.create(
+        data=simple_record,
+        status=ObjectStatus.HALTED,
+        data_type='hep',
+    )
+    pending_id = pending.id
+    pending.save()
+
+    rejected = workflow_object_class.create(
+        data=simple_record,
+        status=ObjectStatus.COMPLETED,
+        data_type='hep',
+    )
+    rejected_id = rejected.id
+    rejected.extra_data['approved'] = False
+    rejected.save()
+    es.indices.refresh('holdingpen-hep')
+
+    obj = WorkflowObject.create(data=simple_record, data_type='hep')
+    match_wfs_in_holdingpen(obj, None)
+
+    assert obj.extra_data['holdingpen_matches'] == [pending_id]
+    assert obj.extra_data['previously_rejected_matches'] == [rejected_id]
+
+
 def test_has_same_source(app, simple_record):
     obj = workflow_object_class.create(
         data=simple_record,
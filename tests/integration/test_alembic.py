@@ -110,3 +110,50 @@ def test_alembic_revision_cb5153afd839(alembic_app):
     assert 'workflows_record_sources' not in inspector.get_table_names()
 
     drop_alembic_version_table()
+
+
+def test_alembic_revision_2f4e8d1b7c3a(alembic_app):
+    ext = alembic_app.extensions['invenio-db']
+
+    if db.engine.name == 'sqlite':
+        raise pytest.skip('Upgrades are not supported on SQLite.')
+
+    db.drop_all()
+    drop_alembic_version_table()
+
+    inspector = inspect(db.engine)
+    assert 'workflows_ticket_outbox' not in inspector.get_table_names()
+
+    ext.alembic.upgrade(target='2f4e8d1b7c3a')
+    inspector = inspect(db.engine)
+    assert 'workflows_ticket_outbox' in inspector.get_table_names()
+
+    ext.alembic.downgrade(target='cb5153afd839')
+    inspector = inspect(db.engine)
+    assert 'workflows_ticket_outbox' not in inspector.get_table_names()
+
+    drop_alembic_version_table()
+
+
+def test_alembic_revision_4d7c1e2a9b5f(alembic_app):
+    def get_columns(tablename):
+        return [column['name'] for column in inspect(db.engine).get_columns(tablename)]
+
+    ext = alembic_app.extensions['invenio-db']
+
+    if db.engine.name == 'sqlite':
+        raise pytest.skip('Upgrades are not supported on SQLite.')
+
+    db.drop_all()
+    drop_alembic_version_table()
+
+    ext.alembic.upgrade(target='2f4e8d1b7c3a')
+    assert 'content_hash' not in get_columns('inspire_prod_records')
+
+    ext.alembic.upgrade(target='4d7c1e2a9b5f')
+    assert 'content_hash' in get_columns('inspire_prod_records')
+
+    ext.alembic.downgrade(target='2f4e8d1b7c3a')
+    assert 'content_hash' not in get_columns('inspire_prod_records')
+
+    drop_alembic_version_table()
@@ -31,7 +31,11 @@ from flask import current_app
 from redis import StrictRedis
 
 from inspirehep.modules.migrator.models import InspireProdRecords
-from inspirehep.modules.migrator.tasks import continuous_migration
+from inspirehep.modules.migrator.tasks import (
+    continuous_migration,
+    get_continuous_migration_stats,
+    remigrate_records,
+)
 from inspirehep.utils.record_getter import get_db_record
 
 from utils import _delete_record
@@ -52,6 +56,7 @@ def flush_redis():
     redis_url = current_app.config.get('CACHE_REDIS_URL')
     r = StrictRedis.from_url(redis_url)
     r.delete('legacy_records')
+    r.delete('continuous_migration_stats')
 
 
 @pytest.fixture(scope='function')
@@ -148,3 +153,51 @@ def test_continuous_migration_handles_record_updates(app, record_1502656_and_upd
     result = InspireProdRecords.query.get(1502656).marcxml
 
     assert expected == result
+
+
+def test_continuous_migration_handles_multiple_batches(app, record_1502655_and_1502656):
+    r = StrictRedis.from_url(current_app.config.get('CACHE_REDIS_URL'))
+
+    assert r.llen('legacy_records') == 2
+
+    continuous_migration(batch_size=1)
+
+    assert r.llen('legacy_records') == 0
+
+    get_db_record('aut', 1502655)  # Does not raise.
+    get_db_record('lit', 1502656)  # Does not raise.
+
+
+def test_get_continuous_migration_stats(app, record_1502655_and_1502656):
+    expected = {'backlog': 2}
+    result = get_continuous_migration_stats()
+
+    assert expected == result
+
+    continuous_migration()
+
+    result = get_continuous_migration_stats()
+
+    assert result['backlog'] == 0
+    assert result['last_batch_size'] == 2
+    assert result['drain_rate'] > 0
+
+
+def test_continuous_migration_skips_unchanged_records(app, record_1502656):
+    continuous_migration()
+
+    expected = get_db_record('lit', 1502656).revision_id
+
+    push_to_redis('1502656.xml')
+    continuous_migration()
+
+    result = get_db_record('lit', 1502656).revision_id
+
+    assert expected == result
+
+
+def test_remigrate_records_skips_unchanged_records(app, record_1502656):
+    continuous_migration()
+
+    assert remigrate_records(only_broken=False) >= 1
+    assert InspireProdRecords.query.get(1502656).content_hash is not None
@@ -26,12 +26,17 @@ import mock
 import requests_mock
 from flask import current_app
 
-from inspirehep.modules.pidstore.providers import InspireRecordIdProvider
+from inspirehep.modules.pidstore.providers import (
+    LEGACY_PID_POOL_KEY,
+    InspireRecordIdProvider,
+    _get_redis,
+)
 
 
 def test_getting_next_recid_from_legacy(app):
     extra_config = {
         'LEGACY_PID_PROVIDER': 'http://server/batchuploader/allocaterecord',
+        'LEGACY_PID_PROVIDER_POOL_SIZE': 0,
     }
 
     with mock.patch.dict(current_app.config, extra_config):
@@ -51,3 +56,28 @@ def test_getting_next_recid_from_legacy(app):
             provider = InspireRecordIdProvider.create(**args)
 
             assert str(provider.pid.pid_value) == '3141592'
+
+
+def test_getting_next_recid_from_the_legacy_pid_pool(app):
+    extra_config = {
+        'LEGACY_PID_PROVIDER': 'http://server/batchuploader/allocaterecord',
+        'LEGACY_PID_PROVIDER_POOL_SIZE': 2,
+        'LEGACY_PID_PROVIDER_POOL_LOW_WATER_MARK': 1,
+    }
+
+    r = _get_redis()
+    r.rpush(LEGACY_PID_POOL_KEY, 2718281, 1618033)
+
+    try:
+        with mock.patch.dict(current_app.config, extra_config):
+            args = dict(
+                object_type='rec',
+                object_uuid='3cbb9fc4-58e2-4c4d-a8ae-ba5ae1d1a4d3',
+                pid_type='lit'
+            )
+            provider = InspireRecordIdProvider.create(**args)
+
+            assert str(provider.pid.pid_value) == '2718281'
+            assert r.lrange(LEGACY_PID_POOL_KEY, 0, -1) == [b'1618033']
+    finally:
+        r.delete(LEGACY_PID_POOL_KEY)
@@ -25,9 +25,13 @@ from __future__ import absolute_import, division, print_function
 import copy
 import pytest
 import StringIO
+from flask import current_app
 from mock import patch, mock_open
+from sqlalchemy import event
 
 from invenio_db import db
+from invenio_files_rest.errors import InvalidOperationError
+from invenio_files_rest.models import Location
 from invenio_pidstore.models import (
     PersistentIdentifier,
     Redirect,
@@ -306,6 +310,13 @@ def test_merged_records_stay_merged(api_client, merged_records):
     assert api_client.get('/literature/222').status_code == 301
 
 
+def test_merged_records_are_merged_in_chunks(api_client, merged_records):
+    merge_merged_records(chunk_size=1)
+
+    assert api_client.get('/literature/111').status_code == 200
+    assert api_client.get('/literature/222').status_code == 301
+
+
 def test_merge_record_with_non_existing_pid(api_client, merged_records):
     def get_pid_entry(recid):
         return PersistentIdentifier.query.filter_by(pid_value=str(recid)).one_or_none()
@@ -851,6 +862,254 @@ def test_create_with_multiple_source_records(app):
     assert current_descs == expected_descs
 
 
+def test_create_downloads_identical_figures_once(app):
+    record_json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'control_number': 1,
+        'document_type': [
+            'article',
+        ],
+        'titles': [
+            {'title': 'foo'},
+        ],
+        '_collections': [
+            'Literature'
+        ],
+        'figures': [
+            {
+                'key': 'graph.png',
+                'url': 'http://www.mdpi.com/2218-1997/3/1/24/png',
+            },
+            {
+                'key': 'graph_copy.png',
+                'url': 'http://www.mdpi.com/2218-1997/3/1/25/png',
+            },
+        ],
+    }
+
+    with patch(
+        'inspirehep.modules.records.api.fsopen',
+        side_effect=lambda *args, **kwargs: StringIO.StringIO('dummy body'),
+    ):
+        record = InspireRecord.create(record_json)
+
+    assert len(record.files) == 2
+    assert len(record['figures']) == 2
+
+    file_ids = {record_file.file.id for record_file in record.files}
+
+    assert len(file_ids) == 1
+
+
+@patch(
+    'inspirehep.modules.records.api.fsopen',
+    mock_open(read_data='dummy body'),
+)
+def test_create_with_source_record_reuses_its_files(app):
+    record1_json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'control_number': 1,
+        'document_type': [
+            'article',
+        ],
+        'titles': [
+            {'title': 'foo'},
+        ],
+        '_collections': [
+            'Literature'
+        ],
+        'documents': [{
+            'key': 'Fulltext.pdf',
+            'url': '/some/non/existing/path.pdf',
+        }],
+    }
+
+    record2_json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'control_number': 2,
+        'document_type': [
+            'article',
+        ],
+        'titles': [
+            {'title': 'foo'},
+        ],
+        '_collections': [
+            'Literature'
+        ],
+    }
+
+    record1 = InspireRecord.create(record1_json)
+    record2_json['documents'] = copy.deepcopy(record1['documents'])
+    record2 = InspireRecord.create(record2_json, files_src_records=[record1])
+
+    expected = record1.files['1_Fulltext.pdf'].file.id
+    result = record2.files['2_Fulltext.pdf'].file.id
+
+    assert expected == result
+
+
+def test_add_documents_and_figures(app):
+    record_json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'control_number': 1,
+        'document_type': [
+            'article',
+        ],
+        'titles': [
+            {'title': 'foo'},
+        ],
+        '_collections': [
+            'Literature'
+        ],
+    }
+
+    record = InspireRecord.create(record_json)
+    figure_stream = StringIO.StringIO('figure body')
+
+    added = record.add_documents_and_figures([
+        {
+            'metadata': {},
+            'stream': StringIO.StringIO('document body'),
+            'file_name': 'fulltext.pdf',
+        },
+        {
+            'metadata': {'caption': 'first'},
+            'stream': figure_stream,
+            'file_name': 'graph.png',
+            'is_document': False,
+        },
+        {
+            'metadata': {'caption': 'second'},
+            'stream': figure_stream,
+            'file_name': 'graph.png',
+            'is_document': False,
+        },
+    ])
+
+    expected = ['1_fulltext.pdf', '1_graph.png', '1_graph.png_1']
+    result = [metadata['key'] for metadata in added]
+
+    assert expected == result
+    assert sorted(record.files.keys) == expected
+    assert len(record['documents']) == 1
+    assert [figure['caption'] for figure in record['figures']] == ['first', 'second']
+    assert record.files['1_graph.png'].file.id == record.files['1_graph.png_1'].file.id
+
+    file_content = open(record.files['1_graph.png_1'].obj.file.uri).read()
+    assert file_content == 'figure body'
+
+
+def test_add_documents_and_figures_requires_a_key_or_a_file_name(app):
+    record_json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'control_number': 1,
+        'document_type': [
+            'article',
+        ],
+        'titles': [
+            {'title': 'foo'},
+        ],
+        '_collections': [
+            'Literature'
+        ],
+    }
+
+    record = InspireRecord.create(record_json)
+
+    with pytest.raises(TypeError):
+        record.add_documents_and_figures([{'metadata': {}}])
+
+
+def test_add_documents_and_figures_does_not_write_to_a_locked_bucket(app):
+    record_json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'control_number': 1,
+        'document_type': [
+            'article',
+        ],
+        'titles': [
+            {'title': 'foo'},
+        ],
+        '_collections': [
+            'Literature'
+        ],
+    }
+
+    record = InspireRecord.create(record_json)
+    record.files.bucket.locked = True
+
+    with pytest.raises(InvalidOperationError):
+        record.add_documents_and_figures([{
+            'metadata': {},
+            'stream': StringIO.StringIO('document body'),
+            'file_name': 'fulltext.pdf',
+        }])
+
+    assert record.files.keys == []
+
+
+def test_add_documents_and_figures_makes_fewer_queries_than_one_by_one(app, tmpdir):
+    """Attach figures to a record one by one and in a batch.
+
+    The files are written to a temporary location and the records are
+    rolled back at the end.
+    """
+    def _create_record():
+        return InspireRecord.create({
+            '$schema': 'http://localhost:5000/schemas/records/hep.json',
+            '_collections': ['Literature'],
+            'control_number': 0,
+            'document_type': ['article'],
+            'titles': [{'title': 'Figures benchmark'}],
+        }, skip_files=True)
+
+    def _get_figures():
+        return [
+            {
+                'metadata': {'caption': 'Figure {}'.format(i)},
+                'stream': StringIO.StringIO('figure {}'.format(i)),
+                'file_name': 'figure_{}.png'.format(i),
+                'is_document': False,
+            }
+            for i in range(300)
+        ]
+
+    queries = []
+
+    def _count_query(*args, **kwargs):
+        queries.append(None)
+
+    config = {'RECORDS_DEFAULT_FILE_LOCATION_NAME': 'benchmark'}
+    try:
+        with patch.dict(current_app.config, config):
+            with db.session.begin_nested():
+                db.session.add(Location(name='benchmark', uri=str(tmpdir)))
+
+                one_by_one_record = _create_record()
+                batch_record = _create_record()
+                db.session.flush()
+
+                event.listen(db.engine, 'before_cursor_execute', _count_query)
+                try:
+                    for figure in _get_figures():
+                        one_by_one_record.add_document_or_figure(**figure)
+                    db.session.flush()
+                    one_by_one_queries = len(queries)
+
+                    batch_record.add_documents_and_figures(_get_figures())
+                    db.session.flush()
+                    batch_queries = len(queries) - one_by_one_queries
+                finally:
+                    event.remove(db.engine, 'before_cursor_execute', _count_query)
+
+                assert one_by_one_record.files.keys == batch_record.files.keys
+                assert [figure['key'] for figure in one_by_one_record['figures']] == \
+                    [figure['key'] for figure in batch_record['figures']]
+                assert batch_queries < one_by_one_queries
+    finally:
+        db.session.rollback()
+
+
 def test_create_with_records_skip_files_conf_does_not_add_documents_or_figures(app):
     record_json = {
         '$schema': 'http://localhost:5000/schemas/records/hep.json',
@@ -914,10 +1173,13 @@ def test_create_with_skip_files_param_overrides_records_skip_files_conf_and_does
     expected_figure_file_content = 'dummy body'
     expected_figure_key = '1_graph.png'
 
+    # The files are downloaded in parallel, so each of them needs its own
+    # stream instead of the single one shared by the calls to mock_open.
     with patch.dict(app.config, {'RECORDS_SKIP_FILES': True}):
         with patch(
             'inspirehep.modules.records.api.fsopen',
-            mock_open(read_data=expected_figure_file_content),
+            side_effect=lambda *args, **kwargs: StringIO.StringIO(
+                expected_figure_file_content),
         ):
             record = InspireRecord.create(record_json, skip_files=False)
 
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+from inspirehep.modules.migrator.tasks import (
+    get_content_hash,
+    get_recid_from_marcxml,
+    read_dump_range,
+    split_dump_into_ranges,
+)
+
+
+DUMP = (
+    b'<collection>\n'
+    b'<record>\n  <controlfield tag="001">1</controlfield>\n</record>\n'
+    b'<record>\n  <controlfield tag="001">2</controlfield>\n</record>\n'
+    b'<record>\n  <controlfield tag="001">3</controlfield>\n</record>\n'
+    b'</collection>\n'
+)
+
+
+def test_split_dump_into_ranges(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write(DUMP, mode='wb')
+
+    ranges = list(split_dump_into_ranges(str(dump), chunksize=2))
+
+    assert len(ranges) == 2
+    assert DUMP[ranges[0][0]:].startswith(b'<record>')
+    assert DUMP[sum(ranges[1]) - len(b'</record>'):].startswith(b'</record>')
+
+
+def test_split_dump_into_ranges_handles_empty_dumps(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write(b'', mode='wb')
+
+    assert list(split_dump_into_ranges(str(dump))) == []
+
+
+def test_read_dump_range(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write(DUMP, mode='wb')
+
+    first, second = split_dump_into_ranges(str(dump), chunksize=2)
+
+    records = read_dump_range(str(dump), *first)
+
+    assert len(records) == 2
+    assert b'>1<' in records[0]
+    assert b'>2<' in records[1]
+
+    records = read_dump_range(str(dump), *second)
+
+    assert len(records) == 1
+    assert b'>3<' in records[0]
+
+
+def test_get_content_hash_is_stable():
+    record = b'<record><controlfield tag="001">1</controlfield></record>'
+
+    assert get_content_hash(record) == get_content_hash(record)
+    assert get_content_hash(record) == get_content_hash(record.decode('utf8'))
+    assert get_content_hash(record) != get_content_hash(record + b' ')
+
+
+def test_get_recid_from_marcxml():
+    record = b'<record>\n  <controlfield tag="001">1502656</controlfield>\n</record>'
+
+    assert get_recid_from_marcxml(record) == 1502656
+
+
+def test_get_recid_from_marcxml_without_recid():
+    assert get_recid_from_marcxml(b'<record></record>') is None
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+from flask import current_app
+from mock import patch
+
+from inspirehep.modules.pidstore.providers import (
+    LEGACY_PID_POOL_KEY,
+    _get_next_pid_from_legacy,
+    refill_pool,
+)
+
+
+@patch('inspirehep.modules.pidstore.providers._schedule_pool_refill')
+@patch('inspirehep.modules.pidstore.providers._request_pid_from_legacy')
+@patch('inspirehep.modules.pidstore.providers._get_redis')
+def test_get_next_pid_from_legacy_takes_pids_from_the_pool(mock_redis, mock_request, mock_schedule):
+    mock_redis.return_value.lpop.return_value = b'3141592'
+    mock_redis.return_value.llen.return_value = 50
+
+    config = {
+        'LEGACY_PID_PROVIDER_POOL_SIZE': 100,
+        'LEGACY_PID_PROVIDER_POOL_LOW_WATER_MARK': 20,
+    }
+
+    with patch.dict(current_app.config, config):
+        assert _get_next_pid_from_legacy() == 3141592
+
+    mock_redis.return_value.lpop.assert_called_once_with(LEGACY_PID_POOL_KEY)
+    mock_request.assert_not_called()
+    mock_schedule.assert_not_called()
+
+
+@patch('inspirehep.modules.pidstore.providers._schedule_pool_refill')
+@patch('inspirehep.modules.pidstore.providers._request_pid_from_legacy')
+@patch('inspirehep.modules.pidstore.providers._get_redis')
+def test_get_next_pid_from_legacy_refills_the_pool_below_the_low_water_mark(mock_redis, mock_request, mock_schedule):
+    mock_redis.return_value.lpop.return_value = b'3141592'
+    mock_redis.return_value.llen.return_value = 19
+
+    config = {
+        'LEGACY_PID_PROVIDER_POOL_SIZE': 100,
+        'LEGACY_PID_PROVIDER_POOL_LOW_WATER_MARK': 20,
+    }
+
+    with patch.dict(current_app.config, config):
+        assert _get_next_pid_from_legacy() == 3141592
+
+    mock_schedule.assert_called_once_with(mock_redis.return_value)
+    mock_request.assert_not_called()
+
+
+@patch('inspirehep.modules.pidstore.providers._schedule_pool_refill')
+@patch('inspirehep.modules.pidstore.providers._request_pid_from_legacy')
+@patch('inspirehep.modules.pidstore.providers._get_redis')
+def test_get_next_pid_from_legacy_reserves_on_demand_when_the_pool_is_empty(mock_redis, mock_request, mock_schedule):
+    mock_redis.return_value.lpop.return_value = None
+    mock_redis.return_value.llen.return_value = 0
+    mock_request.return_value = 3141592
+
+    config = {
+        'LEGACY_PID_PROVIDER_POOL_SIZE': 100,
+        'LEGACY_PID_PROVIDER_POOL_LOW_WATER_MARK': 20,
+    }
+
+    with patch.dict(current_app.config, config):
+        assert _get_next_pid_from_legacy() == 3141592
+
+    mock_schedule.assert_called_once_with(mock_redis.return_value)
+    mock_request.assert_called_once_with()
+
+
+@patch('inspirehep.modules.pidstore.providers._get_redis')
+@patch('inspirehep.modules.pidstore.providers._request_pid_from_legacy')
+def test_get_next_pid_from_legacy_without_pool(mock_request, mock_redis):
+    mock_request.return_value = 3141592
+
+    with patch.dict(current_app.config, {'LEGACY_PID_PROVIDER_POOL_SIZE': 0}):
+        assert _get_next_pid_from_legacy() == 3141592
+
+    mock_redis.assert_not_called()
+
+
+@patch('inspirehep.modules.pidstore.providers._request_pid_from_legacy')
+@patch('inspirehep.modules.pidstore.providers._get_redis')
+def test_refill_pool_fills_the_pool(mock_redis, mock_request):
+    mock_redis.return_value.llen.return_value = 97
+    mock_request.side_effect = [1, 2, 3]
+
+    with patch.dict(current_app.config, {'LEGACY_PID_PROVIDER_POOL_SIZE': 100}):
+        assert refill_pool() == 3
+
+    pushed = [call[0][1] for call in mock_redis.return_value.rpush.call_args_list]
+    assert pushed == [1, 2, 3]
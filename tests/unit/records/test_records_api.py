@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+from mock import Mock, patch
+
+from inspirehep.modules.records.api import (
+    _download_files,
+    _download_to_temporary_file,
+)
+
+
+@patch('inspirehep.modules.records.api._download_to_temporary_file')
+def test_download_files_closes_the_downloaded_files_on_error(d_t_t_f):
+    temporary_file = Mock()
+
+    def _download(url):
+        if url == 'http://example.org/broken.png':
+            raise IOError('broken')
+        return temporary_file, 'md5:checksum'
+
+    d_t_t_f.side_effect = _download
+
+    with pytest.raises(IOError):
+        _download_files([
+            'http://example.org/figure.png',
+            'http://example.org/broken.png',
+        ])
+
+    temporary_file.close.assert_called_once_with()
+
+
+@patch('inspirehep.modules.records.api.fsopen', side_effect=IOError('not found'))
+@patch('inspirehep.modules.records.api.tempfile.TemporaryFile')
+def test_download_to_temporary_file_closes_the_file_when_the_url_cannot_be_opened(t_f, fsopen):
+    with pytest.raises(IOError):
+        _download_to_temporary_file('http://example.org/figure.png')
+
+    t_f.return_value.close.assert_called_once_with()
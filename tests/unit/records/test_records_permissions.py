@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from flask import current_app, g
+from mock import patch
+
+from mocks import MockUser
+
+from inspirehep.modules.records import permissions
+from inspirehep.modules.records.permissions import (
+    filter_readable_records,
+    get_hidden_collections,
+    has_read_permission,
+)
+from inspirehep.modules.search.api import collections_visibility_filter
+
+
+@patch('inspirehep.modules.records.permissions.all_restricted_collections', {'HAL Hidden', 'CDS Hidden'})
+@patch('inspirehep.modules.records.permissions.user_collections', {'HAL Hidden'})
+@patch('inspirehep.modules.records.permissions.current_user', MockUser('user@example.com'))
+def test_get_hidden_collections_is_kept_in_the_session():
+    with current_app.test_request_context():
+        assert get_hidden_collections() == {'CDS Hidden'}
+
+        with patch('inspirehep.modules.records.permissions.user_collections', set()):
+            assert get_hidden_collections() == {'CDS Hidden'}
+
+
+@patch('inspirehep.modules.records.permissions.all_restricted_collections', {'HAL Hidden'})
+@patch('inspirehep.modules.records.permissions.current_user', MockUser('admin@inspirehep.net', roles=['superuser']))
+def test_get_hidden_collections_is_empty_for_superusers():
+    with current_app.test_request_context():
+        assert get_hidden_collections() == frozenset()
+
+
+@patch('inspirehep.modules.records.permissions.get_hidden_collections')
+def test_filter_readable_records(mock_get_hidden_collections):
+    mock_get_hidden_collections.return_value = frozenset(['HAL Hidden'])
+    records = [
+        {'control_number': 1, '_collections': ['Literature']},
+        {'control_number': 2, '_collections': ['Literature', 'HAL Hidden']},
+        {'control_number': 3},
+    ]
+
+    expected = [records[0], records[2]]
+    result = filter_readable_records(records)
+
+    assert expected == result
+    mock_get_hidden_collections.assert_called_once_with()
+
+
+@patch('inspirehep.modules.records.permissions.Permission')
+@patch('inspirehep.modules.records.permissions.all_restricted_collections', {'HAL Hidden', 'CDS Hidden'})
+@patch('inspirehep.modules.records.permissions.current_user', MockUser('user@example.com'))
+def test_has_read_permission_checks_the_identity_without_session_collections(mock_permission):
+    mock_permission.return_value.allows.return_value = True
+    record = {'_collections': ['Literature', 'HAL Hidden']}
+
+    with current_app.test_request_context():
+        g.identity = 'token identity'
+
+        assert has_read_permission(permissions.current_user, record)
+
+    assert mock_permission.call_count == 1
+    mock_permission.return_value.allows.assert_called_once_with('token identity')
+
+
+@patch('inspirehep.modules.records.permissions.Permission')
+@patch('inspirehep.modules.records.permissions.all_restricted_collections', {'HAL Hidden'})
+@patch('inspirehep.modules.records.permissions.current_user', MockUser('admin@inspirehep.net', roles=['superuser']))
+def test_has_read_permission_checks_the_identity_of_another_user(mock_permission):
+    mock_permission.return_value.allows.return_value = False
+    user = MockUser('user@example.com', roles=['cataloger'])
+    user.id = 2
+    record = {'_collections': ['Literature', 'HAL Hidden']}
+
+    with current_app.test_request_context():
+        assert not has_read_permission(user, record)
+
+    identity = mock_permission.return_value.allows.call_args[0][0]
+    assert identity.id == 2
+
+
+@patch('inspirehep.modules.search.api.get_hidden_collections')
+def test_collections_visibility_filter_is_a_single_terms_exclusion(mock_get_hidden_collections):
+    mock_get_hidden_collections.return_value = frozenset(['HAL Hidden', 'CDS Hidden'])
+
+    expected = {
+        'bool': {
+            'must_not': [
+                {'terms': {'_collections': ['cds hidden', 'hal hidden']}},
+            ],
+        },
+    }
+    result = collections_visibility_filter().to_dict()
+
+    assert expected == result
+
+
+@patch('inspirehep.modules.search.api.get_hidden_collections')
+def test_collections_visibility_filter_is_none_without_hidden_collections(mock_get_hidden_collections):
+    mock_get_hidden_collections.return_value = frozenset()
+
+    assert collections_visibility_filter() is None
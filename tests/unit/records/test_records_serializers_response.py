@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from flask import current_app
+from mock import Mock, patch
+
+from inspirehep.modules.records.serializers.response import (
+    conditional_on_index_generation,
+    get_search_etag,
+    get_serialization_etag,
+    record_responsify_cached,
+    search_responsify_etag,
+)
+
+
+class MockRecord(dict):
+
+    id = 'e4e2cbbc-a3fb-4ab3-a6d7-2d0e4a7c7f58'
+    revision_id = 3
+
+
+@patch('inspirehep.modules.records.serializers.response.current_cache')
+def test_record_responsify_cached_stores_the_serialization(mock_cache):
+    mock_cache.get.return_value = None
+    serializer = Mock()
+    serializer.serialize.return_value = '@article{...}'
+    view = record_responsify_cached(serializer, 'application/x-bibtex', 'test-bibtex')
+
+    with current_app.test_request_context():
+        response = view(Mock(), MockRecord())
+
+    assert response.status_code == 200
+    assert response.get_data() == b'@article{...}'
+    assert mock_cache.set.call_args[0][0] == (
+        'serialization::e4e2cbbc-a3fb-4ab3-a6d7-2d0e4a7c7f58::3::test-bibtex::1')
+
+
+@patch('inspirehep.modules.records.serializers.response.current_cache')
+def test_record_responsify_cached_uses_the_cached_serialization(mock_cache):
+    mock_cache.get.return_value = '@article{...}'
+    serializer = Mock()
+    view = record_responsify_cached(serializer, 'application/x-bibtex', 'test-bibtex')
+
+    with current_app.test_request_context():
+        response = view(Mock(), MockRecord())
+
+    assert response.get_data() == b'@article{...}'
+    serializer.serialize.assert_not_called()
+
+
+@patch('inspirehep.modules.records.serializers.response.current_cache')
+def test_record_responsify_cached_returns_304_when_the_etag_matches(mock_cache):
+    serializer = Mock()
+    view = record_responsify_cached(serializer, 'application/x-bibtex', 'test-bibtex')
+    etag = get_serialization_etag(MockRecord(), 'test-bibtex')
+
+    headers = {'If-None-Match': '"{}"'.format(etag)}
+    with current_app.test_request_context(headers=headers):
+        response = view(Mock(), MockRecord())
+
+    assert response.status_code == 304
+    mock_cache.get.assert_not_called()
+    serializer.serialize.assert_not_called()
+
+
+@patch('inspirehep.modules.records.serializers.response.current_cache')
+def test_record_responsify_cached_changes_the_etag_of_formats_depending_on_other_records(mock_cache):
+    serializer = Mock()
+    view = record_responsify_cached(
+        serializer, 'application/x-latexeu', 'test-latexeu',
+        depends_on_other_records=True)
+
+    with current_app.test_request_context():
+        mock_cache.get.return_value = u'%5 citations counted in INSPIRE'
+        etag = view(Mock(), MockRecord()).get_etag()[0]
+
+    headers = {'If-None-Match': '"{}"'.format(etag)}
+    with current_app.test_request_context(headers=headers):
+        assert view(Mock(), MockRecord()).status_code == 304
+
+        mock_cache.get.return_value = u'%6 citations counted in INSPIRE'
+        response = view(Mock(), MockRecord())
+
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+    serializer.serialize.assert_not_called()
+
+
+@patch('inspirehep.modules.records.serializers.response.is_index_generation_refreshed', return_value=True)
+@patch('inspirehep.modules.records.serializers.response.get_index_generation')
+def test_get_search_etag_changes_with_the_index_generation(mock_generation, mock_refreshed):
+    with current_app.test_request_context('/api/literature?q=title foo'):
+        mock_generation.return_value = 1
+        etag = get_search_etag('application/json')
+        mock_generation.return_value = 2
+        new_etag = get_search_etag('application/json')
+
+    assert etag != new_etag
+
+
+@patch('inspirehep.modules.records.serializers.response.is_index_generation_refreshed')
+@patch('inspirehep.modules.records.serializers.response.get_index_generation')
+def test_get_search_etag_changes_once_the_indexes_are_refreshed(mock_generation, mock_refreshed):
+    mock_generation.return_value = 1
+
+    with current_app.test_request_context('/api/literature?q=title foo'):
+        mock_refreshed.return_value = False
+        etag = get_search_etag('application/json')
+        mock_refreshed.return_value = True
+        new_etag = get_search_etag('application/json')
+
+    assert etag != new_etag
+
+
+@patch('inspirehep.modules.records.serializers.response.is_index_generation_refreshed', return_value=True)
+@patch('inspirehep.modules.records.serializers.response.get_index_generation')
+def test_get_search_etag_changes_with_the_query(mock_generation, mock_refreshed):
+    mock_generation.return_value = 1
+
+    with current_app.test_request_context('/api/literature?q=title foo'):
+        etag = get_search_etag('application/json')
+    with current_app.test_request_context('/api/literature?q=title bar'):
+        other_etag = get_search_etag('application/json')
+
+    assert etag != other_etag
+
+
+@patch('inspirehep.modules.records.serializers.response.is_index_generation_refreshed', return_value=True)
+@patch('inspirehep.modules.records.serializers.response.get_index_generation')
+def test_search_responsify_etag_returns_304_when_the_etag_matches(mock_generation, mock_refreshed):
+    mock_generation.return_value = 1
+    serializer = Mock()
+    view = search_responsify_etag(serializer, 'application/json')
+
+    with current_app.test_request_context('/api/literature?q=title foo'):
+        etag = get_search_etag('application/json')
+
+    headers = {'If-None-Match': '"{}"'.format(etag)}
+    with current_app.test_request_context('/api/literature?q=title foo', headers=headers):
+        response = view(Mock(), {})
+
+    assert response.status_code == 304
+    assert response.get_etag()[0] == etag
+    serializer.serialize_search.assert_not_called()
+
+
+@patch('inspirehep.modules.records.serializers.response.is_index_generation_refreshed', return_value=True)
+@patch('inspirehep.modules.records.serializers.response.get_index_generation')
+def test_search_responsify_etag_sets_the_etag(mock_generation, mock_refreshed):
+    mock_generation.return_value = 1
+    serializer = Mock()
+    serializer.serialize_search.return_value = '{}'
+    view = search_responsify_etag(serializer, 'application/json')
+
+    with current_app.test_request_context('/api/literature?q=title foo'):
+        response = view(Mock(), {})
+        expected = get_search_etag('application/json')
+
+    assert response.status_code == 200
+    assert response.get_etag()[0] == expected
+
+
+@patch('inspirehep.modules.records.serializers.response.is_index_generation_refreshed', return_value=True)
+@patch('inspirehep.modules.records.serializers.response.get_index_generation')
+def test_conditional_on_index_generation_does_not_call_the_view_on_304(mock_generation, mock_refreshed):
+    mock_generation.return_value = 1
+    view = Mock()
+    decorated = conditional_on_index_generation(view)
+
+    with current_app.test_request_context('/ajax/citations?recid=1'):
+        etag = get_search_etag('application/json')
+
+    headers = {'If-None-Match': '"{}"'.format(etag)}
+    with current_app.test_request_context('/ajax/citations?recid=1', headers=headers):
+        response = decorated()
+
+    assert response.status_code == 304
+    view.assert_not_called()
@@ -22,10 +22,16 @@
 
 from __future__ import absolute_import, division, print_function
 
+import json
+
 from flask import current_app
-from mock import patch
+from mock import call, patch
 
-from inspirehep.modules.records.tasks import update_links
+from inspirehep.modules.records.tasks import (
+    get_update_refs_job_id,
+    update_links,
+    update_refs,
+)
 
 
 def test_update_links():
@@ -146,3 +152,75 @@ def test_update_links_ignores_non_whitelisted_paths():
                 'record': {'$ref': 'http://localhost:5000/record/1'},
             }
         }
+
+
+@patch('inspirehep.modules.records.tasks.group')
+@patch('inspirehep.modules.records.tasks.update_refs_chunk')
+@patch('inspirehep.modules.records.tasks.get_uuids_to_update')
+@patch('inspirehep.modules.records.tasks._get_redis')
+def test_update_refs_dispatches_the_chunks(mock_get_redis, mock_get_uuids, mock_chunk, mock_group):
+    redis = mock_get_redis.return_value
+    redis.get.return_value = None
+    mock_get_uuids.return_value = ['uuid1', 'uuid2', 'uuid3']
+    job_id = get_update_refs_job_id('old', 'new')
+
+    update_refs('old', 'new', chunk_size=2)
+
+    job_timeout = current_app.config['INSPIRE_REF_UPDATER_JOB_TIMEOUT']
+    chunk_timeout = current_app.config['INSPIRE_REF_UPDATER_CHUNK_TIMEOUT']
+    assert redis.set.call_args_list == [
+        call(
+            'update_refs::{}::chunks'.format(job_id),
+            json.dumps([['uuid1', 'uuid2'], ['uuid3']]),
+            ex=job_timeout,
+        ),
+        call(
+            'update_refs::{}::dispatched::0'.format(job_id),
+            1, nx=True, ex=chunk_timeout,
+        ),
+        call(
+            'update_refs::{}::dispatched::1'.format(job_id),
+            1, nx=True, ex=chunk_timeout,
+        ),
+    ]
+    assert mock_chunk.s.call_args_list == [
+        call(job_id, 0, ['uuid1', 'uuid2'], 'old', 'new'),
+        call(job_id, 1, ['uuid3'], 'old', 'new'),
+    ]
+    mock_group.return_value.apply_async.assert_called_once_with()
+
+
+@patch('inspirehep.modules.records.tasks.group')
+@patch('inspirehep.modules.records.tasks.update_refs_chunk')
+@patch('inspirehep.modules.records.tasks.get_uuids_to_update')
+@patch('inspirehep.modules.records.tasks._get_redis')
+def test_update_refs_resumes_from_the_chunks_not_completed(mock_get_redis, mock_get_uuids, mock_chunk, mock_group):
+    redis = mock_get_redis.return_value
+    redis.get.return_value = json.dumps([['uuid1', 'uuid2'], ['uuid3']])
+    redis.smembers.return_value = {b'0'}
+    job_id = get_update_refs_job_id('old', 'new')
+
+    update_refs('old', 'new', chunk_size=2)
+
+    mock_get_uuids.assert_not_called()
+    assert mock_chunk.s.call_args_list == [
+        call(job_id, 1, ['uuid3'], 'old', 'new'),
+    ]
+
+
+@patch('inspirehep.modules.records.tasks.group')
+@patch('inspirehep.modules.records.tasks.update_refs_chunk')
+@patch('inspirehep.modules.records.tasks.get_uuids_to_update')
+@patch('inspirehep.modules.records.tasks._get_redis')
+def test_update_refs_does_not_dispatch_the_chunks_in_flight(mock_get_redis, mock_get_uuids, mock_chunk, mock_group):
+    redis = mock_get_redis.return_value
+    redis.get.return_value = json.dumps([['uuid1', 'uuid2'], ['uuid3']])
+    redis.smembers.return_value = set()
+    redis.set.side_effect = [None, True]
+    job_id = get_update_refs_job_id('old', 'new')
+
+    update_refs('old', 'new', chunk_size=2)
+
+    assert mock_chunk.s.call_args_list == [
+        call(job_id, 1, ['uuid3'], 'old', 'new'),
+    ]
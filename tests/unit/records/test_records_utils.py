@@ -22,7 +22,14 @@
 
 from __future__ import absolute_import, division, print_function
 
-from inspirehep.modules.records.utils import get_endpoint_from_record
+from mock import patch
+
+from inspirehep.modules.records.utils import (
+    bump_index_generation,
+    get_endpoint_from_record,
+    get_index_generation,
+    is_index_generation_refreshed,
+)
 
 
 def test_get_endpoint_from_record():
@@ -43,3 +50,48 @@ def test_get_endpoint_from_record_supports_relative_urls():
     result = get_endpoint_from_record(record)
 
     assert expected == result
+
+
+@patch('inspirehep.modules.records.utils.current_cache')
+def test_get_index_generation(mock_cache):
+    mock_cache.get.return_value = '42'
+
+    assert get_index_generation() == 42
+    mock_cache.add.assert_not_called()
+
+
+@patch('inspirehep.modules.records.utils.time.time', return_value=1500000000)
+@patch('inspirehep.modules.records.utils.current_cache')
+def test_get_index_generation_seeds_a_missing_counter_from_the_time(mock_cache, mock_time):
+    mock_cache.get.side_effect = [None, 1500000000000]
+
+    assert get_index_generation() == 1500000000000
+    mock_cache.add.assert_called_once_with(
+        'records_index_generation', 1500000000000)
+
+
+@patch('inspirehep.modules.records.utils.time.time', return_value=1500000000)
+@patch('inspirehep.modules.records.utils.current_cache')
+def test_bump_index_generation(mock_cache, mock_time):
+    bump_index_generation()
+
+    mock_cache.add.assert_called_once_with(
+        'records_index_generation', 1500000000000)
+    mock_cache.inc.assert_called_once_with('records_index_generation')
+    mock_cache.set.assert_called_once_with(
+        'records_index_generation_refreshing', True, timeout=1)
+
+
+@patch('inspirehep.modules.records.utils.current_cache')
+def test_is_index_generation_refreshed(mock_cache):
+    mock_cache.get.return_value = None
+
+    assert is_index_generation_refreshed()
+    mock_cache.get.assert_called_once_with('records_index_generation_refreshing')
+
+
+@patch('inspirehep.modules.records.utils.current_cache')
+def test_is_index_generation_refreshed_after_a_bump(mock_cache):
+    mock_cache.get.return_value = True
+
+    assert not is_index_generation_refreshed()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+from flask import current_app
+from mock import patch
+
+from inspirehep.modules.refextract.tasks import submit_refextract_job
+
+
+@patch('inspirehep.modules.refextract.tasks.extract_references_job')
+@patch('inspirehep.modules.refextract.tasks.current_cache')
+def test_submit_refextract_job_keeps_a_pending_job_for_a_short_time(mock_cache, mock_job):
+    mock_cache.get.return_value = None
+    config = {
+        'REFEXTRACT_JOB_CACHE_TIMEOUT': 86400,
+        'REFEXTRACT_PENDING_JOB_CACHE_TIMEOUT': 600,
+    }
+
+    with patch.dict(current_app.config, config):
+        job_id, job = submit_refextract_job('text', 'Phys. Rev. D 94 (2016) 054021')
+
+    assert job == {'status': 'pending'}
+
+    mock_cache.set.assert_called_once_with(
+        'refextract_job::{}'.format(job_id),
+        {'status': 'pending'},
+        timeout=600,
+    )
+    mock_job.delay.assert_called_once_with(
+        job_id, 'text', 'Phys. Rev. D 94 (2016) 054021')
+
+
+@patch('inspirehep.modules.refextract.tasks.extract_references_job')
+@patch('inspirehep.modules.refextract.tasks.current_cache')
+def test_submit_refextract_job_reuses_a_pending_job(mock_cache, mock_job):
+    mock_cache.get.return_value = {'status': 'pending'}
+
+    submit_refextract_job('text', 'Phys. Rev. D 94 (2016) 054021')
+
+    mock_cache.set.assert_not_called()
+    mock_job.delay.assert_not_called()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import time
+
+from flask import current_app
+from mock import patch
+
+from inspirehep.modules.search.suggest import (
+    LRUCache,
+    _get_local_cache,
+    get_suggestions,
+    normalize_prefix,
+    query_suggestions,
+)
+
+
+def test_lru_cache_evicts_the_least_recently_used_entry():
+    cache = LRUCache(2, 60)
+    cache.set('foo', 1)
+    cache.set('bar', 2)
+    cache.get('foo')
+    cache.set('baz', 3)
+
+    assert cache.get('foo') == 1
+    assert cache.get('bar') is None
+    assert cache.get('baz') == 3
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(2, 60)
+    cache.set('foo', 1)
+
+    with patch('inspirehep.modules.search.suggest.time.time', return_value=time.time() + 61):
+        assert cache.get('foo') is None
+
+
+def test_normalize_prefix():
+    assert normalize_prefix('  Ellis ') == 'ellis'
+    assert normalize_prefix(None) == ''
+
+
+@patch('inspirehep.modules.search.suggest.query_suggestions')
+def test_get_suggestions_ignores_short_prefixes(mock_query_suggestions):
+    config = {'SEARCH_SUGGEST_MIN_PREFIX_LENGTH': 3}
+
+    with patch.dict(current_app.config, config):
+        assert get_suggestions('title_suggest', 'el') == []
+
+    mock_query_suggestions.assert_not_called()
+
+
+@patch('inspirehep.modules.search.suggest.Lock')
+@patch('inspirehep.modules.search.suggest.current_cache')
+@patch('inspirehep.modules.search.suggest.query_suggestions')
+def test_get_suggestions_caches_the_suggestions_of_a_prefix(mock_query_suggestions, mock_cache, mock_lock):
+    _get_local_cache().clear()
+    mock_cache.get.return_value = None
+    mock_lock.return_value.acquire.return_value = True
+    mock_query_suggestions.return_value = [{'value': 'Ellis'}]
+
+    assert get_suggestions('title_suggest', 'Ellis') == [{'value': 'Ellis'}]
+    assert get_suggestions('title_suggest', 'ellis ') == [{'value': 'Ellis'}]
+
+    mock_query_suggestions.assert_called_once_with('title_suggest', 'ellis')
+    assert mock_cache.set.call_args[0][0] == 'suggest::title_suggest::ellis'
+
+
+@patch('inspirehep.modules.search.suggest.current_cache')
+@patch('inspirehep.modules.search.suggest.query_suggestions')
+def test_get_suggestions_uses_the_shared_cache(mock_query_suggestions, mock_cache):
+    _get_local_cache().clear()
+    mock_cache.get.return_value = [{'value': 'Ellis'}]
+
+    assert get_suggestions('title_suggest', 'ellis') == [{'value': 'Ellis'}]
+
+    mock_query_suggestions.assert_not_called()
+
+
+@patch('inspirehep.modules.search.suggest.Lock')
+@patch('inspirehep.modules.search.suggest.current_cache')
+@patch('inspirehep.modules.search.suggest.query_suggestions')
+def test_get_suggestions_queries_when_the_lock_wait_times_out(mock_query_suggestions, mock_cache, mock_lock):
+    _get_local_cache().clear()
+    mock_cache.get.return_value = None
+    mock_lock.return_value.acquire.return_value = False
+    mock_query_suggestions.return_value = [{'value': 'Ellis'}]
+
+    assert get_suggestions('title_suggest', 'ellis') == [{'value': 'Ellis'}]
+
+    mock_lock.return_value.acquire.assert_called_once_with(timeout=1)
+    mock_lock.return_value.release.assert_not_called()
+
+
+@patch('inspirehep.modules.search.suggest.LiteratureSearch.execute_suggest')
+def test_query_suggestions_groups_authors_by_bai(mock_execute_suggest):
+    mock_execute_suggest.return_value = {
+        'suggestions': [
+            {
+                'options': [
+                    {'text': 'Ellis, J.', 'payload': {'bai': 'J.Ellis.1'}},
+                    {'text': 'Ellis, John', 'payload': {'bai': 'J.Ellis.1'}},
+                    {'text': 'Ellis, Jonathan', 'payload': {'bai': 'J.Ellis.2'}},
+                ],
+            },
+        ],
+    }
+
+    expected = [
+        {'name': 'Ellis, John', 'value': 'J.Ellis.1', 'template': 'author'},
+        {'name': 'Ellis, Jonathan', 'value': 'J.Ellis.2', 'template': 'author'},
+    ]
+    result = query_suggestions('authors.name_suggest', 'ellis')
+
+    assert expected == result
@@ -93,12 +93,18 @@ def jinja_mock_env():
 
 
 @pytest.fixture
-def mock_replace_refs():
-    def get_replace_refs_mock(title, control_numbers):
-        control_numbers_map = {c[0]['$ref']: c[1] for c in control_numbers}
-        return lambda o, s: {'titles': [{'title': title}],
-                             'control_number': control_numbers_map[o['$ref']]}
-    return get_replace_refs_mock
+def mock_execute_prefetched():
+    def get_execute_prefetched_mock(title, control_numbers):
+        hits = []
+        for control_number in control_numbers:
+            hit = Mock(control_number=control_number)
+            hit.to_dict.return_value = {
+                'titles': [{'title': title}],
+                'control_number': control_number,
+            }
+            hits.append(hit)
+        return lambda search, filter_name: hits
+    return get_execute_prefetched_mock
 
 
 @pytest.fixture
@@ -1002,14 +1008,13 @@ def test_publication_info_from_pubinfo_freetext():
     assert expected == result
 
 
-@patch('inspirehep.modules.records.wrappers.replace_refs')
-def test_publication_info_from_conference_recid_and_parent_recid(r_r, mock_replace_refs):
-    conf_rec = {'$ref': 'http://x/y/976391'}
-    parent_rec = {'$ref': 'http://x/y/1402672'}
+@patch('inspirehep.modules.theme.jinja2filters.execute_prefetched')
+def test_publication_info_from_conference_recid_and_parent_recid(e_p, mock_execute_prefetched):
+    conf_rec = {'$ref': 'http://x/api/conferences/976391'}
+    parent_rec = {'$ref': 'http://x/api/literature/1402672'}
     with_title = '2005 International Linear Collider Workshop (LCWS 2005)'
 
-    r_r.side_effect = mock_replace_refs(with_title, [(conf_rec, 976391),
-                                                     (parent_rec, 1402672)])
+    e_p.side_effect = mock_execute_prefetched(with_title, [976391, 1402672])
 
     with_conference_recid_and_parent_recid = LiteratureRecord({
         'publication_info': [
@@ -1030,14 +1035,13 @@ def test_publication_info_from_conference_recid_and_parent_recid(r_r, mock_repla
     assert expected == result
 
 
-@patch('inspirehep.modules.records.wrappers.replace_refs')
-def test_publication_info_from_conference_recid_and_parent_recid_with_pages(r_r, mock_replace_refs):
+@patch('inspirehep.modules.theme.jinja2filters.execute_prefetched')
+def test_publication_info_from_conference_recid_and_parent_recid_with_pages(e_p, mock_execute_prefetched):
     with_title = '50th Rencontres de Moriond on EW Interactions and Unified Theories'
-    conf_rec = {'$ref': 'http://x/y/1331207'}
-    parent_rec = {'$ref': 'http://x/y/1402672'}
+    conf_rec = {'$ref': 'http://x/api/conferences/1331207'}
+    parent_rec = {'$ref': 'http://x/api/literature/1402672'}
 
-    r_r.side_effect = mock_replace_refs(with_title, [(conf_rec, 1331207),
-                                                     (parent_rec, 1402672)])
+    e_p.side_effect = mock_execute_prefetched(with_title, [1331207, 1402672])
 
     with_conference_recid_and_parent_recid_and_pages = LiteratureRecord({
         'publication_info': [
@@ -1061,14 +1065,13 @@ def test_publication_info_from_conference_recid_and_parent_recid_with_pages(r_r,
     assert expected == result
 
 
-@patch('inspirehep.modules.records.wrappers.replace_refs')
-def test_publication_info_with_pub_info_and_conf_info(r_r, mock_replace_refs):
+@patch('inspirehep.modules.theme.jinja2filters.execute_prefetched')
+def test_publication_info_with_pub_info_and_conf_info(e_p, mock_execute_prefetched):
     with_title = '2005 International Linear Collider Workshop (LCWS 2005)'
-    conf_rec = {'$ref': 'http://x/y/976391'}
-    parent_rec = {'$ref': 'http://x/y/706120'}
+    conf_rec = {'$ref': 'http://x/api/conferences/976391'}
+    parent_rec = {'$ref': 'http://x/api/literature/706120'}
 
-    r_r.side_effect = mock_replace_refs(with_title, [(conf_rec, 976391),
-                                                     (parent_rec, 706120)])
+    e_p.side_effect = mock_execute_prefetched(with_title, [976391, 706120])
 
     with_pub_info_and_conf_info = LiteratureRecord({
         'publication_info': [
@@ -1094,12 +1097,12 @@ def test_publication_info_with_pub_info_and_conf_info(r_r, mock_replace_refs):
     assert expected == result
 
 
-@patch('inspirehep.modules.records.wrappers.replace_refs')
-def test_publication_info_with_pub_info_and_conf_info_not_found(r_r):
-    conf_rec = {'$ref': 'http://x/y/976391'}
-    parent_rec = {'$ref': 'http://x/y/706120'}
+@patch('inspirehep.modules.theme.jinja2filters.execute_prefetched')
+def test_publication_info_with_pub_info_and_conf_info_not_found(e_p):
+    conf_rec = {'$ref': 'http://x/api/conferences/976391'}
+    parent_rec = {'$ref': 'http://x/api/literature/706120'}
 
-    r_r.return_value = None
+    e_p.return_value = []
 
     with_pub_info_and_conf_info = LiteratureRecord({
         'publication_info': [
@@ -1122,12 +1125,12 @@ def test_publication_info_with_pub_info_and_conf_info_not_found(r_r):
     assert expected == result
 
 
-@patch('inspirehep.modules.records.wrappers.replace_refs')
-def test_publication_info_from_conference_recid_and_not_parent_recid(r_r, mock_replace_refs):
+@patch('inspirehep.modules.theme.jinja2filters.execute_prefetched')
+def test_publication_info_from_conference_recid_and_not_parent_recid(e_p, mock_execute_prefetched):
     with_title = '20th International Workshop on Deep-Inelastic Scattering and Related Subjects'
-    conf_rec = {'$ref': 'http://x/y/1086512'}
+    conf_rec = {'$ref': 'http://x/api/conferences/1086512'}
 
-    r_r.side_effect = mock_replace_refs(with_title, [(conf_rec, 1086512)])
+    e_p.side_effect = mock_execute_prefetched(with_title, [1086512])
 
     with_conference_recid_without_parent_recid = LiteratureRecord({
         'publication_info': [
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from flask import current_app
+from mock import Mock, patch
+
+from inspirehep.modules.theme.prefetch import (
+    execute_prefetched,
+    prefetch_template_filters,
+)
+from inspirehep.utils.references import get_and_format_references
+
+
+def _mock_search(query):
+    search = Mock()
+    search._index = ['records-hep']
+    search.to_dict.return_value = {'query': query}
+    return search
+
+
+def _mock_hit(control_number, title):
+    hit = Mock(control_number=control_number)
+    hit.to_dict.return_value = {
+        'control_number': control_number,
+        'titles': [{'title': title}],
+    }
+    return hit
+
+
+@patch('inspirehep.modules.theme.prefetch.MultiSearch')
+@patch.dict('inspirehep.modules.theme.prefetch.FILTER_SEARCHES', {
+    'test_filter': lambda record: _mock_search(record['cnum']),
+})
+def test_prefetch_template_filters_runs_one_multi_search(mock_multi_search):
+    multi_search = mock_multi_search.return_value
+    multi_search.add.return_value = multi_search
+    multi_search.execute.return_value = ['response1', 'response2']
+
+    with current_app.test_request_context():
+        prefetch_template_filters([{'cnum': 'C1'}, {'cnum': 'C2'}], ['test_filter'])
+
+        search = _mock_search('C1')
+        response = execute_prefetched(search, 'test_filter')
+
+    assert response in ('response1', 'response2')
+    assert multi_search.add.call_count == 2
+    multi_search.execute.assert_called_once_with(raise_on_error=False)
+    search.execute.assert_not_called()
+
+
+@patch('inspirehep.modules.theme.prefetch.logger')
+def test_execute_prefetched_warns_about_live_searches(mock_logger):
+    search = _mock_search('C1')
+    search.execute.return_value = 'response'
+
+    with current_app.test_request_context():
+        assert execute_prefetched(search, 'test_filter') == 'response'
+        assert execute_prefetched(search, 'test_filter') == 'response'
+
+    search.execute.assert_called_once_with()
+    mock_logger.warning.assert_called_once()
+
+
+@patch('inspirehep.modules.theme.prefetch.logger')
+@patch('inspirehep.modules.theme.prefetch.MultiSearch')
+@patch('inspirehep.utils.references.filter_readable_records', side_effect=lambda records: records)
+@patch('inspirehep.utils.references.get_es_records')
+def test_references_run_one_multi_search(mock_get_es_records, mock_filter_readable_records, mock_multi_search, mock_logger):
+    mock_get_es_records.return_value = [
+        {
+            'control_number': 1,
+            'titles': [{'title': 'First reference'}],
+            'publication_info': [
+                {
+                    'conference_record': {'$ref': 'http://localhost:5000/api/conferences/976391'},
+                    'parent_record': {'$ref': 'http://localhost:5000/api/literature/706120'},
+                },
+            ],
+        },
+        {
+            'control_number': 2,
+            'titles': [{'title': 'Second reference'}],
+            'publication_info': [
+                {
+                    'conference_record': {'$ref': 'http://localhost:5000/api/conferences/1086512'},
+                },
+            ],
+        },
+    ]
+
+    hits = [
+        _mock_hit(976391, 'LCWS 2005'),
+        _mock_hit(706120, 'Proceedings, LCWS 2005'),
+        _mock_hit(1086512, 'DIS 2012'),
+    ]
+    multi_search = mock_multi_search.return_value
+    multi_search.add.return_value = multi_search
+    multi_search.execute.side_effect = lambda raise_on_error: [hits] * multi_search.add.call_count
+
+    record = {
+        'control_number': 100,
+        'references': [
+            {'recid': 1},
+            {'recid': 2},
+        ],
+    }
+
+    with current_app.test_request_context():
+        references = get_and_format_references(record)
+
+    assert 'LCWS 2005' in references[0][0]
+    assert 'DIS 2012' in references[1][0]
+    assert multi_search.add.call_count == 3
+    multi_search.execute.assert_called_once_with(raise_on_error=False)
+    mock_logger.warning.assert_not_called()
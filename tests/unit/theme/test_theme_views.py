@@ -28,6 +28,8 @@ import mock
 
 from mocks import MockUser
 
+from inspirehep.modules.theme.views import get_institution_people_datatables_rows
+
 
 user_with_email = MockUser('user@example.com')
 user_empty_email = MockUser('')
@@ -120,3 +122,44 @@ def test_page_not_Found_returns_json_when_in_api(api_client):
     result = json.loads(response.data)
 
     assert expected == result
+
+
+@mock.patch('inspirehep.modules.theme.views.get_author_names')
+@mock.patch('inspirehep.modules.theme.views.get_institution_authors')
+def test_get_institution_people_datatables_rows_paginates(mock_authors, mock_names):
+    class MockName(object):
+        def __init__(self, value, preferred_name=None):
+            self.value = value
+            self.preferred_name = preferred_name
+
+    mock_authors.return_value = [(1, 30), (2, 20), (3, 10)]
+    mock_names.return_value = {
+        2: MockName('Ellis, John R.', 'John Ellis'),
+        3: MockName('Higgs, Peter'),
+    }
+
+    expected = [
+        [u"<a href='/authors/2'>John Ellis</a>", 20],
+        [u"<a href='/authors/3'>Higgs, Peter</a>", 10],
+    ]
+    result = get_institution_people_datatables_rows('902725', start=1, length=2)
+
+    assert expected == result
+    mock_names.assert_called_once_with([2, 3])
+
+
+@mock.patch('inspirehep.modules.records.serializers.response.get_index_generation', return_value=1)
+@mock.patch('inspirehep.modules.theme.views.get_institution_people_datatables_rows')
+@mock.patch('inspirehep.modules.theme.views.get_institution_authors')
+def test_ajax_institutions_people_returns_the_total(mock_authors, mock_rows, mock_generation, app_client):
+    mock_authors.return_value = [(1, 30), (2, 20), (3, 10)]
+    mock_rows.return_value = []
+
+    response = app_client.get(
+        '/ajax/institutions/people?recid=902725&draw=2&start=0&length=10')
+
+    result = json.loads(response.data)
+
+    assert result['draw'] == 2
+    assert result['recordsTotal'] == 3
+    mock_rows.assert_called_once_with('902725', 0, 10)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import time
+
+import mock
+from elasticsearch_dsl.query import Q
+from flask import current_app
+
+from inspirehep.modules.theme.widgets import get_literature_count, get_widget
+
+
+@mock.patch('inspirehep.modules.theme.widgets.current_cache')
+@mock.patch.dict('inspirehep.modules.theme.widgets.WIDGETS', {'test_count': lambda: 42})
+def test_get_widget_computes_a_missing_widget(mock_cache):
+    mock_cache.get.return_value = None
+
+    assert get_widget('test_count') == 42
+    assert mock_cache.set.call_args[0][0] == 'theme_widget::test_count'
+    assert mock_cache.set.call_args[0][1]['value'] == 42
+
+
+@mock.patch('inspirehep.modules.theme.widgets._schedule_refresh')
+@mock.patch('inspirehep.modules.theme.widgets.current_cache')
+@mock.patch.dict('inspirehep.modules.theme.widgets.WIDGETS', {'test_count': mock.Mock()})
+def test_get_widget_serves_a_fresh_widget_from_the_cache(mock_cache, mock_schedule_refresh):
+    mock_cache.get.return_value = {'value': 41, 'refreshed': time.time()}
+
+    assert get_widget('test_count') == 41
+    mock_schedule_refresh.assert_not_called()
+
+
+@mock.patch('inspirehep.modules.theme.tasks.refresh_landing_page_widget.delay')
+@mock.patch('inspirehep.modules.theme.widgets.current_cache')
+@mock.patch.dict('inspirehep.modules.theme.widgets.WIDGETS', {'test_count': mock.Mock()})
+def test_get_widget_serves_a_stale_widget_and_refreshes_it(mock_cache, mock_delay):
+    ttl = current_app.config['THEME_WIDGETS_TTL']
+    mock_cache.get.return_value = {'value': 41, 'refreshed': time.time() - ttl - 1}
+    mock_cache.add.return_value = True
+
+    assert get_widget('test_count') == 41
+    mock_delay.assert_called_once_with('test_count')
+
+
+@mock.patch('inspirehep.modules.theme.tasks.refresh_landing_page_widget.delay')
+@mock.patch('inspirehep.modules.theme.widgets.current_cache')
+@mock.patch.dict('inspirehep.modules.theme.widgets.WIDGETS', {'test_count': mock.Mock()})
+def test_get_widget_does_not_refresh_a_stale_widget_twice(mock_cache, mock_delay):
+    ttl = current_app.config['THEME_WIDGETS_TTL']
+    mock_cache.get.return_value = {'value': 41, 'refreshed': time.time() - ttl - 1}
+    mock_cache.add.return_value = False
+
+    assert get_widget('test_count') == 41
+    mock_delay.assert_not_called()
+
+
+@mock.patch('inspirehep.modules.theme.widgets.PublicLiteratureSearch')
+@mock.patch('inspirehep.modules.theme.widgets.all_restricted_collections', {'HAL Hidden', 'CDS Hidden'})
+def test_get_literature_count_excludes_all_the_restricted_collections(mock_search):
+    mock_search.return_value.query.return_value.count.return_value = 42
+
+    assert get_literature_count() == 42
+
+    expected = Q('match', _collections='Literature') & ~Q(
+        'terms', _collections=['cds hidden', 'hal hidden'])
+    mock_search.return_value.query.assert_called_once_with(expected)
@@ -27,7 +27,10 @@ import requests_mock
 from flask import current_app
 from mock import patch
 
-from inspirehep.utils.robotupload import make_robotupload_marcxml
+from inspirehep.utils.robotupload import (
+    make_robotupload_marcxml,
+    make_robotupload_marcxml_collection,
+)
 
 
 def test_make_robotupload_marcxml():
@@ -95,3 +98,19 @@ def test_make_robotupload_marcxml_handles_non_unicode():
         ).encode('utf-8')  # record/1503367
 
         make_robotupload_marcxml('http://localhost:5000', snippet, 'insert')
+
+
+def test_make_robotupload_marcxml_collection():
+    expected = (
+        u'<?xml version="1.0" encoding="UTF-8" ?>\n'
+        u'<collection xmlns="http://www.loc.gov/MARC21/slim">\n'
+        u'<record><controlfield tag="001">1</controlfield></record>\n'
+        u'<record><controlfield tag="001">2</controlfield></record>\n'
+        u'</collection>\n'
+    )
+    result = make_robotupload_marcxml_collection([
+        u'<record><controlfield tag="001">1</controlfield></record>',
+        b'<record><controlfield tag="001">2</controlfield></record>',
+    ])
+
+    assert expected == result
@@ -22,7 +22,18 @@
 
 from __future__ import absolute_import, division, print_function
 
-from inspirehep.utils.tickets import _strip_lines
+from mock import Mock, patch
+from rt import AuthorizationError
+
+from inspirehep.utils.tickets import (
+    _get_ticket_text,
+    _relogin,
+    _strip_lines,
+    get_queues,
+    get_tickets_by_recid,
+    relogin_if_needed,
+    resolve_ticket,
+)
 
 
 def test__strip_lines():
@@ -34,3 +45,93 @@ def test__strip_lines():
     stripped = _strip_lines(multiline_string)
 
     assert expected == stripped
+
+
+@patch('inspirehep.utils.tickets.rt_instance')
+def test__get_ticket_text_downloads_only_the_plain_text_attachment(mock_rt):
+    mock_rt.get_attachments.return_value = [
+        ('1', '(Unnamed)', 'multipart/mixed', '0b'),
+        ('2', '(Unnamed)', 'text/plain', '1.2k'),
+        ('3', 'paper.pdf', 'application/pdf', '200k'),
+    ]
+    mock_rt.get_attachment.return_value = {'Content': 'Ticket text'}
+
+    assert _get_ticket_text('4328') == 'Ticket text'
+    mock_rt.get_attachment.assert_called_once_with('4328', '2')
+
+
+@patch('inspirehep.utils.tickets.rt_instance')
+def test__get_ticket_text_returns_empty_string_without_plain_text(mock_rt):
+    mock_rt.get_attachments.return_value = [
+        ('3', 'paper.pdf', 'application/pdf', '200k'),
+    ]
+
+    assert _get_ticket_text('4328') == ''
+    mock_rt.get_attachment.assert_not_called()
+
+
+@patch('inspirehep.utils.tickets._get_all_of')
+@patch('inspirehep.utils.tickets.current_cache')
+def test_get_queues_uses_the_cache(mock_cache, mock_get_all_of):
+    mock_cache.get.return_value = [{'id': '1', 'name': 'HEP'}]
+
+    assert get_queues() == [{'id': '1', 'name': 'HEP'}]
+    mock_get_all_of.assert_not_called()
+
+
+@patch('inspirehep.utils.tickets._get_all_of')
+@patch('inspirehep.utils.tickets.current_cache')
+def test_get_queues_refreshes_the_cache(mock_cache, mock_get_all_of):
+    mock_cache.get.return_value = [{'id': '1', 'name': 'HEP'}]
+    mock_get_all_of.return_value = [{'id': '2', 'name': 'CORE'}]
+
+    assert get_queues(refresh=True) == [{'id': '2', 'name': 'CORE'}]
+    mock_cache.set.assert_called_once_with(
+        'rt_queues', [{'id': '2', 'name': 'CORE'}], timeout=3600)
+
+
+@patch('inspirehep.utils.tickets.rt_instance')
+@patch('inspirehep.utils.tickets.current_cache')
+def test_get_tickets_by_recid_fetches_the_tickets_concurrently(mock_cache, mock_rt):
+    mock_cache.get.return_value = None
+    mock_rt.url = 'https://rt.inspirehep.net/REST/1.0/'
+    mock_rt.search.return_value = [
+        {'id': 'ticket/1'},
+        {'id': 'ticket/2'},
+    ]
+    mock_rt.get_attachments.return_value = []
+
+    result = get_tickets_by_recid(1497201)
+
+    assert [ticket['Id'] for ticket in result] == ['1', '2']
+    assert result[0]['Link'] == 'https://rt.inspirehep.net/Ticket/Display.html?id=1'
+    mock_cache.set.assert_called_once_with(
+        'rt_tickets::1497201', result, timeout=300)
+
+
+@patch('inspirehep.utils.tickets.rt_instance')
+@patch('inspirehep.utils.tickets.current_cache')
+def test_resolve_ticket_invalidates_the_tickets_of_the_record(mock_cache, mock_rt):
+    resolve_ticket('4328', recid=1497201)
+
+    mock_cache.delete.assert_called_once_with('rt_tickets::1497201')
+
+
+@patch('inspirehep.utils.tickets.rt_instance')
+def test_relogin_if_needed_logs_in_and_replays_the_call(mock_rt):
+    rt = mock_rt._get_current_object.return_value
+    rt.login_count = 0
+    call_rt = Mock(side_effect=[AuthorizationError('expired'), 'ticket'])
+
+    assert relogin_if_needed(call_rt)() == 'ticket'
+    rt.login.assert_called_once_with()
+    assert rt.login_count == 1
+
+
+def test_relogin_logs_in_once_for_the_calls_failed_with_the_same_session():
+    rt = Mock(login_count=0)
+
+    _relogin(rt, 0)
+    _relogin(rt, 0)
+
+    rt.login.assert_called_once_with()
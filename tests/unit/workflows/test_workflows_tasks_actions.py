@@ -46,6 +46,7 @@ from inspirehep.modules.workflows.tasks.actions import (
     prepare_update_payload,
     reject_record,
     refextract,
+    save_workflow,
     shall_halt_workflow,
     submission_fulltext_download,
 )
@@ -270,6 +271,27 @@ def test_reject_record(l_w_a):
     )
 
 
+@patch('inspirehep.modules.workflows.tasks.actions.db')
+def test_save_workflow_commits(mock_db):
+    obj = MockObj({}, {})
+    eng = MockEng()
+
+    assert save_workflow(obj, eng) is None
+    mock_db.session.commit.assert_called_once_with()
+
+
+@patch('inspirehep.modules.workflows.tasks.actions.db')
+def test_save_workflow_commits_when_indexing_is_deferred(mock_db):
+    config = {'WORKFLOWS_DEFER_HOLDINGPEN_INDEXING': True}
+
+    with patch.dict(current_app.config, config):
+        obj = MockObj({}, {})
+        eng = MockEng()
+
+        assert save_workflow(obj, eng) is None
+        mock_db.session.commit.assert_called_once_with()
+
+
 @pytest.mark.parametrize(
     'expected,obj',
     [
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import requests
+from flask import current_app
+from mock import patch
+
+from inspirehep.modules.workflows.tasks.batch import (
+    _get_duplicated_ids,
+    clear_batch_results,
+    get_batch_predictions,
+    prepare_articles_batch,
+)
+
+from mocks import MockObj
+
+
+@patch('inspirehep.modules.workflows.tasks.batch.json_api_request')
+def test_get_batch_predictions(j_a_r):
+    def _fake_api_request(url, payload):
+        if url.endswith('/predictor/coreness'):
+            return {'decision': 'CORE', 'scores': [1, 0, -1]}
+        if payload['corpus'] == 'keywords':
+            raise requests.exceptions.RequestException()
+        return {'labels': [[payload['corpus'], 0.5]]}
+
+    j_a_r.side_effect = _fake_api_request
+
+    config = {
+        'BEARD_API_URL': 'https://beard.inspirehep.net',
+        'MAGPIE_API_URL': 'https://magpie.inspirehep.net',
+    }
+
+    objs = [
+        MockObj({'titles': [{'title': 'Foo'}]}, {}, id=1),
+        MockObj({'inspire_categories': [{'term': 'Experiment-HEP'}]}, {}, id=2),
+    ]
+
+    with patch.dict(current_app.config, config):
+        result = get_batch_predictions(objs)
+
+    assert result == [
+        {
+            'beard_coreness': {'decision': 'CORE', 'scores': [1, 0, -1]},
+            'magpie_categories': {'labels': [['categories', 0.5]]},
+        },
+        {
+            'beard_coreness': {'decision': 'CORE', 'scores': [1, 0, -1]},
+            'magpie_categories': {'labels': [['categories', 0.5]]},
+            'magpie_experiments': {'labels': [['experiments', 0.5]]},
+        },
+    ]
+
+
+@patch('inspirehep.modules.workflows.tasks.batch.json_api_request')
+def test_get_batch_predictions_without_services(j_a_r):
+    config = {
+        'BEARD_API_URL': '',
+        'MAGPIE_API_URL': '',
+    }
+
+    objs = [MockObj({}, {})]
+
+    with patch.dict(current_app.config, config):
+        assert get_batch_predictions(objs) == [{}]
+
+    assert not j_a_r.called
+
+
+def test_get_duplicated_ids():
+    objs = [
+        MockObj({'arxiv_eprints': [{'value': '1705.01122'}]}, {}, id=1),
+        MockObj({
+            'arxiv_eprints': [{'value': '1705.01122'}],
+            'dois': [{'value': '10.3847/2041-8213/aa9110'}],
+        }, {}, id=2),
+        MockObj({'dois': [{'value': '10.1103/PhysRevD.96.095036'}]}, {}, id=3),
+    ]
+
+    assert _get_duplicated_ids(objs) == {'1705.01122'}
+
+
+@patch('inspirehep.modules.workflows.tasks.batch.match_many')
+@patch('inspirehep.modules.workflows.tasks.batch.search_holdingpen_matches')
+@patch('inspirehep.modules.workflows.tasks.batch.is_too_old', return_value=False)
+@patch('inspirehep.modules.workflows.tasks.batch.is_being_harvested_on_legacy', return_value=True)
+def test_prepare_articles_batch_skips_articles_stopped_before_matching(i_b_h_o_l, i_t_o, s_h_m, m_m):
+    objs = [MockObj({'arxiv_eprints': [{'value': '1705.01122'}]}, {}, id=1)]
+
+    prepare_articles_batch(objs)
+
+    assert not s_h_m.called
+    assert not m_m.called
+    assert '_batch_results' not in objs[0].extra_data
+
+
+def test_clear_batch_results():
+    obj = MockObj({}, {'_batch_results': {'magpie_experiments': {}}})
+
+    clear_batch_results(obj, None)
+
+    assert '_batch_results' not in obj.extra_data
@@ -195,3 +195,26 @@ def test_guess_coreness_when_rejected(j_a_r, g_b_u):
         },
         'relevance_score': -11.375354035683761,
     }
+
+
+@patch('inspirehep.modules.workflows.tasks.beard.get_beard_url')
+@patch('inspirehep.modules.workflows.tasks.beard.json_api_request')
+def test_guess_coreness_uses_the_batch_result(j_a_r, g_b_u):
+    g_b_u.return_value = 'https://beard.inspirehep.net/predictor/coreness'
+
+    extra_data = {
+        '_batch_results': {
+            'beard_coreness': {
+                'decision': 'Non-CORE',
+                'scores': [-0.5, 0.5, -1.5],
+            },
+        },
+    }
+
+    obj = MockObj({}, extra_data)
+    eng = MockEng()
+
+    assert guess_coreness(obj, eng) is None
+    assert obj.extra_data['relevance_prediction']['decision'] == 'Non-CORE'
+    assert '_batch_results' not in obj.extra_data
+    assert not j_a_r.called
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from flask import current_app
+from mock import patch
+
+from inspirehep.modules.workflows.tasks.callbacks import (
+    continue_workflows_from_callback,
+    get_base_url,
+)
+
+
+def test_get_base_url():
+    config = {'LEGACY_ROBOTUPLOAD_URL': 'https://inspirehep.net'}
+
+    with patch.dict(current_app.config, config):
+        assert get_base_url() == 'https://inspirehep.net'
+
+
+def test_get_base_url_adds_the_scheme():
+    config = {'LEGACY_ROBOTUPLOAD_URL': 'inspirehep.net'}
+
+    with patch.dict(current_app.config, config):
+        assert get_base_url() == 'http://inspirehep.net'
+
+
+@patch('inspirehep.modules.workflows.tasks.callbacks._continue_workflows_batch')
+def test_continue_workflows_from_callback_splits_in_batches(c_w_b):
+    callbacks = [{'workflow_id': i, 'recid': 1000 + i} for i in range(5)]
+
+    continue_workflows_from_callback(callbacks, batch_size=2)
+
+    assert [call[0][0] for call in c_w_b.call_args_list] == [
+        callbacks[0:2],
+        callbacks[2:4],
+        callbacks[4:5],
+    ]
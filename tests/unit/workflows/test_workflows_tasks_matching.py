@@ -28,7 +28,10 @@ from inspire_schemas.api import load_schema, validate
 from inspirehep.modules.workflows.tasks.matching import (
     already_harvested,
     article_exists,
+    has_same_source,
     is_being_harvested_on_legacy,
+    match_wfs_in_holdingpen,
+    search_holdingpen_matches,
     _pending_in_holding_pen,
 )
 
@@ -252,3 +255,129 @@ def test_pending_in_holding_pen_returns_false_if_nothing_matched(mock_match):
     eng = MockEng()
 
     assert not _pending_in_holding_pen(obj, eng)
+
+
+@patch('inspirehep.modules.workflows.tasks.matching.es.msearch')
+def test_match_wfs_in_holdingpen_splits_the_matches(mock_msearch):
+    mock_msearch.return_value = {
+        'responses': [
+            {
+                'hits': {
+                    'hits': [
+                        {'_id': 1, '_source': {'_workflow': {'status': 'HALTED'}}},
+                        {
+                            '_id': 2,
+                            '_source': {
+                                '_extra_data': {'approved': False},
+                                '_workflow': {'status': 'COMPLETED'},
+                            },
+                        },
+                        {'_id': 4, '_source': {'_workflow': {'status': 'HALTED'}}},
+                    ],
+                },
+            },
+            {
+                'hits': {
+                    'hits': [
+                        {'_id': 1, '_source': {'_workflow': {'status': 'HALTED'}}},
+                        {
+                            '_id': 3,
+                            '_source': {
+                                '_extra_data': {'approved': True},
+                                '_workflow': {'status': 'COMPLETED'},
+                            },
+                        },
+                    ],
+                },
+            },
+        ],
+    }
+
+    data = {
+        'arxiv_eprints': [{'value': '1705.01122'}],
+        'dois': [{'value': '10.3847/2041-8213/aa9110'}],
+    }
+    extra_data = {}
+
+    obj = MockObj(data, extra_data, id=4)
+    eng = MockEng()
+
+    assert match_wfs_in_holdingpen(obj, eng) is None
+    assert mock_msearch.call_count == 1
+
+    assert obj.extra_data['holdingpen_matches'] == [1]
+    assert obj.extra_data['previously_rejected_matches'] == [2]
+
+
+@patch('inspirehep.modules.workflows.tasks.matching.es.msearch')
+def test_match_wfs_in_holdingpen_uses_the_batch_result(mock_msearch):
+    extra_data = {
+        '_batch_results': {
+            'holdingpen_matches': {
+                'holdingpen_matches': [1],
+                'previously_rejected_matches': [2],
+            },
+        },
+    }
+
+    obj = MockObj({}, extra_data, id=4)
+    eng = MockEng()
+
+    assert match_wfs_in_holdingpen(obj, eng) is None
+    assert not mock_msearch.called
+
+    assert obj.extra_data == {
+        'holdingpen_matches': [1],
+        'previously_rejected_matches': [2],
+    }
+
+
+@patch('inspirehep.modules.workflows.tasks.matching.es.msearch')
+def test_search_holdingpen_matches_skips_msearch_without_queries(mock_msearch):
+    obj = MockObj({}, {})
+
+    assert search_holdingpen_matches([obj]) == [[]]
+    assert not mock_msearch.called
+
+
+@patch('inspirehep.modules.workflows.tasks.matching.es.mget')
+def test_has_same_source_reads_the_sources_with_one_mget(mock_mget):
+    mock_mget.return_value = {
+        'docs': [
+            {
+                '_id': '1',
+                '_source': {
+                    'metadata': {'acquisition_source': {'source': 'Other'}},
+                },
+                'found': True,
+            },
+            {
+                '_id': '2',
+                '_source': {
+                    'metadata': {'acquisition_source': {'source': 'ARXIV'}},
+                },
+                'found': True,
+            },
+        ],
+    }
+
+    data = {'acquisition_source': {'source': 'arXiv'}}
+    extra_data = {'holdingpen_matches': [1, 2]}
+
+    obj = MockObj(data, extra_data)
+    eng = MockEng()
+
+    assert has_same_source('holdingpen_matches')(obj, eng)
+    assert mock_mget.call_count == 1
+
+
+@patch('inspirehep.modules.workflows.tasks.matching.es.mget')
+def test_has_same_source_returns_false_without_matches(mock_mget):
+    data = {'acquisition_source': {'source': 'arXiv'}}
+    extra_data = {}
+
+    obj = MockObj(data, extra_data)
+    eng = MockEng()
+
+    assert not has_same_source('holdingpen_matches')(obj, eng)
+    assert not mock_mget.called
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from mock import patch
+
+from inspirehep.modules.workflows.tasks.outbox import _send_workflow_operations
+
+
+@patch('inspirehep.modules.workflows.tasks.outbox.tickets')
+def test_send_workflow_operations_uses_the_created_ticket_id(mock_tickets):
+    mock_tickets.create_ticket.return_value = 42
+    operations = [
+        (1, 'create', {
+            'queue': 'HEP_add_user',
+            'requestors': 'user@example.com',
+            'subject': 'Your suggestion to INSPIRE',
+            'body': 'Thank you',
+            'recid': None,
+            'ticket_id_key': 'ticket_id',
+        }),
+        (2, 'reply', {
+            'ticket_id': '',
+            'ticket_id_key': 'ticket_id',
+            'body': 'Accepted',
+            'keep_new': False,
+        }),
+        (3, 'close', {
+            'ticket_id': '',
+            'ticket_id_key': 'ticket_id',
+            'recid': 1,
+        }),
+    ]
+
+    expected = [(1, 42, None), (2, 42, None), (3, 42, None)]
+    result = _send_workflow_operations(operations, {})
+
+    assert expected == result
+    mock_tickets.reply_ticket.assert_called_once_with(42, 'Accepted', False)
+    mock_tickets.resolve_ticket.assert_called_once_with(42, recid=1)
+
+
+@patch('inspirehep.modules.workflows.tasks.outbox.tickets')
+def test_send_workflow_operations_stops_at_the_first_failure(mock_tickets):
+    mock_tickets.create_ticket.return_value = -1
+    operations = [
+        (1, 'create', {
+            'queue': 'HEP_add_user',
+            'requestors': 'user@example.com',
+            'subject': 'Your suggestion to INSPIRE',
+            'body': 'Thank you',
+            'recid': None,
+            'ticket_id_key': 'ticket_id',
+        }),
+        (2, 'close', {
+            'ticket_id': '',
+            'ticket_id_key': 'ticket_id',
+            'recid': 1,
+        }),
+    ]
+
+    expected = [(1, None, 'RT failed to create the ticket.')]
+    result = _send_workflow_operations(operations, {})
+
+    assert expected == result
+    mock_tickets.resolve_ticket.assert_not_called()
+
+
+@patch('inspirehep.modules.workflows.tasks.outbox.tickets')
+def test_send_workflow_operations_uses_the_known_ticket_ids(mock_tickets):
+    operations = [
+        (3, 'close', {
+            'ticket_id': '',
+            'ticket_id_key': 'ticket_id',
+            'recid': 1,
+        }),
+    ]
+
+    expected = [(3, 42, None)]
+    result = _send_workflow_operations(operations, {'ticket_id': 42})
+
+    assert expected == result
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+import json
+
+from flask import current_app
+from mock import patch
+
+from inspirehep.modules.workflows.tasks.robotupload import (
+    ROBOTUPLOAD_NONCE_KEY,
+    expire_robotupload_batch,
+    is_robotupload_batch_nonce,
+    ship_robotupload_batch,
+)
+
+
+def _queued(workflow_id, recid):
+    return json.dumps({
+        'workflow_id': workflow_id,
+        'recid': recid,
+        'marcxml': '<record/>',
+        'params': [None, 'insert', 'https://labs.inspirehep.net/callback'],
+    })
+
+
+@patch('inspirehep.modules.workflows.tasks.robotupload.Lock')
+@patch('inspirehep.modules.workflows.tasks.robotupload._put_workflows_in_error_state')
+@patch('inspirehep.modules.workflows.tasks.robotupload._ship_robotupload')
+@patch('inspirehep.modules.workflows.tasks.robotupload._get_redis')
+def test_ship_robotupload_batch_trims_the_queue_after_shipping(mock_redis, mock_ship, mock_error, mock_lock):
+    r = mock_redis.return_value
+    r.lrange.side_effect = [[_queued(1, 1001), _queued(2, 1002)], []]
+
+    with patch.dict(current_app.config, {'WORKFLOWS_ROBOTUPLOAD_BATCH_SIZE': 2}):
+        ship_robotupload_batch('queue')
+
+    assert mock_ship.call_count == 1
+    r.ltrim.assert_called_once_with('queue', 2, -1)
+    mock_error.assert_not_called()
+
+
+@patch('inspirehep.modules.workflows.tasks.robotupload.Lock')
+@patch('inspirehep.modules.workflows.tasks.robotupload._put_workflows_in_error_state')
+@patch('inspirehep.modules.workflows.tasks.robotupload._ship_robotupload')
+@patch('inspirehep.modules.workflows.tasks.robotupload._get_redis')
+def test_ship_robotupload_batch_puts_the_workflows_in_error_state_when_shipping_fails(mock_redis, mock_ship, mock_error, mock_lock):
+    r = mock_redis.return_value
+    r.lrange.side_effect = [[_queued(1, 1001), _queued(2, 1002)], []]
+    mock_ship.side_effect = IOError('Connection refused')
+
+    with patch.dict(current_app.config, {'WORKFLOWS_ROBOTUPLOAD_BATCH_SIZE': 2}):
+        ship_robotupload_batch('queue')
+
+    workflow_ids, error_message = mock_error.call_args[0]
+    assert workflow_ids == [1, 2]
+    assert 'Connection refused' in error_message
+    r.ltrim.assert_called_once_with('queue', 2, -1)
+
+
+@patch('inspirehep.modules.workflows.tasks.robotupload.Lock')
+@patch('inspirehep.modules.workflows.tasks.robotupload._ship_robotupload')
+@patch('inspirehep.modules.workflows.tasks.robotupload._get_redis')
+def test_ship_robotupload_batch_skips_a_queue_being_shipped(mock_redis, mock_ship, mock_lock):
+    mock_lock.return_value.acquire.return_value = False
+
+    ship_robotupload_batch('queue')
+
+    mock_redis.return_value.lrange.assert_not_called()
+    mock_ship.assert_not_called()
+
+
+@patch('inspirehep.modules.workflows.tasks.robotupload._put_workflows_in_error_state')
+@patch('inspirehep.modules.workflows.tasks.robotupload._get_redis')
+def test_expire_robotupload_batch_puts_the_waiting_workflows_in_error_state(mock_redis, mock_error):
+    mock_redis.return_value.hgetall.return_value = {b'1002': b'2'}
+
+    expire_robotupload_batch('batch-abc')
+
+    mock_redis.return_value.delete.assert_called_once_with(
+        ROBOTUPLOAD_NONCE_KEY.format('batch-abc'))
+    assert mock_error.call_args[0][0] == [2]
+
+
+@patch('inspirehep.modules.workflows.tasks.robotupload._put_workflows_in_error_state')
+@patch('inspirehep.modules.workflows.tasks.robotupload._get_redis')
+def test_expire_robotupload_batch_does_nothing_when_all_results_arrived(mock_redis, mock_error):
+    mock_redis.return_value.hgetall.return_value = {}
+
+    expire_robotupload_batch('batch-abc')
+
+    mock_error.assert_not_called()
+
+
+def test_is_robotupload_batch_nonce():
+    assert is_robotupload_batch_nonce('batch-abc')
+    assert not is_robotupload_batch_nonce(1)
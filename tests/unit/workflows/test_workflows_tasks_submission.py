@@ -134,6 +134,102 @@ def test_create_ticket_calls_tickets_create_with_template(mock_create_ticket_wit
     )
 
 
+@patch('inspirehep.modules.workflows.tasks.submission.queue_ticket_action')
+@patch('inspirehep.modules.workflows.tasks.submission.render_template')
+@patch('inspirehep.modules.workflows.tasks.submission.User')
+@patch('inspirehep.modules.workflows.tasks.submission.tickets.create_ticket_with_template')
+@patch('inspirehep.modules.workflows.tasks.submission.rt_instance', lambda: True)
+def test_create_ticket_queues_the_ticket_when_the_outbox_is_enabled(
+    mock_create_ticket_with_template,
+    mock_user,
+    mock_render_template,
+    mock_queue_ticket_action,
+):
+    mock_user.query.get.return_value = MockUser('user@example.com')
+    mock_render_template.return_value = 'body\n'
+    config = {'WORKFLOWS_TICKET_OUTBOX': True}
+
+    with patch.dict(current_app.config, config):
+        obj = MockObj({}, {'recid': '1'})
+        eng = MockEng()
+        _create_ticket = create_ticket(template='template_path')
+        _create_ticket(obj, eng)
+
+    mock_create_ticket_with_template.assert_not_called()
+    mock_queue_ticket_action.assert_called_once_with(
+        obj,
+        'create',
+        queue='Test',
+        requestors='user@example.com',
+        subject=None,
+        body='body',
+        recid='1',
+        ticket_id_key='ticket_id',
+    )
+
+
+@patch('inspirehep.modules.workflows.tasks.submission.queue_ticket_action')
+@patch('inspirehep.modules.workflows.tasks.submission.User')
+@patch('inspirehep.modules.workflows.tasks.submission.tickets.create_ticket_with_template')
+@patch('inspirehep.modules.workflows.tasks.submission.rt_instance', lambda: True)
+def test_create_ticket_waits_for_the_ticket_when_asked(
+    mock_create_ticket_with_template,
+    mock_user,
+    mock_queue_ticket_action,
+):
+    mock_user.query.get.return_value = MockUser('user@example.com')
+    mock_create_ticket_with_template.return_value = 42
+    config = {'WORKFLOWS_TICKET_OUTBOX': True}
+
+    with patch.dict(current_app.config, config):
+        obj = MockObj({}, {'recid': '1'})
+        eng = MockEng()
+        _create_ticket = create_ticket(template='template_path', wait=True)
+        _create_ticket(obj, eng)
+
+    mock_queue_ticket_action.assert_not_called()
+    assert obj.extra_data['ticket_id'] == 42
+
+
+@patch('inspirehep.modules.workflows.tasks.submission.get_outbox_ticket_id', return_value=None)
+@patch('inspirehep.modules.workflows.tasks.submission.queue_ticket_action')
+@patch('inspirehep.modules.workflows.tasks.submission.User')
+@patch('inspirehep.modules.workflows.tasks.submission.rt_instance', lambda: True)
+def test_close_ticket_queues_the_closure_without_ticket_id(mock_user, mock_queue_ticket_action, mock_get_outbox_ticket_id):
+    mock_user.query.get.return_value = MockUser('user@example.com')
+    config = {'WORKFLOWS_TICKET_OUTBOX': True}
+
+    with patch.dict(current_app.config, config):
+        obj = MockObj({'control_number': 1}, {})
+        eng = MockEng()
+        _close_ticket = close_ticket()
+        _close_ticket(obj, eng)
+
+    mock_queue_ticket_action.assert_called_once_with(
+        obj,
+        'close',
+        ticket_id='',
+        ticket_id_key='ticket_id',
+        recid=1,
+    )
+
+
+@patch('inspirehep.modules.workflows.tasks.submission.get_outbox_ticket_id', return_value=42)
+@patch('inspirehep.modules.workflows.tasks.submission.tickets.resolve_ticket')
+@patch('inspirehep.modules.workflows.tasks.submission.User')
+@patch('inspirehep.modules.workflows.tasks.submission.rt_instance', lambda: True)
+def test_close_ticket_uses_the_ticket_id_kept_in_the_outbox(mock_user, mock_resolve_ticket, mock_get_outbox_ticket_id):
+    mock_user.query.get.return_value = MockUser('user@example.com')
+
+    obj = MockObj({}, {})
+    eng = MockEng()
+    _close_ticket = close_ticket()
+    _close_ticket(obj, eng)
+
+    mock_get_outbox_ticket_id.assert_called_once_with(obj, 'ticket_id')
+    mock_resolve_ticket.assert_called_once_with(42)
+
+
 def test_send_robotupload_works_with_mode_correct_and_extra_data_key():
     with requests_mock.Mocker() as requests_mocker:
         requests_mocker.register_uri(
@@ -335,6 +431,45 @@ def test_send_robotupload_works_with_mode_holdingpen_and_without_callback_url():
             assert expected == result
 
 
+@patch('inspirehep.modules.workflows.tasks.submission.queue_robotupload')
+def test_send_robotupload_queues_the_record_when_batching_is_enabled(mock_queue_robotupload):
+    config = {
+        'LEGACY_ROBOTUPLOAD_URL': 'http://inspirehep.net',
+        'PRODUCTION_MODE': True,
+        'SERVER_NAME': 'labs.inspirehep.net',
+        'WORKFLOWS_ROBOTUPLOAD_BATCH_WINDOW': 5,
+    }
+
+    with patch.dict(current_app.config, config):
+        data = {
+            '$schema': 'http://localhost:5000/schemas/records/hep.json',
+            'control_number': 1,
+            'arxiv_eprints': [
+                {
+                    'categories': [
+                        'hep-th',
+                    ],
+                    'value': 'hep-th/9711200',
+                },
+            ],
+        }
+        extra_data = {}
+
+        obj = MockObj(data, extra_data)
+        eng = MockEng()
+
+        _send_robotupload = send_robotupload(mode='insert')
+
+        assert _send_robotupload(obj, eng) is None
+        assert eng.msg == 'Waiting for robotupload batch.'
+        assert mock_queue_robotupload.call_count == 1
+
+        kwargs = mock_queue_robotupload.call_args[1]
+        assert kwargs['recid'] == 1
+        assert kwargs['mode'] == 'insert'
+        assert kwargs['callback_url'] == 'https://labs.inspirehep.net/callback/workflows/robotupload'
+
+
 def test_send_robotupload_logs_on_error_response():
     with requests_mock.Mocker() as requests_mocker:
         requests_mocker.register_uri(
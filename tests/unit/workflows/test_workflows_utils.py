@@ -33,6 +33,7 @@ from inspirehep.modules.workflows.utils import (
     convert,
     download_file_to_workflow,
     json_api_request,
+    pop_batch_result,
 )
 
 from mocks import MockFiles, MockFileObject, MockObj
@@ -104,3 +105,26 @@ def test_xslt(oai_xml, oai_xml_result):
     xml = convert(xml=oai_xml, xslt_filename='oaiarXiv2marcxml.xsl')
     assert xml
     assert xml == oai_xml_result
+
+
+def test_pop_batch_result_removes_the_result():
+    extra_data = {
+        '_batch_results': {
+            'beard_coreness': {},
+            'record_matches': [1],
+        },
+    }
+
+    obj = MockObj({}, extra_data)
+
+    assert pop_batch_result(obj, 'record_matches') == [1]
+    assert obj.extra_data == {'_batch_results': {'beard_coreness': {}}}
+
+    assert pop_batch_result(obj, 'beard_coreness') == {}
+    assert obj.extra_data == {}
+
+
+def test_pop_batch_result_returns_none_without_batch_results():
+    obj = MockObj({}, {})
+
+    assert pop_batch_result(obj, 'record_matches') is None